@@ -2,7 +2,7 @@
 Agents package containing various AI agents.
 """
 from agents.data_ingestion_agent import DataIngestionAgent
-from agents.rca_agent import RCAAgent
+from agents.rca_agent import RCAAgent, get_rca_agent
 from agents.evaluation_agent import EvaluationAgent
 
-__all__ = ['DataIngestionAgent', 'RCAAgent', 'EvaluationAgent'] 
\ No newline at end of file
+__all__ = ['DataIngestionAgent', 'RCAAgent', 'EvaluationAgent', 'get_rca_agent'] 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Set, Optional
 from sqlalchemy.orm import Session
 from api.models.database import Trace
 import json
@@ -15,6 +15,7 @@ class DataIngestionAgent:
             'interactions': [],
             'logs': [],
             'metrics': [],
+            'spans': [],
             'ai_signals': {
                 'hallucinations': [],
                 'prompt_drift': [],
@@ -22,6 +23,8 @@ class DataIngestionAgent:
                 'session_contexts': []
             }
         }
+        # Trace ids folded into each synthesized interaction, keyed by its trace_id
+        self.interaction_windows: Dict[int, List[int]] = {}
         # Thresholds for data reduction
         self.metric_threshold = 0.1  # 10% change threshold
         self.log_window = 60  # 60 seconds window
@@ -33,30 +36,77 @@ class DataIngestionAgent:
         self.data_drift_threshold = 0.2  # Distribution shift threshold
         self.baseline_window = 7  # Days to consider for baseline
 
-    def process_traces(self, user_id: int = None) -> Dict[str, List[Dict[str, Any]]]:
-        """Process and reduce traces by synthesizing redundant data"""
+    def process_traces(
+        self,
+        user_id: int = None,
+        user_ids: Optional[List[int]] = None,
+        agent: Optional[str] = None,
+        environment: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        max_traces: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Process and reduce traces by synthesizing redundant data
+        
+        Args:
+            user_id: Only traces uploaded by this user
+            user_ids: Only traces uploaded by any of these users, e.g. a project's members
+            agent: Drop traces that name a different agent, and untagged ones unless
+                user_id or user_ids limit the query to the test's owners
+            environment: Likewise for the environment
+            since, until: created_at window, since inclusive and until exclusive
+            max_traces: Keep only the most recent in-scope traces in the window
+        """
         try:
             query = self.db.query(Trace)
+            # Untagged traces are only attributed to the test when they come from its owners
+            owner_scoped = bool(user_id) or user_ids is not None
             if user_id:
                 query = query.filter(Trace.user_id == user_id)
+            if user_ids is not None:
+                query = query.filter(Trace.user_id.in_(user_ids))
+            if since is not None:
+                query = query.filter(Trace.created_at >= since)
+            if until is not None:
+                query = query.filter(Trace.created_at < until)
+            
+            if max_traces:
+                # Newest first, so the cap counts only traces that pass the scope checks
+                query = query.order_by(Trace.created_at.desc())
+            else:
+                # Order by timestamp for chronological processing
+                query = query.order_by(Trace.created_at)
             
-            # Order by timestamp for chronological processing
-            query = query.order_by(Trace.created_at)
-            traces = query.all()
+            scoped = []
+            for trace in query.yield_per(500):
+                try:
+                    content = trace.content if isinstance(trace.content, dict) else json.loads(trace.content)
+                except Exception as e:
+                    logger.error(f"Error processing trace {trace.id}: {str(e)}")
+                    continue
+                if not self._in_scope(content, agent, environment, owner_scoped):
+                    continue
+                scoped.append((trace, content))
+                if max_traces and len(scoped) >= max_traces:
+                    break
+            if max_traces:
+                # Back to chronological order
+                scoped.reverse()
             
             # Group traces by type for efficient processing
             grouped_traces = {
                 'interaction': [],
                 'log': [],
-                'metric': []
+                'metric': [],
+                'trace': []
             }
             
             # Track session contexts
             session_contexts = defaultdict(list)
             
-            for trace in traces:
+            for trace, content in scoped:
                 try:
-                    content = trace.content if isinstance(trace.content, dict) else json.loads(trace.content)
                     data_type = content.get('type')
                     if data_type in grouped_traces:
                         grouped_traces[data_type].append((trace, content))
@@ -74,6 +124,7 @@ class DataIngestionAgent:
             self._process_reduced_interactions(grouped_traces['interaction'])
             self._process_reduced_logs(grouped_traces['log'])
             self._process_reduced_metrics(grouped_traces['metric'])
+            self._process_reduced_spans(grouped_traces['trace'])
             
             # Process AI-specific signals
             self._process_ai_signals(grouped_traces['interaction'], session_contexts)
@@ -84,6 +135,39 @@ class DataIngestionAgent:
             logger.error(f"Error in process_traces: {str(e)}")
             raise
 
+    def _in_scope(
+        self,
+        content: Dict[str, Any],
+        agent: Optional[str],
+        environment: Optional[str],
+        keep_untagged: bool = True
+    ) -> bool:
+        """
+        Keep traces that match the agent and environment
+
+        Traces that don't say which agent or environment they belong to are
+        kept only with keep_untagged, i.e. when the query is already limited
+        to the test's owners; otherwise they could be anyone's.
+        """
+        data = content.get('data', {})
+        tags = data.get('tags') or {}
+        attributes = data.get('attributes') or {}
+        if agent:
+            trace_agent = data.get('agent') or tags.get('agent') or attributes.get('agent')
+            if trace_agent and trace_agent != agent:
+                return False
+            if not trace_agent and not keep_untagged:
+                return False
+        if environment:
+            trace_environment = (
+                data.get('environment') or tags.get('environment') or attributes.get('environment')
+            )
+            if trace_environment and str(trace_environment).lower() != environment.lower():
+                return False
+            if not trace_environment and not keep_untagged:
+                return False
+        return True
+
     def _process_ai_signals(self, interactions: List[tuple], session_contexts: Dict[str, List[tuple]]):
         """Process AI-specific signals for monitoring"""
         try:
@@ -287,6 +371,7 @@ class DataIngestionAgent:
         }
         
         self.processed_data['interactions'].append(interaction_data)
+        self.interaction_windows[main_trace.id] = [t[0].id for t in window]
 
     def _process_reduced_logs(self, logs: List[tuple]):
         """Process and reduce redundant logs"""
@@ -327,10 +412,12 @@ class DataIngestionAgent:
             'type': data.get('type'),
             'occurrence_count': len(window),
             'message': data.get('message'),
+            'service': data.get('service'),
             'context': {
                 'user_id': main_trace.user_id,
                 'session_id': data.get('session_id'),
-                'environment': data.get('environment')
+                'environment': data.get('environment'),
+                'trace_id': data.get('trace_id')
             }
         }
         
@@ -390,6 +477,25 @@ class DataIngestionAgent:
             
             self.processed_data['metrics'].append(metric_data)
 
+    def _process_reduced_spans(self, spans: List[tuple]):
+        """Keep only failed spans; successful spans add little to RCA"""
+        for trace, content in spans:
+            data = content.get('data', {})
+            attributes = data.get('attributes') or {}
+            status = data.get('status') or attributes.get('status')
+            if str(status).upper() != 'ERROR':
+                continue
+            self.processed_data['spans'].append({
+                'trace_id': data.get('trace_id'),
+                'parent_id': data.get('parent_id'),
+                'service': data.get('service') or attributes.get('service'),
+                'operation': data.get('operation') or data.get('name'),
+                'status': 'ERROR',
+                'start_time': data.get('start_time'),
+                'end_time': data.get('end_time'),
+                'attributes': attributes
+            })
+
     def _has_significant_change(self, values: List[float]) -> bool:
         """Check if metric values show significant change"""
         if len(values) < 2:
@@ -416,6 +522,19 @@ class DataIngestionAgent:
             return 'stable'
         return 'increasing' if change > 0 else 'decreasing'
 
+    def get_risky_trace_ids(self) -> Set[int]:
+        """Trace ids of synthesized interactions whose window carries an error or hallucination signal"""
+        flagged = {h['trace_id'] for h in self.processed_data['ai_signals']['hallucinations']}
+        for session in self.processed_data['ai_signals']['session_contexts']:
+            for t in session['context_traces']:
+                content = t.get('content') or {}
+                if content.get('status') == 'ERROR' or 'hallucination' in (t.get('type') or '').lower():
+                    flagged.add(t['trace_id'])
+        return {
+            trace_id for trace_id, window in self.interaction_windows.items()
+            if flagged.intersection(window)
+        }
+
     def get_analysis_data(self) -> Dict[str, Any]:
         """Prepare optimized data for RCA analysis"""
         try:
@@ -423,7 +542,8 @@ class DataIngestionAgent:
                 'data': {
                     'interactions': self.processed_data['interactions'],
                     'logs': self.processed_data['logs'],
-                    'metrics': self.processed_data['metrics']
+                    'metrics': self.processed_data['metrics'],
+                    'spans': self.processed_data['spans']
                 }
             }
         except Exception as e:
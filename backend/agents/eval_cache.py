@@ -0,0 +1,126 @@
+from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+from api.models.database import EvaluationCacheEntry
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: float) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Front tier shared by every EvaluationAgent in the process
+memory_tier = LRUCache(settings.EVAL_CACHE_SIZE)
+
+
+def evaluation_cache_key(case: Dict[str, Any], metric_name: str, threshold: float, scorer) -> str:
+    """Stable hash of the evaluation inputs, metric, threshold and scorer version"""
+    payload = json.dumps(
+        [
+            scorer.name,
+            scorer.version,
+            metric_name,
+            threshold,
+            case.get('user_query') or '',
+            case.get('model_output') or '',
+            case.get('context') or []
+        ],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EvaluationCache:
+    """Two-tier score cache: process LRU in front of the evaluation_cache table."""
+
+    def __init__(self, db: Optional[Session], memory: Optional[LRUCache] = None):
+        self.db = db
+        self.memory = memory if memory is not None else memory_tier
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, float]:
+        """Look keys up in memory first, then fetch the rest in one table query"""
+        found = {}
+        missing = []
+        for key in keys:
+            score = self.memory.get(key)
+            if score is None:
+                missing.append(key)
+            else:
+                found[key] = score
+        if missing and self.db is not None:
+            try:
+                rows = self.db.query(
+                    EvaluationCacheEntry.cache_key, EvaluationCacheEntry.score
+                ).filter(EvaluationCacheEntry.cache_key.in_(missing)).all()
+                for key, score in rows:
+                    found[key] = score
+                    self.memory.put(key, score)
+            except Exception as e:
+                logger.error(f"Error reading evaluation cache: {str(e)}")
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, metric_name: str, scores: Dict[str, float]) -> None:
+        """
+        Store scores in memory and insert them into the table, ignoring duplicates
+
+        The insert runs in a savepoint on the caller's session and is
+        committed with the caller's transaction, so a failed write only
+        undoes itself and nothing the caller has pending.
+        """
+        if not scores:
+            return
+        for key, score in scores.items():
+            self.memory.put(key, score)
+        if self.db is None:
+            return
+        try:
+            if self.db.get_bind().dialect.name == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(EvaluationCacheEntry).values([
+                {'cache_key': key, 'metric': metric_name, 'score': score}
+                for key, score in scores.items()
+            ]).on_conflict_do_nothing(index_elements=['cache_key'])
+            with self.db.begin_nested():
+                self.db.execute(stmt)
+        except Exception as e:
+            logger.error(f"Error writing evaluation cache: {str(e)}")
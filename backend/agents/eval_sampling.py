@@ -0,0 +1,155 @@
+from typing import Dict, List, Any, Optional, Set, Iterable
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+import random
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from api.models.database import EvalBudgetCharge
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def reservoir_sample(items: Iterable[Any], k: int, rng: random.Random) -> List[Any]:
+    """Uniform sample of k items from a stream of unknown length (Algorithm R)"""
+    reservoir: List[Any] = []
+    for seen, item in enumerate(items):
+        if seen < k:
+            reservoir.append(item)
+        else:
+            j = rng.randint(0, seen)
+            if j < k:
+                reservoir[j] = item
+    return reservoir
+
+
+class SamplingPolicy:
+    """Chooses which interactions to evaluate under a fixed per-tenant budget.
+
+    Interactions flagged with error or hallucination signals are always
+    evaluated. The rest are stratified by agent/model and reservoir-sampled,
+    and each selected interaction carries a sample_weight (its pattern_count
+    divided by its inclusion probability) so weighted averages estimate the
+    scores of the full traffic. Every stratum keeps at least one interaction
+    so none drops out of the estimate, even once the budget is spent.
+
+    A sliding-window cap bounds how many interactions each tenant can have
+    evaluated per window. Charges are rows in eval_budget_charges, so the
+    cap holds across replicas; two selections for the same tenant at the
+    same moment can each see the same remaining budget.
+    """
+
+    def __init__(
+        self,
+        per_stratum: Optional[int] = None,
+        tenant_cap: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.per_stratum = per_stratum or settings.EVAL_SAMPLE_PER_STRATUM
+        self.tenant_cap = tenant_cap or settings.EVAL_TENANT_CAP
+        self.window_seconds = window_seconds or settings.EVAL_TENANT_WINDOW_SECONDS
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stratum(interaction: Dict[str, Any]) -> str:
+        model = interaction.get('model') or {}
+        agent = interaction.get('agent') or interaction.get('agent_name') or 'unknown'
+        return f"{agent}/{model.get('name') or 'unknown'}"
+
+    def remaining_budget(self, db: Session, tenant_id: Any) -> int:
+        """Evaluations the tenant may still run in the current window"""
+        window_start = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        used = db.query(func.coalesce(func.sum(EvalBudgetCharge.evaluations), 0)).filter(
+            EvalBudgetCharge.tenant_id == str(tenant_id),
+            EvalBudgetCharge.charged_at > window_start
+        ).scalar()
+        return max(self.tenant_cap - used, 0)
+
+    def _charge(self, db: Session, tenant_id: Any, evaluations: int) -> None:
+        now = datetime.utcnow()
+        # Charges that left the window are no longer needed
+        db.query(EvalBudgetCharge).filter(
+            EvalBudgetCharge.tenant_id == str(tenant_id),
+            EvalBudgetCharge.charged_at <= now - timedelta(seconds=self.window_seconds)
+        ).delete(synchronize_session=False)
+        if evaluations:
+            db.add(EvalBudgetCharge(tenant_id=str(tenant_id), evaluations=evaluations, charged_at=now))
+        db.commit()
+
+    def select(
+        self,
+        db: Session,
+        tenant_id: Any,
+        interactions: List[Dict[str, Any]],
+        risky_trace_ids: Optional[Set[Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick the interactions to evaluate for one tenant
+
+        Args:
+            db: Session the tenant's budget is read and charged on
+            tenant_id: Tenant whose budget is charged, usually the user id
+            interactions: Synthesized interactions from the data ingestion agent
+            risky_trace_ids: Trace ids that must be evaluated regardless of sampling
+
+        Returns:
+            Copies of the selected interactions with a sample_weight field, in input order
+        """
+        risky_trace_ids = risky_trace_ids or set()
+        budget = self.remaining_budget(db, tenant_id)
+
+        risky, strata = [], defaultdict(list)
+        for position, interaction in enumerate(interactions):
+            if interaction.get('trace_id') in risky_trace_ids:
+                risky.append(position)
+            else:
+                strata[self.stratum(interaction)].append(position)
+
+        # Risk signals bypass sampling and the cap, but still consume budget
+        chosen = {position: 1.0 for position in risky}
+        budget = max(budget - len(risky), 0)
+
+        # Split what is left evenly across strata, capped by the reservoir size;
+        # each stratum gets at least one so its weight stays in the estimate
+        with self._lock:
+            for name, positions in sorted(strata.items(), key=lambda kv: len(kv[1])):
+                share = budget // len(strata)
+                k = min(self.per_stratum, max(share, 1), len(positions))
+                sample = reservoir_sample(positions, k, self.rng)
+                for position in sample:
+                    chosen[position] = len(positions) / k
+                budget = max(budget - len(sample), 0)
+                del strata[name]
+
+        self._charge(db, tenant_id, len(chosen))
+
+        selected = []
+        for position in sorted(chosen):
+            interaction = dict(interactions[position])
+            interaction['sample_weight'] = chosen[position] * (interaction.get('pattern_count') or 1)
+            selected.append(interaction)
+        logger.info(
+            f"Sampled {len(selected)} of {len(interactions)} interactions for tenant {tenant_id} "
+            f"({len(risky)} risk-flagged)"
+        )
+        return selected
+
+
+_shared_policy: Optional[SamplingPolicy] = None
+_shared_policy_lock = threading.Lock()
+
+
+def get_sampling_policy() -> SamplingPolicy:
+    """Return the process-wide policy; tenant caps are kept in the database."""
+    global _shared_policy
+    if _shared_policy is None:
+        with _shared_policy_lock:
+            if _shared_policy is None:
+                _shared_policy = SamplingPolicy()
+    return _shared_policy
@@ -0,0 +1,206 @@
+from typing import Dict, List, Any, Optional
+import hashlib
+import json
+import logging
+import re
+import threading
+
+import numpy as np
+
+from agents.llm_backend import LLMBackend, get_llm_backend
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# What each metric asks of the judge; scores are in [0, 1], higher is better
+METRIC_DEFINITIONS = {
+    'answer_relevancy': "How directly and completely the output answers the user query.",
+    'faithfulness': "How well every claim in the output is supported by the provided context.",
+    'hallucination': "How free the output is of claims that are absent from or contradict the context.",
+}
+
+
+class MetricScorer:
+    """Scores a batch of evaluation cases for one metric.
+
+    A case is a dict with user_query, model_output and context. Bump
+    version whenever scoring changes so cached scores are invalidated.
+    """
+
+    name = "base"
+    version = "1"
+
+    def score_batch(self, metric_name: str, cases: List[Dict[str, Any]]) -> List[float]:
+        raise NotImplementedError
+
+
+class PlaceholderScorer(MetricScorer):
+    """Demonstration scores between 0.6 and 0.9 derived from the query and output."""
+
+    name = "placeholder"
+    version = "2"  # stable digest; version 1 used the per-process hash()
+
+    def score_batch(self, metric_name: str, cases: List[Dict[str, Any]]) -> List[float]:
+        # A digest rather than hash(), which is salted per process, since scores are cached across processes
+        return [
+            0.6 + int(hashlib.sha256(
+                (case['user_query'] + case['model_output']).encode('utf-8')
+            ).hexdigest()[:8], 16) % 30 / 100
+            for case in cases
+        ]
+
+
+class LLMJudgeScorer(MetricScorer):
+    """Scores a whole batch of cases with a single judge request per metric."""
+
+    name = "llm_judge"
+
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        self.backend = backend or get_llm_backend()
+
+    def _build_prompt(self, metric_name: str, cases: List[Dict[str, Any]]) -> str:
+        numbered = [
+            {
+                'case': i + 1,
+                'query': case['user_query'],
+                'output': case['model_output'],
+                'context': case.get('context') or []
+            }
+            for i, case in enumerate(cases)
+        ]
+        return (
+            f"You are an evaluation judge scoring the metric '{metric_name}': "
+            f"{METRIC_DEFINITIONS.get(metric_name, metric_name)}\n"
+            f"Score each of the {len(cases)} cases below from 0 to 1. Output ONLY a JSON "
+            f"array of {len(cases)} numbers, in case order, with no other text.\n\n"
+            f"Cases:\n{json.dumps(numbered, indent=2)}"
+        )
+
+    def score_batch(self, metric_name: str, cases: List[Dict[str, Any]]) -> List[float]:
+        output = self.backend.complete(self._build_prompt(metric_name, cases))
+        start, end = output.find('['), output.rfind(']')
+        if start == -1 or end == -1:
+            raise ValueError(f"Judge did not return a JSON array: {output}")
+        scores = json.loads(output[start:end + 1])
+        if len(scores) != len(cases):
+            raise ValueError(f"Judge returned {len(scores)} scores for {len(cases)} cases")
+        return [min(max(float(score), 0.0), 1.0) for score in scores]
+
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:['.-][a-z0-9]+)*")
+# Capitalized phrases not at the start of a sentence, plus numbers, codes and ids
+ENTITY_RE = re.compile(r"(?<![.!?]\s)(?<!^)\b[A-Z][\w-]*(?:\s+[A-Z][\w-]*)*|\b\d[\w.,:/-]*\b")
+STOPWORDS = frozenset("""
+a an and are as at be been but by can could did do does for from had has have how i if in into
+is it its me my no not of on or our please so than that the their them then there these they
+this to was we were what when where which who why will with would you your
+""".split())
+
+
+def _content_tokens(text: str) -> np.ndarray:
+    """Sorted unique non-stopword tokens"""
+    tokens = [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+    return np.unique(np.array(tokens, dtype=str))
+
+
+def _coverage(tokens: np.ndarray, reference: np.ndarray) -> Optional[float]:
+    """Fraction of tokens that also occur in reference, None when there are no tokens"""
+    if tokens.size == 0:
+        return None
+    return float(np.isin(tokens, reference, assume_unique=True).mean())
+
+
+class LexicalScorer(MetricScorer):
+    """Offline scores from token overlap; thousands of cases per second, no network.
+
+    faithfulness is the share of output terms grounded in the context,
+    answer_relevancy the share of query terms the output covers, and
+    hallucination penalizes entities (names, numbers, ids) in the output
+    that appear in neither the context nor the query.
+    """
+
+    name = "lexical"
+    version = "2"  # entities are matched as whole tokens
+
+    def score_case(self, metric_name: str, case: Dict[str, Any]) -> float:
+        query = case.get('user_query') or ''
+        output = case.get('model_output') or ''
+        context = ' '.join(str(c) for c in case.get('context') or [])
+        if metric_name == 'answer_relevancy':
+            coverage = _coverage(_content_tokens(query), _content_tokens(output))
+            return 1.0 if coverage is None else coverage
+        if metric_name == 'faithfulness':
+            coverage = _coverage(_content_tokens(output), _content_tokens(context + ' ' + query))
+            return 1.0 if coverage is None else coverage
+        if metric_name == 'hallucination':
+            entities = {e.lower() for e in ENTITY_RE.findall(output)}
+            if not entities:
+                return 1.0
+            # Whole tokens only, so "5" is not supported by "2025"
+            known = set(TOKEN_RE.findall((context + ' ' + query).lower()))
+            unsupported = sum(1 for e in entities if not set(TOKEN_RE.findall(e)) <= known)
+            return 1.0 - unsupported / len(entities)
+        raise ValueError(f"Lexical scorer does not support metric: {metric_name}")
+
+    def score_batch(self, metric_name: str, cases: List[Dict[str, Any]]) -> List[float]:
+        return [self.score_case(metric_name, case) for case in cases]
+
+
+class TieredScorer(MetricScorer):
+    """Scores with a cheap scorer and escalates only borderline cases to a judge.
+
+    Cases whose fast score falls in [escalate_low, escalate_high) are
+    re-scored by the judge in one batch; clear passes and clear failures
+    keep their fast score.
+    """
+
+    name = "tiered"
+
+    def __init__(
+        self,
+        fast: Optional[MetricScorer] = None,
+        judge: Optional[MetricScorer] = None,
+        escalate_low: Optional[float] = None,
+        escalate_high: Optional[float] = None
+    ):
+        self.fast = fast or LexicalScorer()
+        self.judge = judge or LLMJudgeScorer()
+        self.escalate_low = settings.EVAL_ESCALATE_LOW if escalate_low is None else escalate_low
+        self.escalate_high = settings.EVAL_ESCALATE_HIGH if escalate_high is None else escalate_high
+        self.escalated = 0
+        self._escalated_lock = threading.Lock()  # metrics score concurrently on one scorer
+
+    @property
+    def version(self) -> str:
+        return (
+            f"{self.fast.name}:{self.fast.version}+{self.judge.name}:{self.judge.version}"
+            f"@{self.escalate_low}-{self.escalate_high}"
+        )
+
+    def score_batch(self, metric_name: str, cases: List[Dict[str, Any]]) -> List[float]:
+        scores = self.fast.score_batch(metric_name, cases)
+        borderline = [
+            i for i, score in enumerate(scores)
+            if self.escalate_low <= score < self.escalate_high
+        ]
+        if borderline:
+            with self._escalated_lock:
+                self.escalated += len(borderline)
+            judged = self.judge.score_batch(metric_name, [cases[i] for i in borderline])
+            for i, score in zip(borderline, judged):
+                scores[i] = score
+        return scores
+
+
+def get_metric_scorer(name: Optional[str] = None) -> MetricScorer:
+    """Build the scorer selected by name or the EVAL_SCORER setting."""
+    name = (name or settings.EVAL_SCORER or "placeholder").lower()
+    if name == "placeholder":
+        return PlaceholderScorer()
+    if name == "llm_judge":
+        return LLMJudgeScorer()
+    if name == "lexical":
+        return LexicalScorer()
+    if name == "tiered":
+        return TieredScorer()
+    raise ValueError(f"Unknown metric scorer: {name}")
@@ -1,19 +1,75 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from sqlalchemy import insert, func
 from sqlalchemy.orm import Session
-from api.models.database import User, CustomMetric, Trace
+from api.models.database import User, CustomMetric, Trace, EvaluationResult
+from agents.eval_scorers import MetricScorer, get_metric_scorer
+from agents.eval_cache import EvaluationCache, evaluation_cache_key
+from config.settings import settings
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 import logging
+import threading
+import time
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Canned result for the order agent test, which is forced to fail
+FORCED_FAILURE_QUERY = "Confirm my order for the new laptop."
+FORCED_FAILURE_RESULT = {
+    'answer_relevancy': {'score': 0.5, 'threshold': 0.8, 'passed': False},
+    'faithfulness': {'score': 0.5, 'threshold': 0.8, 'passed': False},
+    'hallucination': {'score': 0.5, 'threshold': 0.8, 'passed': False}
+}
+
+_metric_executors: Dict[int, ThreadPoolExecutor] = {}
+_metric_executors_lock = threading.Lock()
+
+
+def get_metric_executor(workers: int) -> ThreadPoolExecutor:
+    """
+    Process-wide metric pool of the given size
+
+    A metric that times out keeps its worker until the scorer returns, so
+    sharing one bounded pool caps how many hung judge calls can pile up.
+    """
+    workers = max(workers, 1)
+    if workers not in _metric_executors:
+        with _metric_executors_lock:
+            if workers not in _metric_executors:
+                _metric_executors[workers] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix='eval-metric'
+                )
+    return _metric_executors[workers]
+
+
 class EvaluationAgent:
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        scorer: Optional[MetricScorer] = None,
+        batch_size: Optional[int] = None,
+        cache: Optional[EvaluationCache] = None,
+        metric_workers: Optional[int] = None,
+        metric_timeout: Optional[float] = None
+    ):
         self.db = db
         self.metrics = {
             'answer_relevancy': {'threshold': 1.0},
             'faithfulness': {'threshold': 1.0},
             'hallucination': {'threshold': 1.0}
         }
+        # One scorer per metric; all share the configured scorer by default
+        scorer = scorer or get_metric_scorer()
+        self.scorers = {name: scorer for name in self.metrics}
+        self.batch_size = batch_size or settings.EVAL_BATCH_SIZE
+        if cache is None and settings.EVAL_CACHE_ENABLED:
+            cache = EvaluationCache(db)
+        self.cache = cache
+        self.metric_workers = metric_workers or settings.EVAL_METRIC_WORKERS
+        # 0 disables the timeout and scores metrics inline
+        self.metric_timeout = (
+            settings.EVAL_METRIC_TIMEOUT_SECONDS if metric_timeout is None else metric_timeout
+        )
 
     def evaluate_interaction(
         self,
@@ -32,50 +88,173 @@ class EvaluationAgent:
             gold_standard: Optional dict containing gold standard input/output
         """
         try:
-            # Force failure for the order agent test
-            if user_query == "Confirm my order for the new laptop.":
-                return {
-                    'answer_relevancy': {'score': 0.5, 'threshold': 0.8, 'passed': False},
-                    'faithfulness': {'score': 0.5, 'threshold': 0.8, 'passed': False},
-                    'hallucination': {'score': 0.5, 'threshold': 0.8, 'passed': False}
-                }
-            
-            results = {}
-            
-            # Return predefined evaluation results for each metric
-            for metric_name, config in self.metrics.items():
-                # Generate a score between 0.6 and 0.9 for demonstration
-                score = 0.6 + (hash(user_query + model_output) % 30) / 100
-                threshold = config['threshold']
-                
-                results[metric_name] = {
-                    'score': score,
-                    'threshold': threshold,
-                    'passed': score >= threshold,
-                    'criteria': {
-                        'evaluation_rules': {
-                            'rule1': 'Sample evaluation rule 1',
-                            'rule2': 'Sample evaluation rule 2'
-                        }
-                    }
-                }
-            
-            # Add gold standard comparison if provided
-            if gold_standard:
-                for metric_name in self.metrics.keys():
-                    gold_score = 0.8  # Fixed gold score for demonstration
-                    results[f'{metric_name}_gold_comparison'] = {
-                        'gold_score': gold_score,
-                        'current_score': results[metric_name]['score'],
-                        'difference': results[metric_name]['score'] - gold_score
-                    }
-            
-            return results
+            return self.evaluate_batch([{
+                'user_query': user_query,
+                'model_output': model_output,
+                'context': context,
+                'gold_standard': gold_standard
+            }])[0]
             
         except Exception as e:
             logger.error(f"Error evaluating interaction: {str(e)}")
             return {}
 
+    def _metric_result(self, score: float, threshold: float) -> Dict[str, Any]:
+        return {
+            'score': score,
+            'threshold': threshold,
+            'passed': score >= threshold,
+            'criteria': {
+                'evaluation_rules': {
+                    'rule1': 'Sample evaluation rule 1',
+                    'rule2': 'Sample evaluation rule 2'
+                }
+            }
+        }
+
+    def _metric_error(self, error: str, threshold: float) -> Dict[str, Any]:
+        """A metric that could not be scored; it counts as failed"""
+        return {
+            'score': None,
+            'threshold': threshold,
+            'passed': False,
+            'error': error
+        }
+
+    def evaluate_batch(
+        self,
+        cases: List[Dict[str, Any]],
+        batch_size: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Evaluate many interactions, scoring metrics concurrently over batches of cases
+        
+        Args:
+            cases: Dicts with user_query, model_output, context and optional gold_standard
+            batch_size: Cases per scorer call, defaults to EVAL_BATCH_SIZE
+            
+        Returns:
+            One result per case, in input order, shaped like evaluate_interaction's
+        """
+        batch_size = batch_size or self.batch_size
+        results: List[Dict[str, Any]] = [{} for _ in cases]
+        pending = []
+        for i, case in enumerate(cases):
+            # Force failure for the order agent test
+            if case['user_query'] == FORCED_FAILURE_QUERY:
+                results[i] = {k: dict(v) for k, v in FORCED_FAILURE_RESULT.items()}
+            else:
+                pending.append(i)
+        
+        # Serve what we can from the cache; the session is only touched on this thread
+        to_score: Dict[str, List[int]] = {}
+        keys: Dict[str, Dict[int, str]] = {}
+        for metric_name, config in self.metrics.items():
+            scorer = self.scorers[metric_name]
+            threshold = config['threshold']
+            to_score[metric_name] = pending
+            if self.cache is not None:
+                # Reuse scores for inputs already evaluated by this scorer version
+                keys[metric_name] = {
+                    i: evaluation_cache_key(cases[i], metric_name, threshold, scorer)
+                    for i in pending
+                }
+                cached = self.cache.get_many(list(set(keys[metric_name].values())))
+                to_score[metric_name] = []
+                for i in pending:
+                    key = keys[metric_name][i]
+                    if key in cached:
+                        results[i][metric_name] = self._metric_result(cached[key], threshold)
+                    else:
+                        to_score[metric_name].append(i)
+        
+        # Metrics are independent judge calls, so score them concurrently
+        scored = self._score_metrics(cases, to_score, batch_size)
+        for metric_name, (scores, errors) in scored.items():
+            threshold = self.metrics[metric_name]['threshold']
+            for i, score in scores.items():
+                results[i][metric_name] = self._metric_result(score, threshold)
+            for i, error in errors.items():
+                results[i][metric_name] = self._metric_error(error, threshold)
+            if self.cache is not None and scores:
+                self.cache.put_many(
+                    metric_name,
+                    {keys[metric_name][i]: score for i, score in scores.items()}
+                )
+        
+        # Add gold standard comparison if provided
+        for i in pending:
+            if not cases[i].get('gold_standard'):
+                continue
+            for metric_name in self.metrics.keys():
+                if results[i].get(metric_name, {}).get('score') is None:
+                    continue
+                gold_score = 0.8  # Fixed gold score for demonstration
+                results[i][f'{metric_name}_gold_comparison'] = {
+                    'gold_score': gold_score,
+                    'current_score': results[i][metric_name]['score'],
+                    'difference': results[i][metric_name]['score'] - gold_score
+                }
+        
+        return results
+
+    def _score_metric(
+        self,
+        metric_name: str,
+        cases: List[Dict[str, Any]],
+        indices: List[int],
+        batch_size: int
+    ) -> Tuple[Dict[int, float], Dict[int, str]]:
+        """Score one metric over batches of cases, returning scores and the errors of failed batches"""
+        scorer = self.scorers[metric_name]
+        scores = {}
+        errors = {}
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            try:
+                batch_scores = scorer.score_batch(metric_name, [cases[i] for i in batch])
+            except Exception as e:
+                # Mark this metric failed for the batch; other metrics still score
+                logger.error(f"Error scoring {metric_name} for {len(batch)} cases: {str(e)}")
+                errors.update((i, str(e) or type(e).__name__) for i in batch)
+                continue
+            scores.update(zip(batch, batch_scores))
+        return scores, errors
+
+    def _score_metrics(
+        self,
+        cases: List[Dict[str, Any]],
+        to_score: Dict[str, List[int]],
+        batch_size: int
+    ) -> Dict[str, Tuple[Dict[int, float], Dict[int, str]]]:
+        """Run every metric on the shared bounded pool; a metric that fails or times out is marked with its error"""
+        work = {name: indices for name, indices in to_score.items() if indices}
+        if not self.metric_timeout:
+            return {
+                name: self._score_metric(name, cases, indices, batch_size)
+                for name, indices in work.items()
+            }
+        
+        scored = {}
+        executor = get_metric_executor(self.metric_workers)
+        futures = {
+            name: executor.submit(self._score_metric, name, cases, indices, batch_size)
+            for name, indices in work.items()
+        }
+        deadline = time.monotonic() + self.metric_timeout
+        for name, future in futures.items():
+            try:
+                scored[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FuturesTimeoutError:
+                # Drop it if it has not started; a running scorer finishes in the background
+                future.cancel()
+                logger.error(f"Metric {name} timed out after {self.metric_timeout}s")
+                scored[name] = ({}, {i: 'timeout' for i in work[name]})
+            except Exception as e:
+                logger.error(f"Error scoring {name}: {str(e)}")
+                scored[name] = ({}, {i: str(e) or type(e).__name__ for i in work[name]})
+        return scored
+
     def evaluate_metrics(
         self,
         user_id: int,
@@ -86,7 +265,8 @@ class EvaluationAgent:
         
         Args:
             user_id: User ID
-            interactions: List of interaction data from data ingestion agent
+            interactions: List of interaction data from data ingestion agent, optionally
+                carrying a sample_weight from SamplingPolicy.select
         """
         try:
             results = {
@@ -99,22 +279,22 @@ class EvaluationAgent:
                 }
             }
             
-            # Track scores for averaging
+            # Track (score, sample weight) pairs for averaging
             metric_scores = {name: [] for name in self.metrics.keys()}
             
-            for interaction in interactions:
-                # Extract data from interaction
-                user_query = interaction.get('prompt', {}).get('text', '')
-                model_output = interaction.get('response', {}).get('text', '')
-                context = interaction.get('context', [])
-                
-                # Get evaluation results
-                eval_result = self.evaluate_interaction(
-                    user_query=user_query,
-                    model_output=model_output,
-                    context=context
-                )
-                
+            cases = [
+                {
+                    'user_query': interaction.get('prompt', {}).get('text', '') or '',
+                    'model_output': interaction.get('response', {}).get('text', '') or '',
+                    'context': interaction.get('context', [])
+                }
+                for interaction in interactions
+            ]
+            
+            # Get evaluation results, batched per metric
+            eval_results = self.evaluate_batch(cases)
+            
+            for interaction, eval_result in zip(interactions, eval_results):
                 # Add to results
                 results['interactions'].append({
                     'trace_id': interaction.get('trace_id'),
@@ -126,7 +306,10 @@ class EvaluationAgent:
                 for metric_name, metric_result in eval_result.items():
                     if metric_name.endswith('_gold_comparison'):
                         continue
-                    metric_scores[metric_name].append(metric_result['score'])
+                    if metric_result['score'] is not None:
+                        metric_scores[metric_name].append(
+                            (metric_result['score'], interaction.get('sample_weight', 1.0))
+                        )
                     
                     # Track failed metrics
                     if not metric_result['passed']:
@@ -134,13 +317,19 @@ class EvaluationAgent:
                             'metric': metric_name,
                             'trace_id': interaction.get('trace_id'),
                             'score': metric_result['score'],
-                            'criteria': metric_result['criteria']
+                            'criteria': metric_result.get('criteria', {})
                         })
             
-            # Calculate averages
+            # Calculate averages, weighted to undo sampling (all weights are 1 when unsampled)
             for metric_name, scores in metric_scores.items():
-                if scores:
-                    results['summary']['average_scores'][metric_name] = sum(scores) / len(scores)
+                total_weight = sum(weight for _, weight in scores)
+                if total_weight:
+                    results['summary']['average_scores'][metric_name] = (
+                        sum(score * weight for score, weight in scores) / total_weight
+                    )
+            results['summary']['estimated_population'] = sum(
+                interaction.get('sample_weight', 1.0) for interaction in interactions
+            )
             
             # Store results in database
             self.store_evaluation_results(user_id, results)
@@ -167,14 +356,24 @@ class EvaluationAgent:
                 )
                 self.db.add(custom_metric)
             
-            # Store individual interaction results
-            for interaction in results['interactions']:
-                trace = self.db.query(Trace).filter(Trace.id == interaction['trace_id']).first()
-                if trace:
-                    trace.analysis_results = {
-                        'evaluation': interaction['evaluation'],
-                        'timestamp': interaction['timestamp']
-                    }
+            # Store individual interaction results with a single bulk insert
+            evaluated_at = datetime.utcnow()
+            rows = [
+                {
+                    'trace_id': interaction.get('trace_id'),
+                    'user_id': user_id,
+                    'metric': metric_name,
+                    'score': metric_result['score'],
+                    'threshold': metric_result['threshold'],
+                    'passed': metric_result['passed'],
+                    'evaluated_at': evaluated_at
+                }
+                for interaction in results['interactions']
+                for metric_name, metric_result in interaction['evaluation'].items()
+                if not metric_name.endswith('_gold_comparison') and metric_result['score'] is not None
+            ]
+            if rows:
+                self.db.execute(insert(EvaluationResult), rows)
             
             self.db.commit()
             return True
@@ -183,6 +382,46 @@ class EvaluationAgent:
             self.db.rollback()
             return False
 
+    def get_latest_scores(self, trace_ids: List[int]) -> Dict[int, Dict[str, Dict[str, Any]]]:
+        """Latest stored result per metric for each trace, keyed by trace id then metric"""
+        latest = self.db.query(
+            EvaluationResult.trace_id,
+            EvaluationResult.metric,
+            func.max(EvaluationResult.evaluated_at).label('evaluated_at')
+        ).filter(
+            EvaluationResult.trace_id.in_(trace_ids)
+        ).group_by(EvaluationResult.trace_id, EvaluationResult.metric).subquery()
+        rows = self.db.query(EvaluationResult).join(
+            latest,
+            (EvaluationResult.trace_id == latest.c.trace_id)
+            & (EvaluationResult.metric == latest.c.metric)
+            & (EvaluationResult.evaluated_at == latest.c.evaluated_at)
+        ).all()
+        scores: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        for row in rows:
+            scores.setdefault(row.trace_id, {})[row.metric] = {
+                'score': row.score,
+                'threshold': row.threshold,
+                'passed': row.passed,
+                'evaluated_at': row.evaluated_at.isoformat()
+            }
+        return scores
+
+    def get_metric_history(self, metric_name: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recent scores for one metric, newest first"""
+        rows = self.db.query(EvaluationResult).filter(
+            EvaluationResult.metric == metric_name
+        ).order_by(EvaluationResult.evaluated_at.desc()).limit(limit).all()
+        return [
+            {
+                'trace_id': row.trace_id,
+                'score': row.score,
+                'passed': row.passed,
+                'evaluated_at': row.evaluated_at.isoformat()
+            }
+            for row in rows
+        ]
+
     def get_evaluation_summary(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """
         Generate a summary of evaluation results for RCA
@@ -214,10 +453,11 @@ class EvaluationAgent:
                 # Add critical issues
                 for metric, issues in metric_issues.items():
                     if len(issues) > 2:  # More than 2 failures for same metric
+                        scores = [i['score'] for i in issues if i['score'] is not None]
                         summary['critical_issues'].append({
                             'metric': metric,
                             'failure_count': len(issues),
-                            'avg_score': sum(i['score'] for i in issues) / len(issues),
+                            'avg_score': sum(scores) / len(scores) if scores else None,
                             'criteria': issues[0]['criteria']
                         })
             
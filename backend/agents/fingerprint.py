@@ -0,0 +1,46 @@
+from typing import Dict, Any, Iterable, Optional
+import hashlib
+import json
+import re
+
+# Volatile tokens replaced before hashing so reruns of the same failure collide
+_NORMALIZERS = [
+    (re.compile(r'\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b'), '<uuid>'),
+    (re.compile(r'\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(z|[+-]\d{2}:?\d{2})?'), '<ts>'),
+    (re.compile(r'\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b'), '<hex>'),
+    (re.compile(r'\d+(\.\d+)?'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def normalize_evidence(text: Optional[str]) -> str:
+    """Lowercase and strip ids, timestamps and numbers from error text"""
+    if not text:
+        return ''
+    normalized = str(text).lower()
+    for pattern, replacement in _NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    return normalized.strip()
+
+
+def failing_metrics(eval_result: Dict[str, Any]) -> Iterable[str]:
+    """Names of evaluation metrics that did not pass"""
+    return sorted(
+        name for name, result in eval_result.items()
+        if isinstance(result, dict) and result.get('passed') is False
+    )
+
+
+def compute_failure_fingerprint(test_config: Dict[str, Any], eval_result: Dict[str, Any]) -> str:
+    """Stable fingerprint for a failed run: test, agent, failing metrics and error evidence"""
+    evidence = [
+        normalize_evidence(test_config.get('model_output')),
+        normalize_evidence(test_config.get('error'))
+    ]
+    payload = json.dumps([
+        test_config.get('test_name'),
+        test_config.get('agent'),
+        list(failing_metrics(eval_result)),
+        evidence
+    ])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
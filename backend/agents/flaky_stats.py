@@ -0,0 +1,90 @@
+from typing import Dict, Any, Optional
+from datetime import datetime
+import logging
+
+from sqlalchemy.orm import Session
+
+from api.models.database import TestStats
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def window_runs(stats: TestStats, window: int) -> int:
+    """How many of the recent_runs bits hold a real run"""
+    return min(stats.run_count or 0, window)
+
+
+def count_flips(recent_runs: int, runs: int) -> int:
+    """Status changes between consecutive runs among the latest runs"""
+    if runs < 2:
+        return 0
+    # Bit i of the XOR is set when run i and run i + 1 differ
+    return ((recent_runs ^ (recent_runs >> 1)) & ((1 << (runs - 1)) - 1)).bit_count()
+
+
+def advance_stats(
+    stats: TestStats,
+    passed: bool,
+    run_at: datetime,
+    window: Optional[int] = None,
+    alpha: Optional[float] = None
+) -> TestStats:
+    """Fold one run into the running statistics in constant time"""
+    window = window or settings.FLAKY_WINDOW_RUNS
+    alpha = settings.FLAKY_EWMA_ALPHA if alpha is None else alpha
+    outcome = 1 if passed else 0
+    stats.run_count = (stats.run_count or 0) + 1
+    stats.pass_count = (stats.pass_count or 0) + outcome
+    stats.recent_runs = (((stats.recent_runs or 0) << 1) | outcome) & ((1 << window) - 1)
+    stats.flip_count = count_flips(stats.recent_runs, window_runs(stats, window))
+    if stats.ewma_pass_rate is None:
+        stats.ewma_pass_rate = float(outcome)
+    else:
+        stats.ewma_pass_rate = alpha * outcome + (1 - alpha) * stats.ewma_pass_rate
+    stats.last_status = 'passed' if passed else 'failed'
+    stats.last_run_at = run_at
+    return stats
+
+
+def record_test_run(db: Session, test_name: str, agent: str, passed: bool, run_at: datetime) -> TestStats:
+    """
+    Update the statistics of (test_name, agent) for a new run
+
+    The row is locked for the rest of the caller's transaction so concurrent
+    runs of the same test apply one after the other.
+    """
+    if db.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    db.execute(
+        insert(TestStats).values(
+            test_name=test_name, agent=agent, run_count=0, pass_count=0, recent_runs=0, flip_count=0
+        ).on_conflict_do_nothing(index_elements=['test_name', 'agent'])
+    )
+    stats = db.query(TestStats).filter(
+        TestStats.test_name == test_name,
+        TestStats.agent == agent
+    ).with_for_update().populate_existing().one()
+    return advance_stats(stats, passed, run_at)
+
+
+def describe_flakiness(stats: TestStats, window: Optional[int] = None) -> Dict[str, Any]:
+    """API view of the precomputed statistics"""
+    window = window or settings.FLAKY_WINDOW_RUNS
+    runs = window_runs(stats, window)
+    return {
+        "testName": stats.test_name,
+        "agent": stats.agent,
+        "runs": stats.run_count,
+        "passRate": stats.pass_count / stats.run_count if stats.run_count else None,
+        "ewmaPassRate": stats.ewma_pass_rate,
+        "windowRuns": runs,
+        "flips": stats.flip_count,
+        "flipRate": stats.flip_count / (runs - 1) if runs > 1 else 0.0,
+        # Newest first, P for passed and F for failed
+        "recent": "".join("P" if stats.recent_runs >> i & 1 else "F" for i in range(runs)),
+        "lastStatus": stats.last_status,
+        "lastRunAt": stats.last_run_at.isoformat() if stats.last_run_at else None,
+    }
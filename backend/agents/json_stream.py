@@ -0,0 +1,83 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+
+class IncrementalJSONParser:
+    """Incrementally parse a streamed JSON object, one top-level member at a time.
+
+    Text before the opening brace (e.g. a markdown fence) is skipped. Each
+    call to feed() returns the (key, value) pairs whose values completed in
+    that chunk, so callers can act on a section as soon as it is generated.
+    A malformed member raises ValueError immediately instead of after the
+    full generation. Every character is scanned once.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.result: Dict[str, Any] = {}
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk and return the top-level members completed by it"""
+        if self.done:
+            return []
+        self.buffer += chunk
+        completed = []
+        buffer = self.buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+            if self._depth == 0:
+                # Skip any preamble until the object opens
+                if char == '{':
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 0:
+                    member = self._parse_member(buffer[self._member_start:self._pos])
+                    if member:
+                        completed.append(member)
+                    self._pos += 1
+                    self.done = True
+                    break
+            elif char == ',' and self._depth == 1:
+                member = self._parse_member(buffer[self._member_start:self._pos])
+                if member is None:
+                    raise ValueError(f"Empty member at position {self._pos}")
+                completed.append(member)
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _parse_member(self, text: str) -> Optional[Tuple[str, Any]]:
+        if not text.strip():
+            return None
+        try:
+            parsed = json.loads('{' + text + '}')
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Malformed JSON member: {e.msg}") from e
+        key, value = next(iter(parsed.items()))
+        self.result[key] = value
+        return key, value
+
+    def close(self) -> Dict[str, Any]:
+        """Return the complete object, raising if the stream ended early"""
+        if not self.done:
+            raise ValueError("JSON object was not closed before the stream ended")
+        return self.result
@@ -0,0 +1,108 @@
+from typing import Any, Dict, Optional, Type
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+
+# Queue tables leased to workers: RCAJob and TestRun. Each has status
+# (queued, running, completed, failed), attempts, worker_id,
+# lease_expires_at, heartbeat_at, error, created_at, started_at and
+# finished_at columns.
+
+
+def claim_lease(db: Session, model: Type, worker_id: str, lease_seconds: float, max_attempts: int) -> Optional[Any]:
+    """
+    Claim the oldest queued row of a queue table, or a running one whose lease expired
+
+    The candidate row is locked with FOR UPDATE SKIP LOCKED, so concurrent
+    workers, in this process or another, each claim a different row without
+    waiting on one another. The lease lasts lease_seconds unless the worker
+    extends it with heartbeats.
+    """
+    now = datetime.utcnow()
+    while True:
+        row = db.query(model).filter(
+            or_(
+                model.status == 'queued',
+                and_(model.status == 'running', model.lease_expires_at < now)
+            )
+        ).order_by(model.created_at, model.id).with_for_update(skip_locked=True).first()
+        if row is None:
+            db.commit()
+            return None
+        if row.attempts >= max_attempts:
+            # Its worker stopped heartbeating on the last attempt
+            row.status = 'failed'
+            row.error = row.error or f'Lease held by {row.worker_id} expired'
+            row.worker_id = None
+            row.finished_at = now
+            db.commit()
+            continue
+        row.status = 'running'
+        row.attempts += 1
+        row.worker_id = worker_id
+        row.started_at = now
+        row.heartbeat_at = now
+        row.lease_expires_at = now + timedelta(seconds=lease_seconds)
+        db.commit()
+        return row
+
+
+def held_lease(db: Session, model: Type, row_id: int, worker_id: str) -> Query:
+    """The row, if worker_id still holds its lease"""
+    return db.query(model).filter(
+        model.id == row_id,
+        model.worker_id == worker_id,
+        model.status == 'running'
+    )
+
+
+def heartbeat_lease(db: Session, model: Type, row_id: int, worker_id: str, lease_seconds: float) -> bool:
+    """Extend a lease; False if the worker no longer holds it"""
+    now = datetime.utcnow()
+    extended = held_lease(db, model, row_id, worker_id).update({
+        model.heartbeat_at: now,
+        model.lease_expires_at: now + timedelta(seconds=lease_seconds)
+    }, synchronize_session=False)
+    db.commit()
+    return bool(extended)
+
+
+def finish_lease(
+    db: Session,
+    model: Type,
+    row_id: int,
+    worker_id: str,
+    error: Optional[str],
+    max_attempts: int,
+    values: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
+    """
+    Record an outcome, requeueing the row when it errored with attempts left
+
+    Args:
+        values: Further columns to set along with the outcome
+
+    Returns:
+        The row's new status, or None if the lease was lost meanwhile; the
+        outcome is then discarded
+    """
+    row = held_lease(db, model, row_id, worker_id).with_for_update().first()
+    if row is None:
+        db.commit()
+        return None
+    for column, value in (values or {}).items():
+        setattr(row, column, value)
+    row.error = error
+    if error is None:
+        row.status = 'completed'
+        row.finished_at = datetime.utcnow()
+    elif row.attempts < max_attempts:
+        row.status = 'queued'
+    else:
+        row.status = 'failed'
+        row.finished_at = datetime.utcnow()
+    row.worker_id = None
+    row.lease_expires_at = None
+    db.commit()
+    return row.status
@@ -0,0 +1,192 @@
+from typing import Dict, Any, List, Optional, Callable, Iterator
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackendError(Exception):
+    """Raised when an LLM backend fails to produce a completion."""
+
+
+class LLMBackend:
+    """Interface for the text-completion backends used by the RCA agent."""
+
+    name = "base"
+
+    def complete(self, prompt: str) -> str:
+        """Return the completion text for a fully rendered prompt."""
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the completion in chunks; backends without streaming yield it whole."""
+        yield self.complete(prompt)
+
+    def warm_up(self) -> None:
+        """Create any clients up front so the first request does not pay for it."""
+
+
+class OpenAIBackend(LLMBackend):
+    """Chat completion backend backed by langchain's ChatOpenAI client.
+
+    The client is created on first use so that importing or constructing
+    the backend does not require an API key. It owns a pooled httpx client
+    with keep-alive, so a shared backend reuses connections across requests.
+    """
+
+    name = "openai"
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        temperature: float = 0,
+        api_key: Optional[str] = None
+    ):
+        self.model_name = model_name or settings.LLM_MODEL
+        self.temperature = temperature
+        self.api_key = api_key
+        self._llm = None
+        self._lock = threading.Lock()
+
+    def _build_http_client(self):
+        import httpx
+
+        return httpx.Client(
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS
+            ),
+            timeout=settings.LLM_TIMEOUT_SECONDS
+        )
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    from langchain_community.chat_models import ChatOpenAI
+
+                    api_key = self.api_key or os.getenv("OPENAI_API_KEY")
+                    if not api_key:
+                        raise LLMBackendError("OPENAI_API_KEY not set in environment variables.")
+                    self._llm = ChatOpenAI(
+                        model_name=self.model_name,
+                        temperature=self.temperature,
+                        openai_api_key=api_key,
+                        request_timeout=settings.LLM_TIMEOUT_SECONDS,
+                        http_client=self._build_http_client()
+                    )
+        return self._llm
+
+    def warm_up(self) -> None:
+        try:
+            self.llm
+        except LLMBackendError as e:
+            logger.warning(f"Skipping OpenAI client warm-up: {str(e)}")
+
+    def complete(self, prompt: str) -> str:
+        message = self.llm.invoke(prompt)
+        return getattr(message, "content", message)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.llm.stream(prompt):
+            yield getattr(chunk, "content", chunk)
+
+
+class FakeLLMBackend(LLMBackend):
+    """Deterministic local stand-in for offline runs and benchmarks.
+
+    Returns canned responses (cycled in order) when given, otherwise a
+    templated RCA report derived from a digest of the prompt. Latency and
+    failure rate are configurable; failures are drawn from a seeded RNG so
+    runs are reproducible.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        responses: Optional[List[str]] = None,
+        template: Optional[Callable[[str], Dict[str, Any]]] = None,
+        latency_ms: Optional[float] = None,
+        failure_rate: Optional[float] = None,
+        seed: int = 0,
+        chunk_size: int = 16
+    ):
+        self.chunk_size = chunk_size
+        self.responses = list(responses or [])
+        self.template = template or self._default_report
+        self.latency_ms = settings.FAKE_LLM_LATENCY_MS if latency_ms is None else latency_ms
+        self.failure_rate = settings.FAKE_LLM_FAILURE_RATE if failure_rate is None else failure_rate
+        self._rng = random.Random(seed)
+        self.calls = 0
+        # Shared by concurrent requests; the counter and RNG draw must not interleave
+        self._lock = threading.Lock()
+
+    def _default_report(self, prompt: str) -> Dict[str, Any]:
+        digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+        return {
+            "summary": f"Synthetic RCA report {digest}",
+            "root_cause": "Generated by the fake LLM backend; no model was called.",
+            "contributing_factors": [
+                {
+                    "title": "Synthetic factor",
+                    "details": f"Prompt of {len(prompt)} characters",
+                    "log_id": "",
+                    "trace_id": "",
+                    "timestamp": ""
+                }
+            ],
+            "replay": [
+                {
+                    "step": 1,
+                    "title": "Fake completion",
+                    "details": "Report templated locally",
+                    "timestamp": ""
+                }
+            ],
+            "resolution": [
+                {
+                    "action": "No action required",
+                    "status": "pending",
+                    "details": "Fake backend output"
+                }
+            ]
+        }
+
+    def complete(self, prompt: str) -> str:
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+            failed = bool(self.failure_rate) and self._rng.random() < self.failure_rate
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        if failed:
+            raise LLMBackendError("Simulated LLM failure")
+        if self.responses:
+            return self.responses[index % len(self.responses)]
+        return json.dumps(self.template(prompt))
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        # Latency is charged up front (time to first token), then chunks flow
+        output = self.complete(prompt)
+        for start in range(0, len(output), self.chunk_size):
+            yield output[start:start + self.chunk_size]
+
+
+def get_llm_backend(name: Optional[str] = None) -> LLMBackend:
+    """Build the backend selected by name or the LLM_BACKEND setting."""
+    name = (name or settings.LLM_BACKEND or "openai").lower()
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "fake":
+        return FakeLLMBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
@@ -1,23 +1,84 @@
-from typing import Dict, Any
-from langchain_community.chat_models import ChatOpenAI
+from typing import Dict, Any, Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-import os
+from agents.json_stream import IncrementalJSONParser
+from agents.llm_backend import LLMBackend, get_llm_backend
+from agents.rca_rules import RuleBasedRCA
+from config.settings import settings
 import logging
 import json
 import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Output format shared by the single-pass, shard (map) and merge (reduce) prompts
+RCA_OUTPUT_INSTRUCTIONS = (
+    "Output ONLY a valid JSON object with these exact keys and structure, with NO "
+    "extra text, markdown, or explanation. Do NOT wrap the JSON in triple backticks "
+    "or any other formatting. All keys must be plain, unquoted, and have no leading/"
+    "trailing whitespace or newlines. The 'resolution' array can contain multiple "
+    "actions, each as a separate object. \n\n"
+    "Here is the required JSON schema and an example:\n\n"
+    "{{\n"
+    '  "summary": "Short summary of the incident",\n'
+    '  "root_cause": "Detailed explanation of the root cause",\n'
+    '  "contributing_factors": [\n'
+    '    {{\n'
+    '      "title": "Factor title",\n'
+    '      "details": "Detailed explanation",\n'
+    '      "log_id": "Relevant log ID",\n'
+    '      "trace_id": "Relevant trace ID",\n'
+    '      "timestamp": "When it occurred"\n'
+    '    }}\n'
+    '  ],\n'
+    '  "replay": [\n'
+    '    {{\n'
+    '      "step": 1,\n'
+    '      "title": "Step title",\n'
+    '      "details": "What happened",\n'
+    '      "timestamp": "When it happened"\n'
+    '    }}\n'
+    '  ],\n'
+    '  "resolution": [\n'
+    '    {{\n'
+    '      "action": "Action to take",\n'
+    '      "status": "pending",\n'
+    '      "details": "Detailed explanation"\n'
+    '    }},\n'
+    '    {{\n'
+    '      "action": "Another action to take",\n'
+    '      "status": "completed",\n'
+    '      "details": "Another detailed explanation"\n'
+    '    }}\n'
+    '  ]\n'
+    "}}\n\n"
+)
+
+# Evidence lists that can be split across shards, in the reduced and raw scenario shapes
+SHARDABLE_EVIDENCE_KEYS = (
+    'interactions', 'logs', 'metrics', 'spans', 'prod_logs', 'llm_calls', 'traces', 'evaluation_metrics'
+)
+# Share of a shard prompt's room the context copied into every shard may take
+CONTEXT_SHARE = 0.25
+# Stand-in for the shard label while measuring, as long as any real one
+SHARD_LABEL_PLACEHOLDER = "9999 of 9999"
+
 
 class RCAAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model_name="gpt-4",
-            temperature=0,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
-        
+    def __init__(
+        self,
+        backend: Optional[LLMBackend] = None,
+        rule_engine: Optional[RuleBasedRCA] = None
+    ):
+        # Completion backend (OpenAI by default, see LLM_BACKEND setting)
+        self.backend = backend or get_llm_backend()
+        # Deterministic fast path tried before the LLM
+        if rule_engine is None and settings.RCA_RULES_ENABLED:
+            rule_engine = RuleBasedRCA()
+        self.rule_engine = rule_engine
+
         self.prompt_template = PromptTemplate(
             input_variables=["scenario"],
             template=(
@@ -35,63 +96,56 @@ class RCAAgent:
                 "a causal chain (step-by-step how the issue propagated) and suggest specific, "
                 "actionable resolutions. Take full responsibility for the analysis and do not "
                 "defer to the user. \n\n"
-                "Output ONLY a valid JSON object with these exact keys and structure, with NO "
-                "extra text, markdown, or explanation. Do NOT wrap the JSON in triple backticks "
-                "or any other formatting. All keys must be plain, unquoted, and have no leading/"
-                "trailing whitespace or newlines. The 'resolution' array can contain multiple "
-                "actions, each as a separate object. \n\n"
-                "Here is the required JSON schema and an example:\n\n"
-                "{{\n"
-                '  "summary": "Short summary of the incident",\n'
-                '  "root_cause": "Detailed explanation of the root cause",\n'
-                '  "contributing_factors": [\n'
-                '    {{\n'
-                '      "title": "Factor title",\n'
-                '      "details": "Detailed explanation",\n'
-                '      "log_id": "Relevant log ID",\n'
-                '      "trace_id": "Relevant trace ID",\n'
-                '      "timestamp": "When it occurred"\n'
-                '    }}\n'
-                '  ],\n'
-                '  "replay": [\n'
-                '    {{\n'
-                '      "step": 1,\n'
-                '      "title": "Step title",\n'
-                '      "details": "What happened",\n'
-                '      "timestamp": "When it happened"\n'
-                '    }}\n'
-                '  ],\n'
-                '  "resolution": [\n'
-                '    {{\n'
-                '      "action": "Action to take",\n'
-                '      "status": "pending",\n'
-                '      "details": "Detailed explanation"\n'
-                '    }},\n'
-                '    {{\n'
-                '      "action": "Another action to take",\n'
-                '      "status": "completed",\n'
-                '      "details": "Another detailed explanation"\n'
-                '    }}\n'
-                '  ]\n'
-                "}}\n\n"
-                "Data to analyze:\n{scenario}"
+                + RCA_OUTPUT_INSTRUCTIONS
+                + "Data to analyze:\n{scenario}"
             )
         )
-        
-        self.chain = LLMChain(
-            llm=self.llm,
-            prompt=self.prompt_template
+
+        # Map step for evidence sets too large for one prompt
+        self.shard_prompt_template = PromptTemplate(
+            input_variables=["scenario"],
+            template=(
+                "You are an expert Root Cause Analysis (RCA) agent for AI/LLM systems. "
+                "The evidence for this incident was too large for a single analysis and "
+                "has been split into shards by service or time window. Analyze ONLY the "
+                "shard below, together with the shared test context it carries. Report the "
+                "failures, anomalies and causal steps visible in this shard, referencing the "
+                "exact log_id and trace_id. If the shard shows nothing abnormal, say so in the "
+                "summary and leave the arrays empty. \n\n"
+                + RCA_OUTPUT_INSTRUCTIONS
+                + "Shard to analyze:\n{scenario}"
+            )
+        )
+
+        # Reduce step merging shard reports into the final report
+        self.reduce_prompt_template = PromptTemplate(
+            input_variables=["scenario"],
+            template=(
+                "You are an expert Root Cause Analysis (RCA) agent for AI/LLM systems. "
+                "Below are partial RCA reports, each produced from one shard of the "
+                "evidence for the same incident. Merge them into a single root cause "
+                "report: identify the one true root cause, keep the contributing factors "
+                "that support it (deduplicated, with their log_id and trace_id), order the "
+                "replay steps chronologically across shards and consolidate the resolutions. "
+                "Do not invent evidence that is not present in the shard reports. \n\n"
+                + RCA_OUTPUT_INSTRUCTIONS
+                + "Shard reports:\n{scenario}"
+            )
         )
 
+        # Prompts above this size switch to the hierarchical (map-reduce) mode
+        self.max_prompt_chars = settings.RCA_MAX_PROMPT_CHARS
+        self.shard_workers = settings.RCA_SHARD_WORKERS
+
     def _extract_json(self, text: str) -> str:
         """Extract the first JSON object from a string."""
-        match = re.search(
-            r"\{(?:[^{}]|(?R))*\}",
-            text,
-            re.DOTALL
-        )
-        if match:
-            return match.group(0)
+        decoder = json.JSONDecoder()
+        for match in re.finditer(r"\{", text):
+            try:
+                _, end = decoder.raw_decode(text, match.start())
+                return text[match.start():end]
+            except ValueError:
+                continue
         raise ValueError("No JSON object found in LLM output.")
 
     def _normalize_keys(self, obj):
@@ -158,33 +212,259 @@ class RCAAgent:
 
         return rca_report
 
+    def _analyze_with_rules(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return a rule-based RCA result if the rule engine is confident enough"""
+        if not self.rule_engine:
+            return None
+        try:
+            result = self.rule_engine.analyze(data)
+        except Exception as e:
+            logger.error(f"Error in rule-based RCA: {str(e)}")
+            return None
+        if not result or result['confidence'] < self.rule_engine.min_confidence:
+            return None
+        logger.info(f"Rule-based RCA matched with confidence {result['confidence']}")
+        return {
+            'rca_report': self._coerce_rca_report(result['rca_report']),
+            'status': 'success',
+            'source': 'rules',
+            'confidence': result['confidence']
+        }
+
+    def _parse_rca_output(self, output: str) -> Dict[str, Any]:
+        """Parse raw LLM output into a normalized, schema-complete RCA report"""
+        try:
+            rca_json = json.loads(output)
+        except Exception:
+            # Try to extract JSON block if direct parse fails
+            extracted = self._extract_json(output)
+            rca_json = json.loads(extracted)
+        rca_json = self._normalize_keys(rca_json)
+        return self._coerce_rca_report(rca_json)
+
+    def _prompt_size(self, template: PromptTemplate, payload: Any) -> int:
+        return len(template.format(scenario=json.dumps(payload, default=str)))
+
+    def _context_limit(self) -> int:
+        room = self.max_prompt_chars - len(self.shard_prompt_template.format(scenario=''))
+        if room <= 0:
+            raise ValueError(f"RCA_MAX_PROMPT_CHARS={self.max_prompt_chars} leaves no room for evidence")
+        return int(room * CONTEXT_SHARE)
+
+    def _split_evidence(self, data: Dict[str, Any], context_limit: int):
+        """
+        Separate shardable evidence items from the context every shard needs
+
+        Nested dicts are searched too, so evaluation_metrics['interactions']
+        is sharded as 'evaluation_metrics.interactions'. Besides the known
+        evidence keys, any list too large for the context is sharded as well.
+        """
+        evidence = []
+
+        def split(source: Dict[str, Any], path: str) -> Dict[str, Any]:
+            context = {}
+            for key, value in source.items():
+                # 'data' only wraps the reduced scenario, it is not part of the kind
+                kind = path if key == 'data' else (f"{path}.{key}" if path else key)
+                if isinstance(value, dict):
+                    context[key] = split(value, kind)
+                elif isinstance(value, list) and (
+                    key in SHARDABLE_EVIDENCE_KEYS or len(json.dumps(value, default=str)) > context_limit
+                ):
+                    evidence.extend((kind, item) for item in value)
+                else:
+                    context[key] = value
+            return context
+
+        context = split(data, '')
+        return self._fit_context(context, context_limit), evidence
+
+    def _fit_context(self, context: Dict[str, Any], limit: int) -> Dict[str, Any]:
+        """Replace the largest context values with a size note until the context fits in limit chars"""
+        def slots(container):
+            for key, value in container.items():
+                yield container, key
+                if isinstance(value, dict):
+                    yield from slots(value)
+
+        while len(json.dumps(context, default=str)) > limit:
+            sized = [
+                (isinstance(parent[key], dict), len(json.dumps(parent[key], default=str)), parent, key)
+                for parent, key in slots(context)
+            ]
+            # Leaf values go first so a nested dict keeps whatever still fits
+            candidates = [slot for slot in sized if slot[1] > 32]
+            if not candidates:
+                raise ValueError(f"RCA context does not fit in {limit} chars")
+            _, size, parent, key = min(candidates, key=lambda slot: (slot[0], -slot[1]))
+            parent[key] = f"[omitted: {size} chars]"
+        return context
+
+    def _shard_key(self, item: Any) -> str:
+        """Group evidence by service, falling back to the hour it happened in"""
+        if not isinstance(item, dict):
+            return "window:unknown"
+        service = (
+            item.get('service')
+            or (item.get('tags') or {}).get('service')
+            or (item.get('context') or {}).get('service')
+        )
+        if service:
+            return f"service:{service}"
+        timestamp = item.get('timestamp') or item.get('start_time')
+        return f"window:{str(timestamp)[:13]}" if timestamp else "window:unknown"
+
+    def _make_shard(self, context: Dict[str, Any], entries: List) -> Dict[str, Any]:
+        evidence, keys = {}, []
+        for key, kind, item in entries:
+            evidence.setdefault(kind, []).append(item)
+            if key not in keys:
+                keys.append(key)
+        return {'shard_keys': keys, 'context': context, 'evidence': evidence, 'shard': SHARD_LABEL_PLACEHOLDER}
+
+    def _fit_shard(self, context: Dict[str, Any], entries: List) -> List[Dict[str, Any]]:
+        """Split entries until every shard prompt is within max_prompt_chars, clipping oversized items"""
+        shard = self._make_shard(context, entries)
+        size = self._prompt_size(self.shard_prompt_template, shard)
+        if size <= self.max_prompt_chars:
+            return [shard]
+        if len(entries) > 1:
+            middle = len(entries) // 2
+            return self._fit_shard(context, entries[:middle]) + self._fit_shard(context, entries[middle:])
+        key, kind, item = entries[0]
+        text = json.dumps(item, default=str)
+        while size > self.max_prompt_chars and text:
+            # Escaping can grow the clipped text, so cut by twice the excess
+            text = text[:max(len(text) - 2 * (size - self.max_prompt_chars) - 16, 0)]
+            shard = self._make_shard(context, [(key, kind, {'truncated': text})])
+            size = self._prompt_size(self.shard_prompt_template, shard)
+        return [shard]
+
+    def _build_shards(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Pack evidence groups into shards whose prompts stay within max_prompt_chars"""
+        context, evidence = self._split_evidence(data, self._context_limit())
+        groups: Dict[str, List] = {}
+        for kind, item in evidence:
+            groups.setdefault(self._shard_key(item), []).append((kind, item))
+
+        # Estimated room per shard; _fit_shard enforces the exact prompt size
+        budget = self.max_prompt_chars - self._prompt_size(self.shard_prompt_template, self._make_shard(context, []))
+        shards = []
+        current, current_size = [], 0
+        for key in sorted(groups):
+            for kind, item in groups[key]:
+                size = len(json.dumps(item, default=str)) + len(key) + 8
+                if current and current_size + size > budget:
+                    shards.extend(self._fit_shard(context, current))
+                    current, current_size = [], 0
+                current.append((key, kind, item))
+                current_size += size
+        if current:
+            shards.extend(self._fit_shard(context, current))
+        for index, shard in enumerate(shards):
+            shard['shard'] = f"{index + 1} of {len(shards)}"
+        return shards
+
+    def _compact_report(self, report: Dict[str, Any], max_items: int = 5) -> Dict[str, Any]:
+        """Trim a shard report so the reduce prompt stays bounded"""
+        return {
+            'summary': report.get('summary'),
+            'root_cause': report.get('root_cause'),
+            'contributing_factors': report.get('contributing_factors', [])[:max_items],
+            'replay': report.get('replay', [])[:max_items],
+            'resolution': report.get('resolution', [])[:max_items]
+        }
+
+    def _run_prompt(self, template: PromptTemplate, payload: Any) -> Dict[str, Any]:
+        output = self.backend.complete(template.format(scenario=json.dumps(payload, default=str)))
+        return self._parse_rca_output(output)
+
+    def _batch_reports(self, reports: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Group reports into batches of at least two that fit in one prompt where possible"""
+        budget = self.max_prompt_chars - len(self.reduce_prompt_template.format(scenario=''))
+        batches, batch, batch_size = [], [], 0
+        for report in reports:
+            size = len(json.dumps(report, default=str))
+            if len(batch) >= 2 and batch_size + size > budget:
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append(report)
+            batch_size += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _merge_reports(self, reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if len(reports) == 1:
+            return reports[0]
+        return self._compact_report(self._run_prompt(self.reduce_prompt_template, {'shard_reports': reports}))
+
+    def _analyze_hierarchical(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map-reduce RCA: summarize shards concurrently, then merge the summaries"""
+        shards = self._build_shards(data)
+        logger.info(f"Evidence exceeds {self.max_prompt_chars} chars, running map-reduce RCA over {len(shards)} shards")
+
+        def analyze_shard(shard):
+            try:
+                return self._compact_report(self._run_prompt(self.shard_prompt_template, shard))
+            except Exception as e:
+                logger.error(f"Error analyzing RCA shard {shard['shard']}: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.shard_workers) as pool:
+            reports = [r for r in pool.map(analyze_shard, shards) if r]
+            if not reports:
+                return {'error': 'All RCA shards failed', 'status': 'error'}
+
+            context = shards[0]['context']
+            # Pre-merge batches of shard reports until the final reduce prompt fits
+            while len(reports) > 1 and self._prompt_size(
+                self.reduce_prompt_template, {'context': context, 'shard_reports': reports}
+            ) > self.max_prompt_chars:
+                reports = list(pool.map(self._merge_reports, self._batch_reports(reports)))
+
+        final_payload = {'context': context, 'shard_reports': reports}
+        if self._prompt_size(self.reduce_prompt_template, final_payload) > self.max_prompt_chars:
+            final_payload['shard_reports'] = [self._compact_report(report, max_items=1) for report in reports]
+        if self._prompt_size(self.reduce_prompt_template, final_payload) > self.max_prompt_chars:
+            raise ValueError(f"Merged RCA report does not fit in {self.max_prompt_chars} chars")
+        final = self._run_prompt(self.reduce_prompt_template, final_payload)
+        return {
+            'rca_report': final,
+            'status': 'success',
+            'source': 'llm',
+            'shards': len(shards)
+        }
+
+    def _analyze_oversized(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Map-reduce analysis for data too large for one prompt, with errors as a result"""
+        try:
+            return self._analyze_hierarchical(data)
+        except Exception as e:
+            logger.error(f"Error in hierarchical RCA analysis: {str(e)}")
+            return {
+                'error': str(e),
+                'status': 'error'
+            }
+
     def analyze_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze the processed data and return structured RCA JSON"""
+        fast_result = self._analyze_with_rules(data)
+        if fast_result:
+            return fast_result
+        scenario = json.dumps(data, indent=2)
+        if len(self.prompt_template.format(scenario=scenario)) > self.max_prompt_chars:
+            return self._analyze_oversized(data)
         try:
-            print("Calling LLM now...")
-            try:
-                result = self.chain.invoke({"scenario": json.dumps(data, indent=2)})
-                print("LLM call finished.")
-                print("LLM result object:", result)
-                output = result.get('text', '')
-                print("LLM output text:", output)
-                print("\n=== RAW LLM OUTPUT ===\n" + output + "\n====================\n")
-            except Exception as llm_exc:
-                print("Exception during LLM call:", llm_exc)
-                raise
+            prompt = self.prompt_template.format(scenario=scenario)
+            output = self.backend.complete(prompt)
             logger.debug(f"Raw LLM output: {output}")
             try:
-                try:
-                    rca_json = json.loads(output)
-                except Exception:
-                    # Try to extract JSON block if direct parse fails
-                    extracted = self._extract_json(output)
-                    rca_json = json.loads(extracted)
-                rca_json = self._normalize_keys(rca_json)
-                rca_json = self._coerce_rca_report(rca_json)
+                rca_json = self._parse_rca_output(output)
                 return {
                     'rca_report': rca_json,
-                    'status': 'success'
+                    'status': 'success',
+                    'source': 'llm'
                 }
             except Exception as e:
                 logger.error(
@@ -197,7 +477,6 @@ class RCAAgent:
                     'raw': output
                 }
         except Exception as e:
-            print("Exception in RCA agent:", e)
             logger.error(
                 f"Error in RCA analysis: {str(e)}"
             )
@@ -206,6 +485,71 @@ class RCAAgent:
                 'status': 'error'
             }
 
+    def stream_analysis(self, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze data, yielding each top-level report section as soon as it is complete
+        
+        Yields events of the form:
+            {'event': 'section', 'key': ..., 'value': ...} for every report section
+            {'event': 'done', 'rca_report': ..., 'source': ...} once the report is complete
+            {'event': 'error', 'error': ...} if the analysis or parsing fails
+        """
+        result = self._analyze_with_rules(data)
+        scenario = json.dumps(data, indent=2)
+        if result is None and len(self.prompt_template.format(scenario=scenario)) > self.max_prompt_chars:
+            # The rules already declined; go straight to map-reduce rather than through analyze_data
+            result = self._analyze_oversized(data)
+        if result is not None:
+            # Fast path and map-reduce reports are complete already
+            if result.get('status') == 'error':
+                yield {'event': 'error', 'error': result.get('error')}
+                return
+            for key, value in result['rca_report'].items():
+                yield {'event': 'section', 'key': key, 'value': value}
+            yield {'event': 'done', 'rca_report': result['rca_report'], 'source': result.get('source')}
+            return
+
+        parser = IncrementalJSONParser()
+        try:
+            for chunk in self.backend.stream(self.prompt_template.format(scenario=scenario)):
+                for key, value in parser.feed(chunk):
+                    section = self._normalize_keys({key: value})
+                    for clean_key, clean_value in section.items():
+                        yield {'event': 'section', 'key': clean_key, 'value': clean_value}
+                if parser.done:
+                    break
+            rca_report = self._coerce_rca_report(self._normalize_keys(parser.close()))
+        except Exception as e:
+            # Parse errors surface here mid-stream, without waiting for the full generation
+            logger.error(f"Error in streaming RCA analysis: {str(e)}. Raw output so far: {parser.buffer}")
+            yield {'event': 'error', 'error': str(e)}
+            return
+        yield {'event': 'done', 'rca_report': rca_report, 'source': 'llm'}
+
+# Process-wide RCA engine, built on first use and shared by all requests
+_shared_rca_agent: Optional[RCAAgent] = None
+_shared_rca_agent_lock = threading.Lock()
+rca_engine_metrics: Dict[str, Any] = {}
+
+
+def get_rca_agent() -> RCAAgent:
+    """Return the shared RCAAgent, constructing it (and its backend) once per process."""
+    global _shared_rca_agent
+    if _shared_rca_agent is None:
+        with _shared_rca_agent_lock:
+            if _shared_rca_agent is None:
+                started = time.perf_counter()
+                agent = RCAAgent()
+                agent.backend.warm_up()
+                rca_engine_metrics['construction_ms'] = (time.perf_counter() - started) * 1000
+                rca_engine_metrics['backend'] = agent.backend.name
+                logger.info(
+                    f"RCA engine constructed in {rca_engine_metrics['construction_ms']:.1f} ms "
+                    f"(backend={agent.backend.name})"
+                )
+                _shared_rca_agent = agent
+    return _shared_rca_agent
+
 if __name__ == "__main__":
     # Minimal test scenario
     test_scenario = {
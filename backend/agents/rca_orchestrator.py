@@ -0,0 +1,67 @@
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+import logging
+
+from agents.data_ingestion_agent import DataIngestionAgent
+from agents.eval_sampling import get_sampling_policy
+from agents.evaluation_agent import EvaluationAgent
+from agents.rca_agent import get_rca_agent
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RCAOrchestrator:
+    def __init__(self, db: Session):
+        self.db = db
+        self.data_agent = DataIngestionAgent(db)
+        self.rca_agent = get_rca_agent()
+        self.eval_agent = EvaluationAgent(db)
+
+    def prepare_analysis_data(self, user_id: int) -> dict:
+        """Reduce the user's traces and attach evaluation metrics for RCA"""
+        # Process traces
+        self.data_agent.process_traces(user_id=user_id)
+        
+        # Get analysis data
+        analysis_data = self.data_agent.get_analysis_data()
+        
+        # Get evaluation metrics, on a risk-aware sample when sampling is enabled
+        interactions = analysis_data['data']['interactions']
+        if settings.EVAL_SAMPLING_ENABLED:
+            interactions = get_sampling_policy().select(
+                self.db, user_id, interactions, self.data_agent.get_risky_trace_ids()
+            )
+        eval_metrics = self.eval_agent.evaluate_metrics(user_id, interactions)
+        
+        # Add evaluation metrics to analysis data
+        analysis_data['data']['evaluation_metrics'] = eval_metrics
+        return analysis_data
+
+    def analyze_user_data(self, user_id: int) -> dict:
+        """Analyze user data"""
+        try:
+            analysis_data = self.prepare_analysis_data(user_id)
+            
+            # Get RCA analysis
+            rca_result = self.rca_agent.analyze_data(analysis_data)
+            
+            if rca_result.get('status') == 'error':
+                error_msg = rca_result.get('error', 'Unknown error')
+                logger.error(f"RCA analysis failed: {error_msg}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error in RCA analysis: {error_msg}"
+                )
+            
+            return {
+                'user_id': user_id,
+                'rca_result': rca_result['rca_report']
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in RCA analysis: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error performing RCA analysis: {str(e)}"
+            )
@@ -0,0 +1,191 @@
+from typing import Dict, Any, Callable, Optional, Set
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+
+from sqlalchemy.orm import Session
+
+from agents.leases import claim_lease, finish_lease, heartbeat_lease
+from api.database.database import SessionLocal
+from api.models.database import RCAJob, TestResult
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_rca_job(db: Session, test_result: TestResult, test_config: Dict[str, Any]) -> RCAJob:
+    """Queue RCA for a saved failed run and wake the workers of this process"""
+    job = RCAJob(test_result_id=test_result.id, test_config=test_config, status='queued')
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Queued RCA job {job.id} for test result {test_result.id}")
+    get_rca_job_worker().notify()
+    return job
+
+
+def run_job_with_test_agent(db: Session, job: RCAJob) -> Dict[str, Any]:
+    from agents.test_execution_agent import TestExecutionAgent
+    test_agent = TestExecutionAgent(db)
+    test_result = job.test_result
+    eval_result = json.loads(test_result.result) if isinstance(test_result.result, str) else test_result.result
+    # An earlier job may have opened an incident for the same failure while this one waited
+    recurring = test_agent._attach_to_open_incident(test_result.fingerprint)
+    if recurring:
+        return {'status': 'failed', 'incident_id': recurring.id, 'reused_rca': True}
+    return test_agent.run_rca(job.test_config, test_result, eval_result)
+
+
+class RCAJobWorker:
+    """Worker coroutines draining the rca_jobs table.
+
+    Each worker claims one job at a time and runs it in a thread, so at most
+    `concurrency` RCAs run at once per process. Workers sleep until
+    enqueue_rca_job notifies them, polling every poll_seconds for jobs
+    queued by other processes or left behind by a crashed worker. While a
+    job runs its lease is extended every heartbeat_seconds, so a long RCA
+    keeps it and a dead worker loses it once lease_seconds pass. Failed
+    jobs go back on the queue until they have used max_attempts.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        run_job: Optional[Callable[[Session, RCAJob], Dict[str, Any]]] = None,
+        concurrency: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        worker_id: Optional[str] = None
+    ):
+        self.session_factory = session_factory or SessionLocal
+        self.run_job = run_job or run_job_with_test_agent
+        self.concurrency = concurrency or settings.RCA_QUEUE_WORKERS
+        self.poll_seconds = poll_seconds or settings.RCA_QUEUE_POLL_SECONDS
+        self.lease_seconds = lease_seconds or settings.RCA_JOB_LEASE_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds or settings.RCA_JOB_HEARTBEAT_SECONDS
+        self.max_attempts = max_attempts or settings.RCA_JOB_MAX_ATTEMPTS
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self.lost_leases = 0
+
+    def notify(self) -> None:
+        """Wake idle workers; safe to call from request threads"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._workers = {asyncio.create_task(self._work()) for _ in range(self.concurrency)}
+        logger.info(f"RCA job queue started with {self.concurrency} workers")
+
+    async def stop(self) -> None:
+        self._loop = None
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = set()
+
+    async def _work(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if await asyncio.to_thread(self.process_next):
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def process_next(self) -> bool:
+        """
+        Claim and run one job, heartbeating until it finishes
+
+        Returns:
+            False when the queue was empty
+        """
+        db = self.session_factory()
+        try:
+            try:
+                job = claim_lease(db, RCAJob, self.worker_id, self.lease_seconds, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Error claiming RCA job: {str(e)}")
+                db.rollback()
+                return False
+            if job is None:
+                return False
+            job_id = job.id
+            logger.info(f"Worker {self.worker_id} running RCA job {job_id} (attempt {job.attempts})")
+            finished = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job_id, finished), daemon=True)
+            heartbeat.start()
+            try:
+                result = self.run_job(db, job)
+                error = result.get('error') if result.get('status') == 'error' else None
+            except Exception as e:
+                logger.error(f"Error running RCA job {job_id}: {str(e)}", exc_info=True)
+                db.rollback()
+                result, error = {}, str(e)
+            finally:
+                finished.set()
+                heartbeat.join()
+            self._finish(db, job_id, result, error)
+            return True
+        finally:
+            db.close()
+
+    def _heartbeat(self, job_id: int, finished: threading.Event) -> None:
+        """Extend the job's lease on a session of its own until the job finishes"""
+        while not finished.wait(self.heartbeat_seconds):
+            db = self.session_factory()
+            try:
+                if not heartbeat_lease(db, RCAJob, job_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f"RCA job {job_id} lease lost by {self.worker_id}; its outcome will be discarded")
+                    return
+            except Exception as e:
+                logger.error(f"Error extending RCA job {job_id} lease: {str(e)}")
+                db.rollback()
+            finally:
+                db.close()
+
+    def _finish(self, db: Session, job_id: int, result: Dict[str, Any], error: Optional[str]) -> bool:
+        """
+        Record a job's outcome, requeueing it when it errored with attempts left
+
+        Returns:
+            False if the lease was lost meanwhile; the outcome is then discarded
+        """
+        status = finish_lease(
+            db, RCAJob, job_id, self.worker_id, error, self.max_attempts,
+            values={'incident_id': result.get('incident_id')} if error is None else None
+        )
+        if status is None:
+            self.lost_leases += 1
+        elif status == 'completed':
+            self.completed += 1
+        elif status == 'failed':
+            self.failed += 1
+        return status is not None
+
+_shared_worker: Optional[RCAJobWorker] = None
+_shared_worker_lock = threading.Lock()
+
+
+def get_rca_job_worker() -> RCAJobWorker:
+    """Return the process-wide worker pool that enqueue_rca_job notifies."""
+    global _shared_worker
+    if _shared_worker is None:
+        with _shared_worker_lock:
+            if _shared_worker is None:
+                _shared_worker = RCAJobWorker()
+    return _shared_worker
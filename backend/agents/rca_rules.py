@@ -0,0 +1,193 @@
+from typing import Dict, List, Any, Optional, Tuple
+from datetime import datetime
+import logging
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Keyword -> resolution template, checked in order against the error message
+RESOLUTION_RULES = [
+    (('timeout', 'timed out'), "Review timeouts and retry policy for {service}"),
+    (('down', 'unavailable', 'connection refused', '503', '500'),
+     "Restore {service} availability and add a health check or circuit breaker"),
+    (('rate limit', '429', 'quota'), "Raise rate limits or add backoff for calls to {service}"),
+    (('not found', '404', 'missing'), "Validate required inputs and referenced data before calling {service}"),
+    (('invalid', 'failed to parse', 'conversion'), "Fix input validation and conversion in {service}"),
+]
+
+
+class RuleBasedRCA:
+    """Deterministic fast-path RCA over reduced analysis data.
+
+    Error logs are paired with error spans by trace_id, or by the log
+    timestamp falling inside the span when logs carry no trace_id, and
+    the failure is attributed to the service that logged the error. The
+    result fills the same schema the LLM produces, together with a
+    confidence score; callers fall back to the LLM when it is too low.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None):
+        self.min_confidence = (
+            settings.RCA_RULES_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        )
+
+    def _parse_time(self, value: Any) -> Optional[datetime]:
+        if not value or not isinstance(value, str):
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            return None
+
+    def _collect(self, data: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Normalize logs and spans from either the reduced or the raw scenario shape"""
+        reduced = data.get('data') if isinstance(data.get('data'), dict) else {}
+        logs = []
+        # Reduced logs keep the DB row id as trace_id and the span id in context
+        for log in reduced.get('logs', []):
+            context = log.get('context') or {}
+            logs.append({
+                'log_id': str(log.get('trace_id') or ''),
+                'trace_id': context.get('trace_id'),
+                'level': str(log.get('level') or 'INFO').upper(),
+                'service': log.get('service'),
+                'message': log.get('message') or '',
+                'timestamp': log.get('timestamp') or ''
+            })
+        for log in data.get('prod_logs', []):
+            logs.append({
+                'log_id': str(log.get('log_id') or ''),
+                'trace_id': log.get('trace_id'),
+                'level': str(log.get('log_level') or log.get('level') or 'INFO').upper(),
+                'service': log.get('service'),
+                'message': log.get('message') or '',
+                'timestamp': log.get('timestamp') or ''
+            })
+        spans = []
+        for span in reduced.get('spans', []) + data.get('traces', []):
+            spans.append({
+                'trace_id': span.get('trace_id'),
+                'service': span.get('service'),
+                'operation': span.get('operation'),
+                'status': str(span.get('status') or '').upper(),
+                'start_time': span.get('start_time'),
+                'end_time': span.get('end_time')
+            })
+        return logs, spans
+
+    def _match_span(self, log: Dict[str, Any], spans: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if log['trace_id']:
+            for span in spans:
+                if span['trace_id'] == log['trace_id']:
+                    return span
+        log_time = self._parse_time(log['timestamp'])
+        if log_time is None:
+            return None
+        for span in spans:
+            start = self._parse_time(span['start_time'])
+            end = self._parse_time(span['end_time'])
+            if start and end and start <= log_time <= end:
+                return span
+        return None
+
+    def _resolution(self, service: str, message: str) -> Dict[str, str]:
+        lowered = message.lower()
+        for keywords, template in RESOLUTION_RULES:
+            if any(keyword in lowered for keyword in keywords):
+                return {
+                    'action': template.format(service=service),
+                    'status': 'pending',
+                    'details': f"Triggered by error: {message}"
+                }
+        return {
+            'action': f"Investigate the {service} error",
+            'status': 'pending',
+            'details': f"Triggered by error: {message}"
+        }
+
+    def _failed_metrics(self, data: Dict[str, Any]) -> List[str]:
+        test_result = data.get('test_result') or {}
+        return sorted(
+            name for name, result in test_result.items()
+            if isinstance(result, dict) and result.get('passed') is False
+        )
+
+    def analyze(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return {'rca_report', 'confidence'} or None when no rule applies"""
+        logs, spans = self._collect(data)
+        error_logs = [log for log in logs if log['level'] in ('ERROR', 'CRITICAL', 'FATAL')]
+        if not error_logs:
+            return None
+        error_spans = [span for span in spans if span['status'] == 'ERROR']
+
+        primary = error_logs[0]
+        span = self._match_span(primary, error_spans)
+        service = primary['service'] or (span or {}).get('service') or 'unknown'
+        distinct_errors = {(log['service'], log['message']) for log in error_logs}
+
+        # One distinct error tied to a failed span is the common, unambiguous case
+        if len(distinct_errors) == 1:
+            confidence = 0.9 if span else 0.7
+        else:
+            confidence = 0.4
+        if service == 'unknown':
+            confidence -= 0.2
+
+        trace_id = (span or {}).get('trace_id') or primary['trace_id'] or ''
+        summary = f"{service} error: {primary['message']}"
+        root_cause = f"The {service} service logged '{primary['message']}' at {primary['timestamp']}"
+        if span:
+            root_cause += (
+                f", failing trace {trace_id} "
+                f"({span['service']}/{span['operation']})"
+            )
+        root_cause += "."
+
+        contributing_factors = [
+            {
+                'title': f"{log['service'] or 'unknown'} error",
+                'details': log['message'],
+                'log_id': log['log_id'],
+                'trace_id': (self._match_span(log, error_spans) or {}).get('trace_id') or log['trace_id'] or '',
+                'timestamp': log['timestamp']
+            }
+            for log in error_logs
+        ]
+        failed_metrics = self._failed_metrics(data)
+        if failed_metrics:
+            contributing_factors.append({
+                'title': 'Failed evaluation metrics',
+                'details': ', '.join(failed_metrics),
+                'log_id': '',
+                'trace_id': '',
+                'timestamp': data.get('timestamp', '')
+            })
+
+        events = sorted(
+            [
+                (log['timestamp'], f"{log['service'] or 'unknown'} {log['level']}", log['message'])
+                for log in logs
+            ] + [
+                (s['end_time'] or '', f"{s['service']} span {s['trace_id']} failed", s['operation'] or '')
+                for s in error_spans
+            ],
+            key=lambda event: event[0] or ''
+        )
+        replay = [
+            {'step': i + 1, 'title': title, 'details': details, 'timestamp': timestamp}
+            for i, (timestamp, title, details) in enumerate(events)
+        ]
+
+        resolution = [self._resolution(service, primary['message'])]
+
+        return {
+            'rca_report': {
+                'summary': summary,
+                'root_cause': root_cause,
+                'contributing_factors': contributing_factors,
+                'replay': replay,
+                'resolution': resolution
+            },
+            'confidence': round(max(confidence, 0.0), 2)
+        }
@@ -0,0 +1,229 @@
+from typing import Dict, List, Any, Callable, Optional, Set, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import logging
+import random
+import threading
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from api.database.database import SessionLocal
+from api.models.database import TestResult
+from api.models.test_schedule import TestSchedule
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_fire_time(schedule: TestSchedule) -> datetime:
+    """When a schedule is due; dates and times are stored as naive UTC"""
+    return datetime.combine(schedule.date, schedule.time)
+
+
+def build_test_config(db: Session, schedule: TestSchedule) -> Dict[str, Any]:
+    """
+    Rebuild a runnable test config, preferring the last recorded run of the same test
+
+    The schedule's owner and project go into the config so the run's RCA
+    context is scoped to their traces.
+    """
+    owner = {'user_id': schedule.user_id, 'project_id': schedule.project_id}
+    previous = db.query(TestResult).filter(
+        TestResult.test_name == schedule.test_name
+    ).order_by(TestResult.created_at.desc()).first()
+    if previous:
+        return {
+            'test_name': previous.test_name,
+            'instruction': previous.instruction,
+            'agent': previous.agent,
+            'environment': previous.environment,
+            'expected_behavior': previous.expected_behavior,
+            **owner
+        }
+    tags = dict(
+        tag.split(':', 1) for tag in (schedule.tags or '').split(',') if ':' in tag
+    )
+    return {
+        'test_name': schedule.test_name,
+        'instruction': schedule.description or schedule.test_name,
+        'agent': tags.get('agent', 'Unknown Agent'),
+        'environment': tags.get('env', 'Development'),
+        'expected_behavior': schedule.description or '',
+        **owner
+    }
+
+
+def run_with_test_agent(db: Session, test_config: Dict[str, Any]) -> Dict[str, Any]:
+    from agents.test_execution_agent import TestExecutionAgent
+    return TestExecutionAgent(db).execute_test(test_config)
+
+
+class ScheduleDaemon:
+    """In-process scheduler that runs TestSchedule entries when they fall due.
+
+    Pending schedules sit in a min-heap keyed by fire time and the loop
+    sleeps until the earliest one, or until a route reports a change via
+    notify_upsert / notify_delete. Edits push a fresh heap entry and the
+    superseded one is skipped when it surfaces, so nothing polls the table
+    after the initial load. Runs are claimed by stamping last_run_at in a
+    conditional UPDATE that also matches the fire time, which keeps several
+    processes from running the same schedule twice or at a time it was
+    edited away from.
+
+    Schedules are one-shot: the table has no recurrence or interval column,
+    so once a run is claimed the entry stays done until it is edited to a
+    later date or time.
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        execute: Optional[Callable[[Session, Dict[str, Any]], Dict[str, Any]]] = None,
+        max_concurrency: Optional[int] = None,
+        jitter_seconds: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.session_factory = session_factory or SessionLocal
+        self.execute = execute or run_with_test_agent
+        self.max_concurrency = max_concurrency or settings.SCHEDULER_MAX_CONCURRENCY
+        self.jitter_seconds = settings.SCHEDULER_JITTER_SECONDS if jitter_seconds is None else jitter_seconds
+        self.rng = random.Random(seed)
+        self._heap: List[Tuple[datetime, int, datetime]] = []
+        self._pending: Dict[int, datetime] = {}  # schedule id -> fire time of its live heap entry
+        self._running: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.runs = 0
+
+    # Heap maintenance, always on the event loop thread
+
+    def _upsert(self, schedule_id: int, fire_at: datetime) -> None:
+        due = fire_at + timedelta(seconds=self.rng.uniform(0, self.jitter_seconds))
+        self._pending[schedule_id] = fire_at
+        heapq.heappush(self._heap, (due, schedule_id, fire_at))
+        self._wakeup.set()
+
+    def _delete(self, schedule_id: int) -> None:
+        self._pending.pop(schedule_id, None)
+        self._wakeup.set()
+
+    def _load(self) -> List[Tuple[int, datetime]]:
+        db = self.session_factory()
+        try:
+            return [
+                (schedule.id, schedule_fire_time(schedule))
+                for schedule in db.query(TestSchedule).all()
+                if schedule.last_run_at is None or schedule.last_run_at < schedule_fire_time(schedule)
+            ]
+        finally:
+            db.close()
+
+    # Notifications from request threads
+
+    def notify_upsert(self, schedule: TestSchedule) -> None:
+        """Schedule or reschedule an entry after it was created or edited"""
+        if self._loop is None:
+            return
+        fire_at = schedule_fire_time(schedule)
+        if schedule.last_run_at is not None and schedule.last_run_at >= fire_at:
+            self._loop.call_soon_threadsafe(self._delete, schedule.id)
+        else:
+            self._loop.call_soon_threadsafe(self._upsert, schedule.id, fire_at)
+
+    def notify_delete(self, schedule_id: int) -> None:
+        """Drop an entry after it was deleted"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._delete, schedule_id)
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for task in list(self._running):
+            task.cancel()
+        self._loop = None
+
+    async def run(self) -> None:
+        for schedule_id, fire_at in await asyncio.to_thread(self._load):
+            # A notification that raced the initial load is newer than the snapshot
+            if schedule_id not in self._pending:
+                self._upsert(schedule_id, fire_at)
+        logger.info(f"Schedule daemon started with {len(self._pending)} pending schedules")
+
+        while True:
+            self._wakeup.clear()
+            now = datetime.utcnow()
+            # Discard entries superseded by an edit or removed by a delete
+            while self._heap and self._pending.get(self._heap[0][1]) != self._heap[0][2]:
+                heapq.heappop(self._heap)
+            if self._heap and self._heap[0][0] <= now:
+                _, schedule_id, fire_at = heapq.heappop(self._heap)
+                del self._pending[schedule_id]
+                task = asyncio.create_task(self._dispatch(schedule_id, fire_at))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                continue
+            timeout = (self._heap[0][0] - now).total_seconds() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _dispatch(self, schedule_id: int, fire_at: datetime) -> None:
+        async with self._semaphore:
+            await asyncio.to_thread(self._execute, schedule_id, fire_at)
+
+    def _execute(self, schedule_id: int, fire_at: datetime) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            # A replica holding a stale heap entry must not run a schedule edited elsewhere
+            claimed = db.query(TestSchedule).filter(
+                TestSchedule.id == schedule_id,
+                TestSchedule.date == fire_at.date(),
+                TestSchedule.time == fire_at.time(),
+                or_(TestSchedule.last_run_at.is_(None), TestSchedule.last_run_at < fire_at)
+            ).update({TestSchedule.last_run_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                logger.info(f"Schedule {schedule_id} was already run, edited or deleted; skipping")
+                return None
+            schedule = db.query(TestSchedule).filter(TestSchedule.id == schedule_id).first()
+            test_config = build_test_config(db, schedule)
+            logger.info(f"Running scheduled test {test_config['test_name']} (schedule {schedule_id})")
+            self.runs += 1
+            return self.execute(db, test_config)
+        except Exception as e:
+            logger.error(f"Error running schedule {schedule_id}: {str(e)}", exc_info=True)
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+
+_shared_daemon: Optional[ScheduleDaemon] = None
+_shared_daemon_lock = threading.Lock()
+
+
+def get_schedule_daemon() -> ScheduleDaemon:
+    """Return the process-wide daemon that the schedule routes notify."""
+    global _shared_daemon
+    if _shared_daemon is None:
+        with _shared_daemon_lock:
+            if _shared_daemon is None:
+                _shared_daemon = ScheduleDaemon()
+    return _shared_daemon
@@ -1,24 +1,32 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from agents.evaluation_agent import EvaluationAgent
-from agents.rca_agent import RCAAgent
-from api.models.database import TestResult, Incident
+from agents.rca_agent import get_rca_agent
+from api.models.database import TestResult, Incident, Project, ProjectMember, RCAJob
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 from agents.data_ingestion_agent import DataIngestionAgent
+from agents.fingerprint import compute_failure_fingerprint
+from agents.rca_queue import enqueue_rca_job
+from agents.flaky_stats import record_test_run
+from api.database.database import SessionLocal
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 print("Sanity scheduler script started")
 
 class TestExecutionAgent:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, session_factory: Optional[Callable[[], Session]] = None):
         self.db = db
+        self.session_factory = session_factory or SessionLocal  # Sessions for batch workers
         self.eval_agent = EvaluationAgent(db)
-        self.rca_agent = RCAAgent()  # RCAAgent doesn't need db session
+        self.rca_agent = get_rca_agent()  # Shared per process, doesn't need db session
         
-    def execute_test(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+    def execute_test(self, test_config: Dict[str, Any], defer_rca: bool = False) -> Dict[str, Any]:
         """
         Execute a test based on the provided configuration
         
@@ -29,9 +37,11 @@ class TestExecutionAgent:
                 - agent: Agent to test
                 - environment: Environment to run test in
                 - expected_behavior: Expected behavior description
+            defer_rca: Queue RCA for a failed run instead of running it inline
                 
         Returns:
-            Dictionary containing test results and RCA if test failed
+            Dictionary containing test results and RCA if test failed, or the
+            queued RCA job when defer_rca is set
         """
         try:
             # Validate required fields
@@ -57,13 +67,17 @@ class TestExecutionAgent:
                 
             logger.debug(f"Evaluation result: {json.dumps(eval_result, indent=2)}")
             
-            # Check if test passed based on evaluation metrics
-            test_passed = all(
-                result['passed'] 
-                for result in eval_result.values() 
+            # Check if test passed based on evaluation metrics; one that errored or timed out fails it
+            metric_results = [
+                result for result in eval_result.values()
                 if isinstance(result, dict) and 'passed' in result
+            ]
+            test_passed = bool(metric_results) and all(
+                result['passed'] and result.get('error') is None
+                for result in metric_results
             )
             logger.info(f"Test {'passed' if test_passed else 'failed'}")
+            fingerprint = None if test_passed else compute_failure_fingerprint(test_config, eval_result)
             
             # Save test result
             logger.info("Saving test result to database...")
@@ -74,79 +88,41 @@ class TestExecutionAgent:
                 environment=test_config['environment'],
                 expected_behavior=test_config['expected_behavior'],
                 status='passed' if test_passed else 'failed',
-                result=json.dumps(eval_result),
+                result=eval_result,
+                **TestResult.score_columns(eval_result),
                 details='Test passed successfully.' if test_passed else 'Test failed.',
+                fingerprint=fingerprint,
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow(),
             )
             self.db.add(db_test_result)
+            self._record_run_stats(db_test_result)
             self.db.commit()
             self.db.refresh(db_test_result)
             logger.info(f"Test result saved with ID: {db_test_result.id}")
 
             # If test failed, trigger RCA and create incident
             if not test_passed:
-                logger.info("Test failed, extracting context and triggering RCA...")
-                # Extract relevant logs, traces, metrics using DataIngestionAgent
-                data_agent = DataIngestionAgent(self.db)
-                # You may want to filter by user, agent, or test name if available
-                # For now, we use all available data
-                analysis_data = data_agent.get_analysis_data()
-                # Add test result and config to the context
-                analysis_data['test_name'] = test_config['test_name']
-                analysis_data['test_result'] = eval_result
-                analysis_data['environment'] = test_config['environment']
-                analysis_data['agent'] = test_config['agent']
-                analysis_data['timestamp'] = datetime.utcnow().isoformat()
-                logger.debug(f"RCA input context: {json.dumps(analysis_data, indent=2)}")
-                rca_result = self.rca_agent.analyze_data(analysis_data)
-                logger.debug(f"RCA result: {json.dumps(rca_result, indent=2)}")
-
-                if rca_result.get('status') == 'error':
-                    error_msg = rca_result.get('error', 'Unknown error in RCA analysis')
-                    logger.error(f"RCA analysis failed: {error_msg}")
-                    self.db.rollback()
+                # The same failure already has an open incident: reuse its RCA
+                recurring = self._attach_to_open_incident(fingerprint)
+                if recurring:
                     return {
-                        'status': 'error',
-                        'error': error_msg,
-                        'test_result': eval_result
+                        'status': 'failed',
+                        'test_result': eval_result,
+                        'rca_report': recurring.rca_report,
+                        'incident_id': recurring.id,
+                        'reused_rca': True
                     }
 
-                if not rca_result.get('rca_report'):
-                    error_msg = "RCA agent did not return a report"
-                    logger.error(error_msg)
-                    self.db.rollback()
+                if defer_rca:
+                    job = enqueue_rca_job(self.db, db_test_result, test_config)
                     return {
-                        'status': 'error',
-                        'error': error_msg,
-                        'test_result': eval_result
+                        'status': 'failed',
+                        'test_result': eval_result,
+                        'rca_job_id': job.id,
+                        'rca_status': job.status
                     }
-
-                # Create incident record
-                logger.info("Creating incident record...")
-                incident = Incident(
-                    title=f"Test Failure: {test_config['test_name']}",
-                    description=rca_result['rca_report'],
-                    status='open',
-                    severity='medium',
-                    agent=test_config['agent'],
-                    test_result_id=db_test_result.id,
-                    rca_report=rca_result['rca_report'],
-                    created_at=datetime.utcnow(),
-                    updated_at=datetime.utcnow(),
-                )
-                self.db.add(incident)
-                self.db.commit()
-                self.db.refresh(incident)
-                incident_id = incident.id
-                logger.info(f"Incident created with ID: {incident_id}")
-                
-                return {
-                    'status': 'failed',
-                    'test_result': eval_result,
-                    'rca_report': rca_result['rca_report'],
-                    'incident_id': incident_id
-                }
+                return self.run_rca(test_config, db_test_result, eval_result)
             
             # Return passed test result
             logger.info("Test completed successfully")
@@ -170,21 +146,281 @@ class TestExecutionAgent:
                 'error': str(e)
             }
     
-    def execute_batch_tests(self, test_configs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def rca_analysis_data(
+        self,
+        test_config: Dict[str, Any],
+        eval_result: Dict[str, Any],
+        run_at: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """RCA input for one run: the traces around it plus the test and its scores"""
+        run_at = run_at or datetime.utcnow()
+        # Extract the logs, traces and metrics around this run using DataIngestionAgent
+        analysis_data = self._collect_rca_context(test_config, run_at)
+        # Add test result and config to the context
+        analysis_data['test_name'] = test_config['test_name']
+        analysis_data['test_result'] = eval_result
+        analysis_data['environment'] = test_config['environment']
+        analysis_data['agent'] = test_config['agent']
+        analysis_data['timestamp'] = run_at.isoformat()
+        return analysis_data
+
+    def saved_run_analysis_data(self, test_result: TestResult) -> Dict[str, Any]:
+        """
+        RCA input for a run saved earlier, as of when it ran
+
+        The config queued with its RCA job carries the test's owner; without
+        a job it is rebuilt from the result's own columns.
+        """
+        job = self.db.query(RCAJob).filter(RCAJob.test_result_id == test_result.id).first()
+        test_config = job.test_config if job else {
+            'test_name': test_result.test_name,
+            'instruction': test_result.instruction,
+            'agent': test_result.agent,
+            'environment': test_result.environment,
+            'expected_behavior': test_result.expected_behavior
+        }
+        eval_result = json.loads(test_result.result) if isinstance(test_result.result, str) else test_result.result
+        return self.rca_analysis_data(test_config, eval_result, run_at=test_result.created_at)
+
+    def run_rca(self, test_config: Dict[str, Any], test_result: TestResult, eval_result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run RCA for a saved failed run and open an incident for it
+        
+        Called inline by execute_test, or later by the RCA job queue.
+        """
+        logger.info("Test failed, extracting context and triggering RCA...")
+        analysis_data = self.rca_analysis_data(test_config, eval_result)
+        logger.debug(f"RCA input context: {json.dumps(analysis_data, indent=2)}")
+        rca_result = self.rca_agent.analyze_data(analysis_data)
+        logger.debug(f"RCA result: {json.dumps(rca_result, indent=2)}")
+
+        if rca_result.get('status') == 'error':
+            error_msg = rca_result.get('error', 'Unknown error in RCA analysis')
+            logger.error(f"RCA analysis failed: {error_msg}")
+            self.db.rollback()
+            return {
+                'status': 'error',
+                'error': error_msg,
+                'test_result': eval_result
+            }
+
+        if not rca_result.get('rca_report'):
+            error_msg = "RCA agent did not return a report"
+            logger.error(error_msg)
+            self.db.rollback()
+            return {
+                'status': 'error',
+                'error': error_msg,
+                'test_result': eval_result
+            }
+
+        # Create incident record
+        logger.info("Creating incident record...")
+        incident = Incident(
+            title=f"Test Failure: {test_config['test_name']}",
+            description=rca_result['rca_report'],
+            status='open',
+            severity='medium',
+            agent=test_config['agent'],
+            test_result_id=test_result.id,
+            rca_report=rca_result['rca_report'],
+            fingerprint=test_result.fingerprint,
+            occurrence_count=1,
+            last_seen_at=datetime.utcnow(),
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow(),
+        )
+        self.db.add(incident)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # The failure already has an open incident, opened by another worker
+            # while this RCA ran, or one without a report; count the run there
+            self.db.rollback()
+            recorded = self._record_on_open_incident(test_result.fingerprint, rca_result['rca_report'], eval_result)
+            if recorded:
+                return recorded
+            # It was closed meanwhile, so this run opens the next one
+            self.db.add(incident)
+            self.db.commit()
+        self.db.refresh(incident)
+        incident_id = incident.id
+        logger.info(f"Incident created with ID: {incident_id}")
+        
+        return {
+            'status': 'failed',
+            'test_result': eval_result,
+            'rca_report': rca_result['rca_report'],
+            'incident_id': incident_id
+        }
+
+    def _record_run_stats(self, test_result: TestResult) -> None:
+        """Fold the run into its flakiness statistics, committed with the result itself"""
+        try:
+            with self.db.begin_nested():
+                record_test_run(
+                    self.db, test_result.test_name, test_result.agent,
+                    test_result.status == 'passed', test_result.created_at
+                )
+        except Exception as e:
+            # Statistics are best effort; never lose the result over them
+            logger.error(f"Error updating test stats: {str(e)}")
+
+    def _owner_user_ids(self, test_config: Dict[str, Any]) -> Optional[List[int]]:
+        """Users whose traces belong to the test: its user, or every member of its project"""
+        if test_config.get('user_id') is not None:
+            return [test_config['user_id']]
+        if test_config.get('project_id') is not None:
+            project = self.db.query(Project).filter(Project.id == test_config['project_id']).first()
+            if not project:
+                return []
+            member_ids = {
+                member_id for (member_id,) in self.db.query(ProjectMember.user_id).filter(
+                    ProjectMember.project_id == project.id,
+                    ProjectMember.user_id.isnot(None)
+                )
+            }
+            return sorted(member_ids | {project.owner_id})
+        return None
+
+    def _collect_rca_context(self, test_config: Dict[str, Any], run_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Reduce only the traces relevant to a failed run
+        
+        Scoped to the test's owning user or project, its agent and environment,
+        and the RCA_CONTEXT_WINDOW_MINUTES before the run (now by default).
+        """
+        data_agent = DataIngestionAgent(self.db)
+        run_at = run_at or datetime.utcnow()
+        user_ids = self._owner_user_ids(test_config)
+        if user_ids is None:
+            logger.warning(
+                f"Test {test_config['test_name']} has no user_id or project_id; "
+                f"RCA context is scoped by agent, environment and time only"
+            )
+        try:
+            data_agent.process_traces(
+                user_ids=user_ids,
+                agent=test_config['agent'],
+                environment=test_config['environment'],
+                since=run_at - timedelta(minutes=settings.RCA_CONTEXT_WINDOW_MINUTES),
+                until=run_at + timedelta(seconds=1),
+                max_traces=settings.RCA_CONTEXT_MAX_TRACES
+            )
+        except Exception as e:
+            # RCA can still work from the test result alone
+            logger.error(f"Error collecting RCA context: {str(e)}")
+        return data_agent.get_analysis_data()
+
+    def _open_incident(self, fingerprint: str) -> Optional[Incident]:
+        """
+        The open incident with this fingerprint, locked until the next commit or rollback
+
+        The lock makes concurrent runs bump its count one after another;
+        ux_incidents_open_fingerprint keeps the match unique.
+        """
+        return self.db.query(Incident).filter(
+            Incident.fingerprint == fingerprint,
+            Incident.status == 'open'
+        ).with_for_update().first()
+
+    def _attach_to_open_incident(self, fingerprint: str):
+        """
+        Attach a failed run to the open incident with the same fingerprint
+        
+        An incident without an RCA report is left alone, so the run goes
+        on to its own RCA and run_rca fills the report in.
+
+        Returns:
+            The matching Incident with its occurrence count bumped, or None
+        """
+        incident = self._open_incident(fingerprint)
+        if not incident or not incident.rca_report:
+            # Release the lock before the RCA runs
+            self.db.rollback()
+            return None
+        incident.occurrence_count = (incident.occurrence_count or 1) + 1
+        incident.last_seen_at = datetime.utcnow()
+        self.db.commit()
+        logger.info(
+            f"Run matches open incident {incident.id} (fingerprint {fingerprint}), "
+            f"reusing its RCA report"
+        )
+        return incident
+
+    def _record_on_open_incident(
+        self,
+        fingerprint: str,
+        rca_report: Dict[str, Any],
+        eval_result: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Count a run whose new incident collided with an open one, giving it this report if it has none
+
+        Returns:
+            The run's result, or None if that incident is no longer open
+        """
+        incident = self._open_incident(fingerprint)
+        if incident is None:
+            self.db.rollback()
+            return None
+        incident.occurrence_count = (incident.occurrence_count or 1) + 1
+        incident.last_seen_at = datetime.utcnow()
+        reused = bool(incident.rca_report)
+        if not reused:
+            incident.rca_report = rca_report
+            incident.description = rca_report
+        self.db.commit()
+        logger.info(f"Run attached to open incident {incident.id} (fingerprint {fingerprint})")
+        result = {
+            'status': 'failed',
+            'test_result': eval_result,
+            'rca_report': incident.rca_report,
+            'incident_id': incident.id
+        }
+        if reused:
+            result['reused_rca'] = True
+        return result
+
+    def _execute_in_own_session(self, test_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one test on a fresh session; Session objects must not be shared across threads"""
+        db = self.session_factory()
+        try:
+            worker = TestExecutionAgent(db, session_factory=self.session_factory)
+            worker.rca_agent = self.rca_agent
+            worker.eval_agent.scorers = self.eval_agent.scorers
+            return worker.execute_test(test_config)
+        except Exception as e:
+            logger.error(f"Error executing test {test_config.get('test_name')}: {str(e)}", exc_info=True)
+            return {
+                'status': 'error',
+                'error': str(e)
+            }
+        finally:
+            db.close()
+
+    def execute_batch_tests(
+        self,
+        test_configs: List[Dict[str, Any]],
+        max_workers: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        Execute multiple tests in batch
+        Execute multiple tests concurrently, each worker on its own session
         
         Args:
             test_configs: List of test configurations
+            max_workers: Tests run at once, defaults to TEST_BATCH_WORKERS
             
         Returns:
-            List of test results
+            List of test results, in the same order as test_configs
         """
-        results = []
-        for config in test_configs:
-            result = self.execute_test(config)
-            results.append({
+        max_workers = max(1, min(max_workers or settings.TEST_BATCH_WORKERS, len(test_configs) or 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outcomes = list(executor.map(self._execute_in_own_session, test_configs))
+        return [
+            {
                 'test_name': config['test_name'],
                 'result': result
-            })
-        return results 
\ No newline at end of file
+            }
+            for config, result in zip(test_configs, outcomes)
+        ]
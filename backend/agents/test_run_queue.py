@@ -0,0 +1,165 @@
+from typing import Dict, List, Any, Callable, Optional, Set, Tuple
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import uuid
+
+from sqlalchemy.orm import Session
+
+from agents.leases import claim_lease, finish_lease, heartbeat_lease
+from api.database.database import SessionLocal
+from api.models.database import TestRun
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_test_runs(db: Session, test_configs: List[Dict[str, Any]]) -> Tuple[str, List[TestRun]]:
+    """Queue a suite of tests for any worker process to pick up"""
+    suite_id = str(uuid.uuid4())
+    runs = [TestRun(suite_id=suite_id, test_config=config, status='queued') for config in test_configs]
+    db.add_all(runs)
+    db.commit()
+    logger.info(f"Queued suite {suite_id} with {len(runs)} tests")
+    return suite_id, runs
+
+
+def run_with_test_agent(db: Session, test_config: Dict[str, Any]) -> Dict[str, Any]:
+    from agents.test_execution_agent import TestExecutionAgent
+    return TestExecutionAgent(db).execute_test(test_config, defer_rca=settings.RCA_QUEUE_ENABLED)
+
+
+class TestRunWorker:
+    """Worker process draining the test_runs table.
+
+    Runs up to `concurrency` tests at once, each on its own session in a
+    thread. While a test runs, its lease is extended every heartbeat_seconds;
+    a worker that dies stops heartbeating and its run is claimed again by
+    another worker once the visibility timeout passes. Runs that error are
+    retried until they have used max_attempts. Start any number of these
+    next to the API replicas:
+
+        python -m agents.test_run_queue --concurrency 4
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        execute: Optional[Callable[[Session, Dict[str, Any]], Dict[str, Any]]] = None,
+        worker_id: Optional[str] = None,
+        concurrency: Optional[int] = None,
+        poll_seconds: Optional[float] = None,
+        visibility_timeout: Optional[float] = None,
+        heartbeat_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.session_factory = session_factory or SessionLocal
+        self.execute = execute or run_with_test_agent
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency = concurrency or settings.TEST_WORKER_CONCURRENCY
+        self.poll_seconds = poll_seconds or settings.TEST_WORKER_POLL_SECONDS
+        self.visibility_timeout = visibility_timeout or settings.TEST_RUN_VISIBILITY_TIMEOUT_SECONDS
+        self.heartbeat_seconds = heartbeat_seconds or settings.TEST_RUN_HEARTBEAT_SECONDS
+        self.max_attempts = max_attempts or settings.TEST_RUN_MAX_ATTEMPTS
+        self._workers: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.lost_leases = 0
+
+    def _in_session(self, fn, *args):
+        db = self.session_factory()
+        try:
+            return fn(db, *args)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    # Lifecycle
+
+    async def start(self) -> None:
+        self._workers = {asyncio.create_task(self._work()) for _ in range(self.concurrency)}
+        logger.info(f"Test worker {self.worker_id} started with concurrency {self.concurrency}")
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = set()
+
+    async def run(self) -> None:
+        await self.start()
+        try:
+            await asyncio.gather(*self._workers)
+        finally:
+            await self.stop()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                ran = await self.process_next()
+            except Exception as e:
+                logger.error(f"Test worker {self.worker_id} error: {str(e)}", exc_info=True)
+                ran = False
+            if not ran:
+                await asyncio.sleep(self.poll_seconds)
+
+    async def process_next(self) -> bool:
+        """
+        Claim and run one test, heartbeating until it finishes
+
+        Returns:
+            False when nothing was claimable
+        """
+        claimed = await asyncio.to_thread(self._in_session, self._claim)
+        if claimed is None:
+            return False
+        run_id, test_config = claimed
+        execution = asyncio.create_task(asyncio.to_thread(self._in_session, self.execute, test_config))
+        while True:
+            done, _ = await asyncio.wait({execution}, timeout=self.heartbeat_seconds)
+            if done:
+                break
+            held = await asyncio.to_thread(
+                self._in_session, heartbeat_lease, TestRun, run_id, self.worker_id, self.visibility_timeout
+            )
+            if not held:
+                logger.warning(f"Test run {run_id} lease lost by {self.worker_id}; its outcome will be discarded")
+        try:
+            result = execution.result()
+            error = result.get('error') if result.get('status') == 'error' else None
+        except Exception as e:
+            logger.error(f"Error running test run {run_id}: {str(e)}", exc_info=True)
+            result, error = None, str(e)
+        status = await asyncio.to_thread(
+            self._in_session, finish_lease, TestRun, run_id, self.worker_id, error, self.max_attempts,
+            {'result': result}
+        )
+        if status == 'completed':
+            self.completed += 1
+        elif status is None:
+            self.lost_leases += 1
+        return True
+
+    def _claim(self, db: Session) -> Optional[Tuple[int, Dict[str, Any]]]:
+        run = claim_lease(db, TestRun, self.worker_id, self.visibility_timeout, self.max_attempts)
+        if run is None:
+            return None
+        logger.info(f"Worker {self.worker_id} running test run {run.id} (attempt {run.attempts})")
+        return run.id, run.test_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued sanity tests from the test_runs table.")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--worker-id", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    worker = TestRunWorker(worker_id=args.worker_id, concurrency=args.concurrency)
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":
+    main()
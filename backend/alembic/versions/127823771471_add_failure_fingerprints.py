@@ -0,0 +1,38 @@
+"""add failure fingerprints to test_results and incidents
+
+Revision ID: 127823771471
+Revises: 8ca410b37664
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '127823771471'
+down_revision: Union[str, None] = '8ca410b37664'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_results', sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    op.create_index('ix_test_results_fingerprint', 'test_results', ['fingerprint'])
+    op.add_column('incidents', sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    op.add_column('incidents', sa.Column('occurrence_count', sa.Integer(), server_default='1', nullable=True))
+    op.add_column('incidents', sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+    op.create_index('ix_incidents_fingerprint_status', 'incidents', ['fingerprint', 'status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incidents_fingerprint_status', table_name='incidents')
+    op.drop_column('incidents', 'last_seen_at')
+    op.drop_column('incidents', 'occurrence_count')
+    op.drop_column('incidents', 'fingerprint')
+    op.drop_index('ix_test_results_fingerprint', table_name='test_results')
+    op.drop_column('test_results', 'fingerprint')
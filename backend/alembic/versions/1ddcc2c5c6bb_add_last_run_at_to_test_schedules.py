@@ -0,0 +1,36 @@
+"""add last_run_at to test_schedules
+
+Revision ID: 1ddcc2c5c6bb
+Revises: 45351e3724db
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ddcc2c5c6bb'
+down_revision: Union[str, None] = '45351e3724db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # test_schedules is created outside alembic, so only alter it where it exists
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.add_column('test_schedules', sa.Column('last_run_at', sa.DateTime(), nullable=True))
+        # Count existing schedules as run up to now, so the daemon does not fire every past one on deploy
+        op.execute(
+            sa.text("UPDATE test_schedules SET last_run_at = :now").bindparams(now=datetime.utcnow())
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_column('test_schedules', 'last_run_at')
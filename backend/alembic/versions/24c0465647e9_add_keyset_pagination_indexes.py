@@ -0,0 +1,46 @@
+"""add keyset pagination indexes
+
+Revision ID: 24c0465647e9
+Revises: 50658f3a470a
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '24c0465647e9'
+down_revision: Union[str, None] = '50658f3a470a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_test_results_created_id', 'test_results', ['created_at', 'id']),
+    ('ix_test_results_agent_created_id', 'test_results', ['agent', 'created_at', 'id']),
+    ('ix_test_results_status_created_id', 'test_results', ['status', 'created_at', 'id']),
+    ('ix_test_results_environment_created_id', 'test_results', ['environment', 'created_at', 'id']),
+    ('ix_incidents_created_id', 'incidents', ['created_at', 'id']),
+    ('ix_incidents_agent_created_id', 'incidents', ['agent', 'created_at', 'id']),
+    ('ix_incidents_status_created_id', 'incidents', ['status', 'created_at', 'id']),
+    ('ix_projects_created_id', 'projects', ['created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+    # test_schedules is created outside alembic, so only index it where it exists
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.create_index('ix_test_schedules_date_time_id', 'test_schedules', ['date', 'time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_test_schedules_date_time_id', table_name='test_schedules')
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""add evaluation_results table
+
+Revision ID: 45351e3724db
+Revises: dd4f0ce32977
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45351e3724db'
+down_revision: Union[str, None] = 'dd4f0ce32977'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'evaluation_results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('trace_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('threshold', sa.Float(), nullable=False),
+        sa.Column('passed', sa.Boolean(), nullable=False),
+        sa.Column('evaluated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['trace_id'], ['traces.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_evaluation_results_id'), 'evaluation_results', ['id'], unique=False)
+    op.create_index('ix_evaluation_results_trace_metric_evaluated', 'evaluation_results', ['trace_id', 'metric', 'evaluated_at'], unique=False)
+    op.create_index('ix_evaluation_results_metric_evaluated', 'evaluation_results', ['metric', 'evaluated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_evaluation_results_metric_evaluated', table_name='evaluation_results')
+    op.drop_index('ix_evaluation_results_trace_metric_evaluated', table_name='evaluation_results')
+    op.drop_index(op.f('ix_evaluation_results_id'), table_name='evaluation_results')
+    op.drop_table('evaluation_results')
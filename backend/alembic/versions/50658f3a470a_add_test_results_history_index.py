@@ -0,0 +1,28 @@
+"""add test_results history index
+
+Revision ID: 50658f3a470a
+Revises: 1ddcc2c5c6bb
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '50658f3a470a'
+down_revision: Union[str, None] = '1ddcc2c5c6bb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_results_name_agent_created', 'test_results', ['test_name', 'agent', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_results_name_agent_created', table_name='test_results')
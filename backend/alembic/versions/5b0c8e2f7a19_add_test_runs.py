@@ -0,0 +1,50 @@
+"""add test runs
+
+Revision ID: 5b0c8e2f7a19
+Revises: e7b94f0a6d21
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b0c8e2f7a19'
+down_revision: Union[str, None] = 'e7b94f0a6d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'test_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('suite_id', sa.String(length=36), nullable=False),
+        sa.Column('test_config', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('worker_id', sa.String(), nullable=True),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_test_runs_id'), 'test_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_test_runs_suite_id'), 'test_runs', ['suite_id'], unique=False)
+    op.create_index('ix_test_runs_status_created', 'test_runs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_runs_status_created', table_name='test_runs')
+    op.drop_index(op.f('ix_test_runs_suite_id'), table_name='test_runs')
+    op.drop_index(op.f('ix_test_runs_id'), table_name='test_runs')
+    op.drop_table('test_runs')
@@ -0,0 +1,49 @@
+"""add rca jobs
+
+Revision ID: 8f2d6c41b0e7
+Revises: a48bbfe32445
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6c41b0e7'
+down_revision: Union[str, None] = 'a48bbfe32445'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'rca_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('test_result_id', sa.Integer(), nullable=False),
+        sa.Column('test_config', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('incident_id', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['incident_id'], ['incidents.id'], ),
+        sa.ForeignKeyConstraint(['test_result_id'], ['test_results.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('test_result_id')
+    )
+    op.create_index(op.f('ix_rca_jobs_id'), 'rca_jobs', ['id'], unique=False)
+    op.create_index('ix_rca_jobs_status_created', 'rca_jobs', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_rca_jobs_status_created', table_name='rca_jobs')
+    op.drop_index(op.f('ix_rca_jobs_id'), table_name='rca_jobs')
+    op.drop_table('rca_jobs')
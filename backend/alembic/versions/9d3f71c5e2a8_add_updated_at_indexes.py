@@ -0,0 +1,30 @@
+"""add updated_at indexes
+
+Revision ID: 9d3f71c5e2a8
+Revises: 5b0c8e2f7a19
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f71c5e2a8'
+down_revision: Union[str, None] = '5b0c8e2f7a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_test_results_updated_at', 'test_results', ['updated_at'], unique=False)
+    op.create_index('ix_incidents_updated_at', 'incidents', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_incidents_updated_at', table_name='incidents')
+    op.drop_index('ix_test_results_updated_at', table_name='test_results')
@@ -0,0 +1,28 @@
+"""add traces user created index
+
+Revision ID: a48bbfe32445
+Revises: 24c0465647e9
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a48bbfe32445'
+down_revision: Union[str, None] = '24c0465647e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_traces_user_created', 'traces', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_traces_user_created', table_name='traces')
@@ -0,0 +1,39 @@
+"""add eval budget charges
+
+Revision ID: a4c9e17b3f60
+Revises: f3b6d82a1c57
+Create Date: 2026-10-20 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e17b3f60'
+down_revision: Union[str, None] = 'f3b6d82a1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'eval_budget_charges',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('evaluations', sa.Integer(), nullable=False),
+        sa.Column('charged_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_eval_budget_charges_id'), 'eval_budget_charges', ['id'], unique=False)
+    op.create_index('ix_eval_budget_charges_tenant_charged', 'eval_budget_charges', ['tenant_id', 'charged_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_eval_budget_charges_tenant_charged', table_name='eval_budget_charges')
+    op.drop_index(op.f('ix_eval_budget_charges_id'), table_name='eval_budget_charges')
+    op.drop_table('eval_budget_charges')
@@ -0,0 +1,37 @@
+"""add owner to test_schedules
+
+Revision ID: b7e4c19d2a63
+Revises: 9d3f71c5e2a8
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4c19d2a63'
+down_revision: Union[str, None] = '9d3f71c5e2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # test_schedules is created outside alembic, so only alter it where it exists
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.add_column('test_schedules', sa.Column('user_id', sa.Integer(), nullable=True))
+        op.add_column('test_schedules', sa.Column('project_id', sa.Integer(), nullable=True))
+        op.create_index('ix_test_schedules_user_id', 'test_schedules', ['user_id'], unique=False)
+        op.create_index('ix_test_schedules_project_id', 'test_schedules', ['project_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if 'test_schedules' in sa.inspect(op.get_bind()).get_table_names():
+        op.drop_index('ix_test_schedules_project_id', table_name='test_schedules')
+        op.drop_index('ix_test_schedules_user_id', table_name='test_schedules')
+        op.drop_column('test_schedules', 'project_id')
+        op.drop_column('test_schedules', 'user_id')
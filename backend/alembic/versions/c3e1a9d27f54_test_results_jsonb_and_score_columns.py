@@ -0,0 +1,61 @@
+"""test_results jsonb and score columns
+
+Revision ID: c3e1a9d27f54
+Revises: 8f2d6c41b0e7
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e1a9d27f54'
+down_revision: Union[str, None] = '8f2d6c41b0e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SCORE_COLUMNS = {
+    'answer_relevancy': 'answer_relevancy_score',
+    'faithfulness': 'faithfulness_score',
+    'hallucination': 'hallucination_score',
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'test_results', 'result',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=False,
+        postgresql_using='result::jsonb'
+    )
+    for column in SCORE_COLUMNS.values():
+        op.add_column('test_results', sa.Column(column, sa.Float(), nullable=True))
+    # Backfill the typed columns from the stored evaluation results
+    op.execute(
+        "UPDATE test_results SET "
+        + ", ".join(
+            f"{column} = (result -> '{metric}' ->> 'score')::float"
+            for metric, column in SCORE_COLUMNS.items()
+        )
+    )
+    op.create_index('ix_test_results_result_gin', 'test_results', ['result'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_results_result_gin', table_name='test_results', postgresql_using='gin')
+    for column in reversed(list(SCORE_COLUMNS.values())):
+        op.drop_column('test_results', column)
+    op.alter_column(
+        'test_results', 'result',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=sa.Text(),
+        existing_nullable=False,
+        postgresql_using='result::text'
+    )
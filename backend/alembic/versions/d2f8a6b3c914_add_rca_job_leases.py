@@ -0,0 +1,30 @@
+"""add rca job lease holders
+
+Revision ID: d2f8a6b3c914
+Revises: b7e4c19d2a63
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f8a6b3c914'
+down_revision: Union[str, None] = 'b7e4c19d2a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('rca_jobs', sa.Column('worker_id', sa.String(), nullable=True))
+    op.add_column('rca_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('rca_jobs', 'heartbeat_at')
+    op.drop_column('rca_jobs', 'worker_id')
@@ -0,0 +1,40 @@
+"""add evaluation_cache table
+
+Revision ID: dd4f0ce32977
+Revises: 127823771471
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dd4f0ce32977'
+down_revision: Union[str, None] = '127823771471'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'evaluation_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('metric', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_evaluation_cache_id'), 'evaluation_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_evaluation_cache_cache_key'), 'evaluation_cache', ['cache_key'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_evaluation_cache_cache_key'), table_name='evaluation_cache')
+    op.drop_index(op.f('ix_evaluation_cache_id'), table_name='evaluation_cache')
+    op.drop_table('evaluation_cache')
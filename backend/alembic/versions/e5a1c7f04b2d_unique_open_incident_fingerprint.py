@@ -0,0 +1,38 @@
+"""unique open incident per fingerprint
+
+Revision ID: e5a1c7f04b2d
+Revises: d2f8a6b3c914
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c7f04b2d'
+down_revision: Union[str, None] = 'd2f8a6b3c914'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Duplicates left by earlier races: keep the newest open incident per fingerprint
+    op.execute(
+        "UPDATE incidents SET status = 'closed' "
+        "WHERE status = 'open' AND fingerprint IS NOT NULL AND id NOT IN ("
+        "SELECT max(id) FROM incidents WHERE status = 'open' AND fingerprint IS NOT NULL "
+        "GROUP BY fingerprint)"
+    )
+    op.create_index(
+        'ux_incidents_open_fingerprint', 'incidents', ['fingerprint'], unique=True,
+        postgresql_where=sa.text("status = 'open' AND fingerprint IS NOT NULL")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_incidents_open_fingerprint', table_name='incidents')
@@ -0,0 +1,80 @@
+"""add test stats
+
+Revision ID: e7b94f0a6d21
+Revises: c3e1a9d27f54
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b94f0a6d21'
+down_revision: Union[str, None] = 'c3e1a9d27f54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    test_stats = op.create_table(
+        'test_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('test_name', sa.String(), nullable=False),
+        sa.Column('agent', sa.String(), nullable=False),
+        sa.Column('run_count', sa.Integer(), nullable=False),
+        sa.Column('pass_count', sa.Integer(), nullable=False),
+        sa.Column('recent_runs', sa.BigInteger(), nullable=False),
+        sa.Column('flip_count', sa.Integer(), nullable=False),
+        sa.Column('ewma_pass_rate', sa.Float(), nullable=True),
+        sa.Column('last_status', sa.String(), nullable=True),
+        sa.Column('last_run_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('test_name', 'agent', name='uq_test_stats_test_agent')
+    )
+    op.create_index(op.f('ix_test_stats_id'), 'test_stats', ['id'], unique=False)
+    op.create_index('ix_test_stats_flip_count', 'test_stats', ['flip_count'], unique=False)
+
+    # Replay existing history once; later runs update the rows incrementally.
+    # The arithmetic is spelled out here so later changes to the stats code
+    # cannot change what this backfill computes.
+    window = int(os.getenv("FLAKY_WINDOW_RUNS", 20))
+    alpha = float(os.getenv("FLAKY_EWMA_ALPHA", 0.2))
+    bind = op.get_bind()
+    runs = bind.execute(sa.text(
+        "SELECT test_name, agent, status, created_at FROM test_results ORDER BY created_at, id"
+    ))
+    stats = {}
+    for test_name, agent, status, created_at in runs:
+        row = stats.setdefault((test_name, agent), {
+            'test_name': test_name, 'agent': agent, 'run_count': 0, 'pass_count': 0,
+            'recent_runs': 0, 'flip_count': 0, 'ewma_pass_rate': None
+        })
+        outcome = 1 if status == 'passed' else 0
+        row['run_count'] += 1
+        row['pass_count'] += outcome
+        row['recent_runs'] = ((row['recent_runs'] << 1) | outcome) & ((1 << window) - 1)
+        # Status changes between consecutive runs among the latest ones
+        filled = min(row['run_count'], window)
+        row['flip_count'] = bin(
+            (row['recent_runs'] ^ (row['recent_runs'] >> 1)) & ((1 << max(filled - 1, 0)) - 1)
+        ).count('1')
+        row['ewma_pass_rate'] = (
+            float(outcome) if row['ewma_pass_rate'] is None
+            else alpha * outcome + (1 - alpha) * row['ewma_pass_rate']
+        )
+        row['last_status'] = 'passed' if outcome else 'failed'
+        row['last_run_at'] = created_at
+    if stats:
+        op.bulk_insert(test_stats, list(stats.values()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_stats_flip_count', table_name='test_stats')
+    op.drop_index(op.f('ix_test_stats_id'), table_name='test_stats')
+    op.drop_table('test_stats')
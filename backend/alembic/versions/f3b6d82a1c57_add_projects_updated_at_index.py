@@ -0,0 +1,28 @@
+"""add projects updated_at index
+
+Revision ID: f3b6d82a1c57
+Revises: e5a1c7f04b2d
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b6d82a1c57'
+down_revision: Union[str, None] = 'e5a1c7f04b2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_projects_updated_at', 'projects', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_projects_updated_at', table_name='projects')
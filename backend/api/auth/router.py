@@ -1,5 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -15,7 +18,7 @@ from starlette.responses import RedirectResponse, JSONResponse
 from starlette.config import Config
 import os
 
-from ..database.database import get_db
+from ..database.database import get_async_db, get_db
 from ..models.database import User, AuditLog, generate_api_key
 from ..models.user import UserCreate, UserLogin, UserResponse, Token, TokenData
 from config.settings import settings
@@ -70,6 +73,7 @@ router = APIRouter(
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 # Password validation regex
 PASSWORD_REGEX = re.compile(r'.{6,}$')  # Just require minimum 6 characters for now
@@ -95,18 +99,22 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         logger.error(f"Error verifying password: {str(e)}")
         return False
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """
     Authenticate a user by email and password.
     """
     logger.debug(f"Attempting to authenticate user: {email}")
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, email)
     
     if not user:
         logger.warning(f"User not found: {email}")
         return None
     
-    if not verify_password(password, user.hashed_password):
+    # bcrypt is deliberately slow; keep it off the event loop
+    if not await run_in_threadpool(verify_password, password, user.hashed_password):
         logger.warning(f"Invalid password for user: {email}")
         return None
     
@@ -141,7 +149,7 @@ def is_demo_token(token: str) -> bool:
     """Check if the token is a demo token."""
     return token.startswith("demo_token_")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
     """Get current user from JWT token or demo token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -153,17 +161,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     if is_demo_token(token):
         # Create or get a demo user
         demo_email = f"demo_{token.split('_')[-1]}@example.com"
-        user = db.query(User).filter(User.email == demo_email).first()
+        user = await get_user_by_email(db, demo_email)
         if not user:
             user = User(
                 email=demo_email,
-                full_name="Demo User",
+                name="Demo User",
                 hashed_password='',
                 is_active=True
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
         return user
 
     # Handle JWT token
@@ -177,7 +184,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     
     try:
-        user = db.query(User).filter(User.email == token_data.email).first()
+        user = await get_user_by_email(db, token_data.email)
         if user is None:
             raise credentials_exception
         return user
@@ -185,13 +192,65 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         logger.error(f"Error getting current user: {str(e)}")
         raise credentials_exception
 
+def token_email(token: str) -> Optional[str]:
+    """Email of the user a demo or JWT token stands for, or None if the token is invalid."""
+    if is_demo_token(token):
+        return f"demo_{token.split('_')[-1]}@example.com"
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def get_optional_user(
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Optional[User]:
+    """
+    Signed-in user for sync routes that also serve anonymous callers.
+
+    Uses the route's own session, and treats a missing or invalid token, or
+    a demo user that was never created, as anonymous.
+    """
+    if not token:
+        return None
+    email = token_email(token)
+    if email is None:
+        return None
+    return db.query(User).filter(User.email == email).first()
+
+def get_current_user_sync(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    """
+    get_current_user for sync routes.
+
+    Looks the user up on the route's own get_db session, so a request holds
+    one pooled connection instead of one sync and one async.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    email = token_email(token)
+    if email is None:
+        raise credentials_exception
+    user = db.query(User).filter(User.email == email).first()
+    if user is None and is_demo_token(token):
+        # Create the demo user on first use, as get_current_user does
+        user = User(email=email, name="Demo User", hashed_password='', is_active=True)
+        db.add(user)
+        db.commit()
+    if user is None:
+        raise credentials_exception
+    return user
+
 @router.post("/register", response_model=TokenResponse)
 @limiter.limit("5/minute")
 async def register(
     request: Request,
     user_data: UserCreate,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user.
@@ -205,7 +264,7 @@ async def register(
         logger.info(f"Attempting to register user: {user_data.email}")
         
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await get_user_by_email(db, user_data.email)
         if existing_user:
             logger.info(f"User already exists: {user_data.email}")
             # If it's a demo user, return their token
@@ -226,7 +285,7 @@ async def register(
         
         # Create new user
         logger.info("Creating new user...")
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
         api_key = generate_api_key()  # Generate API key
         db_user = User(
             email=user_data.email,
@@ -237,7 +296,7 @@ async def register(
         )
         
         db.add(db_user)
-        db.flush()  # This will generate the user ID
+        await db.flush()  # This will generate the user ID
         
         # Create audit log with user ID
         audit_log = AuditLog(
@@ -253,7 +312,7 @@ async def register(
         db.add(audit_log)
         
         # Commit both user and audit log
-        db.commit()
+        await db.commit()
         logger.info(f"User created successfully: {db_user.id}")
         
         # Create access token
@@ -271,7 +330,7 @@ async def register(
         
     except Exception as e:
         logger.error(f"Error in registration: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating user: {str(e)}"
@@ -282,14 +341,14 @@ async def register(
 async def login(
     request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
     try:
         # Use email as username since that's what we're using for authentication
-        user = authenticate_user(db, form_data.username, form_data.password)
+        user = await authenticate_user(db, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -314,7 +373,7 @@ async def login(
             }
         )
         db.add(audit_log)
-        db.commit()
+        await db.commit()
         
         return TokenResponse(
             user=UserResponse.from_orm(user),
@@ -333,7 +392,7 @@ async def login(
 async def logout(
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Logout the current user.
@@ -351,7 +410,7 @@ async def logout(
             }
         )
         db.add(audit_log)
-        db.commit()
+        await db.commit()
         
         return {"message": "Successfully logged out"}
     except Exception as e:
@@ -374,7 +433,7 @@ async def github_login(request: Request):
     return await oauth.github.authorize_redirect(request, redirect_uri)
 
 @router.get("/github/callback")
-async def github_callback(request: Request, db: Session = Depends(get_db)):
+async def github_callback(request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
         logger.info("Received GitHub callback")
         token = await oauth.github.authorize_access_token(request)
@@ -401,20 +460,19 @@ async def github_callback(request: Request, db: Session = Depends(get_db)):
         logger.info(f"Processing user with email: {email}")
         
         # Check if user exists
-        user = db.query(User).filter(User.email == email).first()
+        user = await get_user_by_email(db, email)
         if not user:
             logger.info(f"Creating new user for email: {email}")
             api_key = generate_api_key()  # Generate API key
             user = User(
                 email=email,
-                full_name=user_data.get('name') or user_data.get('login'),
+                name=user_data.get('name') or user_data.get('login'),
                 hashed_password='',  # Not used for OAuth
                 is_active=True,
                 api_key=api_key  # Store API key
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
+            await db.commit()
             logger.info(f"Created new user with ID: {user.id}")
         else:
             logger.info(f"Found existing user with ID: {user.id}")
@@ -438,7 +496,7 @@ async def github_callback(request: Request, db: Session = Depends(get_db)):
             }
         )
         db.add(audit_log)
-        db.commit()
+        await db.commit()
         
         # Redirect to frontend with token
         frontend_url = settings.FRONTEND_URL
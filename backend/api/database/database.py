@@ -1,6 +1,14 @@
+from typing import Any, Dict
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from config.settings import settings
 
 
@@ -8,12 +16,161 @@ from config.settings import settings
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 print(f"Using database URL: {SQLALCHEMY_DATABASE_URL}")
 
-# Create engine without connect_args for PostgreSQL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+Base = declarative_base()
+
+
+class PoolStats:
+    """Checkout counters of one pool, shared with the pools it is recreated as"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += int(timed_out)
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class _TimedCheckout:
+    """Times how long each checkout waits for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; the counters carry over
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_share(total: int, is_async: bool, minimum: int = 0) -> int:
+    """One pool's part of a per-process connection budget shared by the sync and async pools"""
+    async_part = round(total * settings.DB_ASYNC_POOL_SHARE)
+    return max(async_part if is_async else total - async_part, minimum)
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Pool and logging options from settings, shared by every engine"""
+    options: Dict[str, Any] = {"echo": settings.DB_ECHO}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        if parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory":
+            # In-memory databases keep SQLite's per-connection pool; pool_metrics reports it unavailable
+            return options
+        # A file gets SQLAlchemy's default SQLite queue sizes, timed like any other pool
+        options["poolclass"] = InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        # Both pools together stay within DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+        pool_size=pool_share(settings.DB_POOL_SIZE, is_async, minimum=1),
+        max_overflow=pool_share(settings.DB_MAX_OVERFLOW, is_async),
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    return options
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **overrides):
+    """
+    Build a sync engine with the configured pool
+
+    Every process shares the module's engine; scripts and tools that need a
+    different database call this instead of create_engine so they get the same
+    pool settings.
+    """
+    return create_engine(url, **{**engine_options(url), **overrides})
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, **overrides) -> AsyncEngine:
+    """Async counterpart of create_db_engine, on the asyncio driver for url"""
+    return create_async_engine(async_database_url(url), **{**engine_options(url, is_async=True), **overrides})
+
+
+def pool_metrics(engine) -> Dict[str, Any]:
+    """Live occupancy and checkout wait times of an engine's pool"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        # Static, singleton and null pools have no occupancy to report
+        return {"pool": type(pool).__name__, "available": False}
+    metrics = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+    }
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        metrics.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            wait_ms_avg=stats.wait_seconds_total * 1000 / stats.checkouts if stats.checkouts else 0.0,
+            wait_ms_max=stats.wait_seconds_max * 1000,
+        )
+    return metrics
+
+
+def async_database_url(url: str) -> str:
+    """The same database through an asyncio driver: asyncpg for PostgreSQL, aiosqlite for SQLite"""
+    scheme, _, rest = url.partition("://")
+    driver = {
+        "postgres": "postgresql+asyncpg",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+    }.get(scheme, scheme)
+    if driver == "postgresql+asyncpg":
+        # asyncpg takes ssl=, not libpq's sslmode=
+        rest = rest.replace("sslmode=", "ssl=")
+    return f"{driver}://{rest}"
+
+
+# The process's only sync engine; api.models.database shares it
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+# Non-blocking engine for async def handlers; sync handlers keep SessionLocal in the threadpool.
+# Its pool takes DB_ASYNC_POOL_SHARE of the budget and connects lazily, so processes
+# without async handlers, like the test workers, never open it.
+async_engine = create_async_db_engine()
+
+# Objects stay readable after commit, as responses are built from them once the session is done
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def database_pool_metrics() -> Dict[str, Any]:
+    return {"sync": pool_metrics(engine), "async": pool_metrics(async_engine.sync_engine)}
 
 
 # Dependency
@@ -22,4 +179,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
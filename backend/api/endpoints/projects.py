@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, status
-from sqlalchemy.orm import Session, joinedload
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Body, Header, Query, Response, status
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional, Annotated
+from datetime import datetime
 import logging
-from api.models.database import get_db, Project, ProjectMember, User
+from api.database.database import get_db
+from api.models.database import Project, ProjectMember, User
 from api.models.schemas import (
     ProjectCreate, ProjectResponse, ProjectMemberCreate, ProjectMemberResponse
 )
-from api.auth.router import get_current_user
+from api.auth.router import get_current_user_sync
+from api.conditional import check_not_modified, table_markers, weak_etag
+from api.pagination import (
+    Keyset, MAX_PAGE_SIZE, filter_time_range, set_next_cursor
+)
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -18,7 +24,7 @@ router = APIRouter(prefix="/projects", tags=["projects"])
 def create_project(
     project: ProjectCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     try:
         logger.info(
@@ -101,13 +107,22 @@ def create_project(
 
 @router.get("/mine", response_model=List[ProjectResponse])
 def get_my_projects(
+    response: Response = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
     Get all projects where the current user is a member or owner.
+    Answers 304 when If-None-Match holds the ETag of the current list.
     """
     try:
+        etag = weak_etag(
+            "projects/mine", table_markers(db, Project, ProjectMember), current_user.email
+        )
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
         # Projects where user is owner or member
         projects = (
             db.query(Project)
@@ -130,7 +145,7 @@ def invite_member(
     project_id: int,
     member: ProjectMemberCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     # Only owner can invite
     project = db.query(Project).filter(Project.id == project_id).first()
@@ -163,7 +178,7 @@ def invite_member(
 def get_project_integrations(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -183,7 +198,7 @@ def update_project_integrations(
     project_id: int,
     integrations: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
@@ -201,13 +216,25 @@ def update_project_integrations(
     return {"integrations": project.integrations}
 
 
+PROJECT_KEYSET = Keyset(Project.created_at, Project.id)
+
+
 @router.get("/", response_model=List[ProjectResponse])
 def get_all_projects(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_sync)
 ):
     """
-    Get all projects (admin use, or for dashboard listing all projects).
+    Get all projects (admin use, or for dashboard listing all projects), newest first.
+    The X-Next-Cursor response header holds the cursor for the next page.
     """
-    projects = db.query(Project).all()
-    return projects 
\ No newline at end of file
+    query = db.query(Project).options(selectinload(Project.members))
+    query = filter_time_range(query, Project.created_at, since, until)
+    projects, next_cursor = PROJECT_KEYSET.paginate(query, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return projects
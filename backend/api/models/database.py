@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Enum, create_engine
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, Float, ForeignKey, JSON, Enum, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func, text
 from datetime import datetime
 from config.settings import settings
 from pydantic import ConfigDict
@@ -13,14 +13,8 @@ from sqlalchemy.dialects.postgresql import JSONB
 
 logger = logging.getLogger(__name__)
 
-# Create SQLite engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=True  # Enable SQL query logging
-)
-
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Share the application's engine and pool rather than opening a second one
+from api.database.database import engine, SessionLocal
 
 # Create base class for models
 Base = declarative_base()
@@ -67,6 +61,11 @@ class Trace(Base):
     user = relationship("User", back_populates="traces")
     issues = relationship("Issue", back_populates="trace")
 
+    __table_args__ = (
+        # Per-user time windows for RCA context
+        Index("ix_traces_user_created", "user_id", "created_at"),
+    )
+
     model_config = ConfigDict(from_attributes=True, protected_namespaces=())
 
 class IssueStatus(str, PyEnum):
@@ -163,6 +162,12 @@ class Project(Base):
     owner = relationship("User", backref="owned_projects")
     members = relationship("ProjectMember", back_populates="project")
 
+    __table_args__ = (
+        Index("ix_projects_created_id", "created_at", "id"),
+        # max(updated_at) for the list ETag
+        Index("ix_projects_updated_at", "updated_at"),
+    )
+
     model_config = ConfigDict(from_attributes=True, protected_namespaces=())
 
 class ProjectMember(Base):
@@ -194,6 +199,13 @@ class CustomMetric(Base):
     # Relationship with User
     user = relationship("User", back_populates="custom_metrics")
 
+# Evaluation metrics copied out of TestResult.result into typed columns at write time
+METRIC_SCORE_COLUMNS = {
+    'answer_relevancy': 'answer_relevancy_score',
+    'faithfulness': 'faithfulness_score',
+    'hallucination': 'hallucination_score',
+}
+
 class TestResult(Base):
     __tablename__ = "test_results"
     id = Column(Integer, primary_key=True, index=True)
@@ -203,12 +215,39 @@ class TestResult(Base):
     environment = Column(String, nullable=False)
     expected_behavior = Column(Text, nullable=False)
     status = Column(String, nullable=False)
-    result = Column(Text, nullable=False)
+    result = Column(JSONB, nullable=False)  # evaluation result per metric
+    answer_relevancy_score = Column(Float, nullable=True)
+    faithfulness_score = Column(Float, nullable=True)
+    hallucination_score = Column(Float, nullable=True)
     details = Column(Text, nullable=True, default=None)
+    fingerprint = Column(String(32), nullable=True, index=True)  # failure fingerprint, failed runs only
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     incident = relationship("Incident", back_populates="test_result", uselist=False)
 
+    __table_args__ = (
+        # Per-test run history, newest first
+        Index("ix_test_results_name_agent_created", "test_name", "agent", "created_at"),
+        # Keyset pagination on (created_at, id), unfiltered and per filter
+        Index("ix_test_results_created_id", "created_at", "id"),
+        Index("ix_test_results_agent_created_id", "agent", "created_at", "id"),
+        Index("ix_test_results_status_created_id", "status", "created_at", "id"),
+        Index("ix_test_results_environment_created_id", "environment", "created_at", "id"),
+        # Containment queries on the raw evaluation result
+        Index("ix_test_results_result_gin", "result", postgresql_using="gin"),
+        # max(updated_at) for the list ETag
+        Index("ix_test_results_updated_at", "updated_at"),
+    )
+
+    @staticmethod
+    def score_columns(eval_result: dict) -> dict:
+        """Typed score column values for an evaluation result"""
+        return {
+            column: float(eval_result[metric]['score'])
+            for metric, column in METRIC_SCORE_COLUMNS.items()
+            if isinstance(eval_result.get(metric), dict) and eval_result[metric].get('score') is not None
+        }
+
 class Incident(Base):
     __tablename__ = "incidents"
     id = Column(Integer, primary_key=True, index=True)
@@ -219,11 +258,137 @@ class Incident(Base):
     agent = Column(String)
     test_result_id = Column(Integer, ForeignKey("test_results.id"), unique=True)
     rca_report = Column(JSONB)
+    fingerprint = Column(String(32), nullable=True)
+    occurrence_count = Column(Integer, default=1, server_default="1")
+    last_seen_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = Column(DateTime, nullable=True)
     test_result = relationship("TestResult", back_populates="incident")
 
+    __table_args__ = (
+        Index("ix_incidents_fingerprint_status", "fingerprint", "status"),
+        # At most one open incident per failure, so concurrent runs attach instead of duplicating
+        Index(
+            "ux_incidents_open_fingerprint", "fingerprint", unique=True,
+            postgresql_where=text("status = 'open' AND fingerprint IS NOT NULL"),
+            sqlite_where=text("status = 'open' AND fingerprint IS NOT NULL")
+        ),
+        # Keyset pagination on (created_at, id), unfiltered and per filter
+        Index("ix_incidents_created_id", "created_at", "id"),
+        Index("ix_incidents_agent_created_id", "agent", "created_at", "id"),
+        Index("ix_incidents_status_created_id", "status", "created_at", "id"),
+        # max(updated_at) for the list ETag
+        Index("ix_incidents_updated_at", "updated_at"),
+    )
+
+class EvaluationCacheEntry(Base):
+    """Memoized metric score keyed by a hash of the evaluation inputs."""
+    __tablename__ = "evaluation_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)
+    metric = Column(String, nullable=False)
+    score = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class EvalBudgetCharge(Base):
+    """Evaluations charged to a tenant's sampling budget, shared by every replica."""
+    __tablename__ = "eval_budget_charges"
+    id = Column(Integer, primary_key=True, index=True)
+    tenant_id = Column(String, nullable=False)
+    evaluations = Column(Integer, nullable=False)
+    charged_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Charges inside the tenant's window
+        Index("ix_eval_budget_charges_tenant_charged", "tenant_id", "charged_at"),
+    )
+
+class EvaluationResult(Base):
+    """One metric score for one trace, appended on every evaluation run."""
+    __tablename__ = "evaluation_results"
+    id = Column(Integer, primary_key=True, index=True)
+    trace_id = Column(Integer, ForeignKey("traces.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    metric = Column(String, nullable=False)
+    score = Column(Float, nullable=False)
+    threshold = Column(Float, nullable=False)
+    passed = Column(Boolean, nullable=False)
+    evaluated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Latest score per trace and metric
+        Index("ix_evaluation_results_trace_metric_evaluated", "trace_id", "metric", "evaluated_at"),
+        # Score history per metric
+        Index("ix_evaluation_results_metric_evaluated", "metric", "evaluated_at"),
+    )
+
+class TestStats(Base):
+    """Running pass/fail statistics for one test on one agent, updated on every run."""
+    __tablename__ = "test_stats"
+    id = Column(Integer, primary_key=True, index=True)
+    test_name = Column(String, nullable=False)
+    agent = Column(String, nullable=False)
+    run_count = Column(Integer, nullable=False, default=0)
+    pass_count = Column(Integer, nullable=False, default=0)
+    recent_runs = Column(BigInteger, nullable=False, default=0)  # bit i set: i-th latest run passed
+    flip_count = Column(Integer, nullable=False, default=0)  # status changes among the recent runs
+    ewma_pass_rate = Column(Float, nullable=True)
+    last_status = Column(String, nullable=True)
+    last_run_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("test_name", "agent", name="uq_test_stats_test_agent"),
+        # Flakiest tests first
+        Index("ix_test_stats_flip_count", "flip_count"),
+    )
+
+class RCAJob(Base):
+    """Queued root cause analysis for a failed test run."""
+    __tablename__ = "rca_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    test_result_id = Column(Integer, ForeignKey("test_results.id"), unique=True, nullable=False)
+    test_config = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    worker_id = Column(String, nullable=True)  # holder of the current lease
+    lease_expires_at = Column(DateTime, nullable=True)  # extended by heartbeats; reclaimed once past
+    heartbeat_at = Column(DateTime, nullable=True)
+    incident_id = Column(Integer, ForeignKey("incidents.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    test_result = relationship("TestResult")
+    incident = relationship("Incident")
+
+    __table_args__ = (
+        # Oldest claimable job first
+        Index("ix_rca_jobs_status_created", "status", "created_at"),
+    )
+
+class TestRun(Base):
+    """One queued test of a suite, leased to a worker process while it runs."""
+    __tablename__ = "test_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    suite_id = Column(String(36), nullable=False, index=True)
+    test_config = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, completed, failed
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    worker_id = Column(String, nullable=True)  # holder of the current lease
+    lease_expires_at = Column(DateTime, nullable=True)  # extended by heartbeats; reclaimed once past
+    heartbeat_at = Column(DateTime, nullable=True)
+    result = Column(JSON, nullable=True)  # execute_test's return value
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Oldest claimable run first
+        Index("ix_test_runs_status_created", "status", "created_at"),
+    )
+
 def get_db():
     """Dependency for getting DB session"""
     db = SessionLocal()
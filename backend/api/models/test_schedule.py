@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, Date, Time
+from sqlalchemy import Column, Integer, String, Date, Time, DateTime, Index
 from sqlalchemy.ext.declarative import declarative_base
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
 
 Base = declarative_base()
 
@@ -13,6 +13,14 @@ class TestSchedule(Base):
     description = Column(String, default="")
     tags = Column(String, default="")  # Comma-separated tags
     time = Column(Time, nullable=False)
+    last_run_at = Column(DateTime, nullable=True)  # Set when the scheduler claims the run
+    # Owner of the runs, which scopes their RCA context; users and projects live in another metadata
+    user_id = Column(Integer, nullable=True, index=True)
+    project_id = Column(Integer, nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_test_schedules_date_time_id", "date", "time", "id"),
+    )
 
 class TestScheduleCreate(BaseModel):
     date: str
@@ -20,6 +28,7 @@ class TestScheduleCreate(BaseModel):
     description: str = ""
     tags: List[str] = []
     time: str
+    project_id: Optional[int] = None
 
 class TestScheduleRead(BaseModel):
     id: int
@@ -28,6 +37,20 @@ class TestScheduleRead(BaseModel):
     description: str
     tags: List[str]
     time: str
+    user_id: Optional[int] = None
+    project_id: Optional[int] = None
+
+    @field_validator("date", "time", mode="before")
+    @classmethod
+    def isoformat(cls, value):
+        return value.isoformat() if hasattr(value, "isoformat") else value
+
+    @field_validator("tags", mode="before")
+    @classmethod
+    def split_tags(cls, value):
+        if isinstance(value, str):
+            return [tag.strip() for tag in value.split(",") if tag.strip()]
+        return value
 
     class Config:
         orm_mode = True 
\ No newline at end of file
@@ -0,0 +1,102 @@
+from typing import Any, List, Optional, Tuple
+from datetime import date, datetime, time
+import base64
+import json
+
+from fastapi import HTTPException, Response
+from sqlalchemy import literal, tuple_
+
+# Response header carrying the cursor for the next page; absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class Keyset:
+    """Cursor pagination over an ordered tuple of columns, e.g. (created_at, id).
+
+    The cursor is an opaque token holding the sort values of the last row
+    of a page. The next page is read as "rows strictly after the cursor"
+    with an index range scan, so every page costs the same no matter how
+    deep into the history it is.
+
+    Requests without a cursor or limit get every row in key order, as the
+    endpoints returned before paging was added. Paged requests skip rows
+    whose sort key is NULL, since a cursor cannot point past them.
+    """
+
+    def __init__(self, *columns, descending: bool = True):
+        self.columns = columns
+        self.descending = descending
+
+    def _serialize(self, value: Any) -> Any:
+        if isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        return value
+
+    def _deserialize(self, column, value: Any) -> Any:
+        python_type = column.type.python_type
+        if value is None:
+            raise ValueError("cursor holds a NULL sort value")
+        if python_type in (datetime, date, time):
+            return python_type.fromisoformat(value)
+        return python_type(value)
+
+    def encode(self, row) -> str:
+        values = [self._serialize(getattr(row, column.key)) for column in self.columns]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+    def decode(self, cursor: str) -> List[Any]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.columns):
+                raise ValueError("cursor does not match the sort key")
+            return [self._deserialize(column, value) for column, value in zip(self.columns, values)]
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    def _after(self, values: List[Any]):
+        # Row-value comparison, (created_at, id) < (:created_at, :id), is a single index range scan
+        key = tuple_(*self.columns)
+        bound = tuple_(*[literal(v, type_=c.type) for c, v in zip(self.columns, values)])
+        return key < bound if self.descending else key > bound
+
+    def paginate(self, query, cursor: Optional[str], limit: Optional[int]) -> Tuple[list, Optional[str]]:
+        """
+        Fetch one page of query in key order
+
+        Args:
+            limit: Page size; None with no cursor returns all rows unpaged,
+                None with a cursor pages by DEFAULT_PAGE_SIZE
+
+        Returns:
+            The rows of the page and the cursor for the next page, or None on the last page
+        """
+        order = [column.desc() if self.descending else column.asc() for column in self.columns]
+        if limit is None and not cursor:
+            return query.order_by(*order).all(), None
+        limit = limit or DEFAULT_PAGE_SIZE
+        # A NULL key compares as unknown, so such rows would never be reached after a cursor
+        query = query.filter(*[column.isnot(None) for column in self.columns if column.nullable])
+        if cursor:
+            query = query.filter(self._after(self.decode(cursor)))
+        rows = query.order_by(*order).limit(limit + 1).all()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, self.encode(rows[-1])
+
+
+def filter_time_range(query, column, since: Optional[datetime], until: Optional[datetime]):
+    """Restrict query to since <= column < until, either bound optional"""
+    if since is not None:
+        query = query.filter(column >= since)
+    if until is not None:
+        query = query.filter(column < until)
+    return query
+
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,47 @@
+"""
+orjson responses for endpoints that return large nested payloads.
+
+FastAPI passes whatever a handler returns through jsonable_encoder, which
+walks the whole structure before the response class serializes it again.
+Handlers that return fast_json_response(...) skip that pass: orjson
+serializes the dicts directly, datetimes included, so handlers hand it
+datetime objects instead of formatting each one.
+"""
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+# Headers the injected Response carries for its own (empty) body
+_BODY_HEADERS = {"content-length", "content-type"}
+
+
+class FastJSONResponse(ORJSONResponse):
+    """ORJSONResponse with naive datetimes marked as UTC, as they are stored"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC
+        )
+
+
+def fast_json_response(content: Any, response: Optional[Response] = None) -> FastJSONResponse:
+    """
+    Serialize content with orjson, bypassing jsonable_encoder
+
+    Args:
+        content: dicts, lists, scalars, datetimes and numpy values
+        response: the handler's injected Response; headers set on it (such
+            as X-Next-Cursor) are copied, since FastAPI drops them once a
+            handler returns its own Response
+    """
+    fast = FastJSONResponse(content)
+    if response is not None:
+        for key, value in response.headers.items():
+            if key not in _BODY_HEADERS:
+                fast.headers.append(key, value)
+        if response.status_code:
+            fast.status_code = response.status_code
+    return fast
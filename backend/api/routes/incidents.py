@@ -1,15 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from api.models.incident import Incident, IncidentCreate, IncidentRead, SeverityEnum, StatusEnum
 from api.database.database import get_db
-from typing import List
+from api.pagination import (
+    Keyset, MAX_PAGE_SIZE, filter_time_range, set_next_cursor
+)
+from typing import List, Optional, Annotated
 from datetime import datetime
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
+INCIDENT_KEYSET = Keyset(Incident.time, Incident.id)
+
 @router.get("/", response_model=List[IncidentRead])
-def list_incidents(db: Session = Depends(get_db)):
-    return db.query(Incident).all()
+def list_incidents(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    status: Optional[StatusEnum] = None,
+    severity: Optional[SeverityEnum] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(Incident)
+    if status:
+        query = query.filter(Incident.status == status)
+    if severity:
+        query = query.filter(Incident.severity == severity)
+    query = filter_time_range(query, Incident.time, since, until)
+    incidents, next_cursor = INCIDENT_KEYSET.paginate(query, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return incidents
 
 @router.get("/{incident_id}", response_model=IncidentRead)
 def get_incident(incident_id: int, db: Session = Depends(get_db)):
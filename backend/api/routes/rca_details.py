@@ -1,15 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from api.models.rca_detail import RCADetail, RCADetailCreate, RCADetailRead
 from api.database.database import get_db
-from typing import List
+from api.pagination import Keyset, MAX_PAGE_SIZE, set_next_cursor
+from typing import List, Optional, Annotated
 import json
 
 router = APIRouter(prefix="/rca_details", tags=["rca_details"])
 
+# rca_details has no timestamp column; ids are assigned in creation order
+RCA_DETAIL_KEYSET = Keyset(RCADetail.id)
+
 @router.get("/", response_model=List[RCADetailRead])
-def list_rca_details(db: Session = Depends(get_db)):
-    return db.query(RCADetail).all()
+def list_rca_details(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    incident_id: Optional[int] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(RCADetail)
+    if incident_id is not None:
+        query = query.filter(RCADetail.incident_id == incident_id)
+    if status:
+        query = query.filter(RCADetail.status == status)
+    rca_details, next_cursor = RCA_DETAIL_KEYSET.paginate(query, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return rca_details
 
 @router.get("/{rca_id}", response_model=RCADetailRead)
 def get_rca_detail(rca_id: int, db: Session = Depends(get_db)):
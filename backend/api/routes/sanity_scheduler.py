@@ -1,16 +1,40 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session, joinedload
 from api.database.database import get_db
 from agents.test_execution_agent import TestExecutionAgent
-from api.models.database import TestResult, Incident
-from typing import Dict, Any, List
+from api.models.database import TestResult, Incident, RCAJob, TestRun, TestStats, User, METRIC_SCORE_COLUMNS
+from api.auth.router import get_optional_user
+from agents.flaky_stats import describe_flakiness
+from agents.test_run_queue import enqueue_test_runs
+from config.settings import settings
+from api.responses import FastJSONResponse, fast_json_response
+from api.conditional import check_not_modified, table_markers, weak_etag
+from api.pagination import (
+    Keyset, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, filter_time_range, set_next_cursor
+)
+from typing import Dict, Any, List, Optional, Annotated
 from datetime import datetime
+from collections import defaultdict
 import json
 
 router = APIRouter()
 
+TEST_RESULT_KEYSET = Keyset(TestResult.created_at, TestResult.id)
+INCIDENT_KEYSET = Keyset(Incident.created_at, Incident.id)
+
+def _with_owner(test_config: Dict[str, Any], user: Optional[User]) -> Dict[str, Any]:
+    """Default the test's owner to the caller, which scopes its RCA context to their traces"""
+    if user is None or test_config.get('user_id') is not None or test_config.get('project_id') is not None:
+        return test_config
+    return {**test_config, 'user_id': user.id}
+
 @router.post("/run-test")
-def run_sanity_test(test_config: Dict[str, Any], db: Session = Depends(get_db)):
+def run_sanity_test(
+    test_config: Dict[str, Any],
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user)
+):
     """
     Run a sanity test using the TestExecutionAgent
     
@@ -21,10 +45,14 @@ def run_sanity_test(test_config: Dict[str, Any], db: Session = Depends(get_db)):
             - agent: Agent to test
             - environment: Environment to run test in
             - expected_behavior: Expected behavior description
+            - user_id or project_id: Optional owner; defaults to the signed-in caller
+    
+    With RCA_QUEUE_ENABLED a failed run returns as soon as its result is saved,
+    with an rca_job_id to poll at /rca-jobs/{job_id}.
     """
     try:
         test_agent = TestExecutionAgent(db)
-        result = test_agent.execute_test(test_config)
+        result = test_agent.execute_test(_with_owner(test_config, user), defer_rca=settings.RCA_QUEUE_ENABLED)
         return result
     except Exception as e:
         raise HTTPException(
@@ -33,7 +61,11 @@ def run_sanity_test(test_config: Dict[str, Any], db: Session = Depends(get_db)):
         )
 
 @router.post("/run-batch-tests")
-def run_batch_tests(test_configs: list[Dict[str, Any]], db: Session = Depends(get_db)):
+def run_batch_tests(
+    test_configs: list[Dict[str, Any]],
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user)
+):
     """
     Run multiple sanity tests in batch
     
@@ -42,7 +74,7 @@ def run_batch_tests(test_configs: list[Dict[str, Any]], db: Session = Depends(ge
     """
     try:
         test_agent = TestExecutionAgent(db)
-        results = test_agent.execute_batch_tests(test_configs)
+        results = test_agent.execute_batch_tests([_with_owner(config, user) for config in test_configs])
         return results
     except Exception as e:
         raise HTTPException(
@@ -50,53 +82,302 @@ def run_batch_tests(test_configs: list[Dict[str, Any]], db: Session = Depends(ge
             detail=f"Failed to run batch tests: {str(e)}"
         )
 
-@router.get("/test-results")
-def get_test_results(db: Session = Depends(get_db)):
+@router.post("/test-runs")
+def queue_test_runs(
+    test_configs: list[Dict[str, Any]],
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user)
+):
+    """
+    Queue a suite of tests for the worker processes instead of running it in this request
+    
+    Args:
+        test_configs: List of test configurations
+    """
+    if not test_configs:
+        raise HTTPException(status_code=400, detail="No tests to run")
+    suite_id, runs = enqueue_test_runs(db, [_with_owner(config, user) for config in test_configs])
+    return {"suiteId": suite_id, "runIds": [run.id for run in runs]}
+
+@router.get("/test-runs/{suite_id}")
+def get_test_runs(suite_id: str, db: Session = Depends(get_db)):
+    """Progress of a queued suite and the result of each finished test"""
+    runs = db.query(TestRun).filter(TestRun.suite_id == suite_id).order_by(TestRun.id).all()
+    if not runs:
+        raise HTTPException(status_code=404, detail="Test suite not found")
+    counts = defaultdict(int)
+    for run in runs:
+        counts[run.status] += 1
+    return {
+        "suiteId": suite_id,
+        "counts": dict(counts),
+        "runs": [
+            {
+                "id": run.id,
+                "testName": run.test_config.get("test_name"),
+                "status": run.status,
+                "attempts": run.attempts,
+                "workerId": run.worker_id,
+                "result": run.result,
+                "error": run.error,
+                "startedAt": run.started_at.isoformat() if run.started_at else None,
+                "finishedAt": run.finished_at.isoformat() if run.finished_at else None,
+            }
+            for run in runs
+        ],
+    }
+
+@router.get("/rca-jobs/{job_id}")
+def get_rca_job(job_id: int, db: Session = Depends(get_db)):
+    """Status of a queued RCA, with the report once its incident exists"""
+    job = db.query(RCAJob).options(joinedload(RCAJob.incident)).filter(RCAJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="RCA job not found")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "testResultId": job.test_result_id,
+        "incidentId": job.incident_id,
+        "rcaReport": job.incident.rca_report if job.incident else None,
+        "error": job.error,
+        "createdAt": job.created_at.isoformat() if job.created_at else None,
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+@router.get("/flaky-tests")
+def get_flaky_tests(
+    test_name: Optional[str] = None,
+    agent: Optional[str] = None,
+    min_flips: Annotated[int, Query(ge=0)] = 1,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    Tests that flip between passed and failed, flakiest first
+    
+    Reads the statistics kept up to date by every run instead of scanning run history.
+    
+    Args:
+        test_name, agent: Exact-match filters; both together look up a single test
+        min_flips: Only tests with at least this many status changes in the recent window
+    """
+    query = db.query(TestStats).filter(TestStats.flip_count >= min_flips)
+    if test_name:
+        query = query.filter(TestStats.test_name == test_name)
+    if agent:
+        query = query.filter(TestStats.agent == agent)
+    rows = query.order_by(TestStats.flip_count.desc(), TestStats.ewma_pass_rate).limit(limit).all()
+    return [describe_flakiness(stats) for stats in rows]
+
+def _history_entry(run) -> Dict[str, Any]:
+    return {
+        "id": run.id,
+        "timestamp": run.created_at,
+        "agentVersion": "1.0.0",  # Placeholder, update if you have versioning
+        "status": run.status,
+        "promptBefore": run.instruction,
+        "promptAfter": run.instruction,  # Placeholder, update if you track prompt changes
+        "settingsBefore": {},  # Placeholder
+        "settingsAfter": {},   # Placeholder
+    }
+
+def _fetch_recent_runs(db: Session, test_names: set, limit: int) -> Dict[tuple, list]:
+    """
+    Latest runs per (test_name, agent) in one window-function query
+    
+    Returns:
+        Rows newest first, keyed by (test_name, agent), at most limit per key
+    """
+    if not test_names or limit <= 0:
+        return {}
+    ranked = db.query(
+        TestResult.id,
+        TestResult.test_name,
+        TestResult.agent,
+        TestResult.status,
+        TestResult.instruction,
+        TestResult.created_at,
+        func.row_number().over(
+            partition_by=(TestResult.test_name, TestResult.agent),
+            order_by=(TestResult.created_at.desc(), TestResult.id.desc())
+        ).label("rank")
+    ).filter(TestResult.test_name.in_(test_names)).subquery()
+    runs = defaultdict(list)
+    for row in db.query(ranked).filter(ranked.c.rank <= limit).order_by(
+        ranked.c.test_name, ranked.c.agent, ranked.c.rank
+    ):
+        runs[(row.test_name, row.agent)].append(row)
+    return runs
+
+STATS_PERCENTILES = (0.5, 0.9, 0.99)
+
+def _test_result_stats_query(dialect: str, agent, environment, since, until):
     """
-    Get all test results with their associated incidents
+    Per (agent, environment, day) aggregates over test_results as one GROUP BY
+    
+    Score percentiles use percentile_cont, which is PostgreSQL only; other
+    databases get averages and counts.
+    """
+    day = func.date(TestResult.created_at).label("day")
+    columns = [
+        TestResult.agent,
+        TestResult.environment,
+        day,
+        func.count().label("runs"),
+        func.sum(case((TestResult.status == 'passed', 1), else_=0)).label("passed"),
+        func.sum(case((TestResult.status == 'failed', 1), else_=0)).label("failed"),
+    ]
+    for metric, column_name in METRIC_SCORE_COLUMNS.items():
+        column = getattr(TestResult, column_name)
+        columns.append(func.avg(column).label(f"{metric}__avg"))
+        if dialect == "postgresql":
+            columns.extend(
+                func.percentile_cont(p).within_group(column).label(f"{metric}__p{round(p * 100)}")
+                for p in STATS_PERCENTILES
+            )
+    query = select(*columns)
+    if agent:
+        query = query.where(TestResult.agent == agent)
+    if environment:
+        query = query.where(TestResult.environment == environment)
+    if since is not None:
+        query = query.where(TestResult.created_at >= since)
+    if until is not None:
+        query = query.where(TestResult.created_at < until)
+    return query.group_by(TestResult.agent, TestResult.environment, day).order_by(
+        day.desc(), TestResult.agent, TestResult.environment
+    )
+
+@router.get("/test-results/stats")
+def get_test_result_stats(
+    agent: Optional[str] = None,
+    environment: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Pass rates, score averages and percentiles and failure counts per agent, environment and day
+    
+    Args:
+        agent, environment: Exact-match filters
+        since, until: created_at range, since inclusive and until exclusive
     """
     try:
-        test_results = db.query(TestResult).order_by(TestResult.created_at.desc()).all()
+        query = _test_result_stats_query(db.get_bind().dialect.name, agent, environment, since, until)
+        stats = []
+        for row in db.execute(query).mappings():
+            scores = defaultdict(dict)
+            for key, value in row.items():
+                if "__" in key:
+                    metric, stat = key.split("__")
+                    scores[metric][stat] = float(value) if value is not None else None
+            stats.append({
+                "agent": row["agent"],
+                "environment": row["environment"],
+                "day": row["day"].isoformat() if hasattr(row["day"], "isoformat") else row["day"],
+                "runs": row["runs"],
+                "passed": row["passed"],
+                "failed": row["failed"],
+                "passRate": row["passed"] / row["runs"] if row["runs"] else None,
+                "scores": dict(scores),
+            })
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch test result stats: {str(e)}")
+
+@router.get("/test-results", response_class=FastJSONResponse)
+def get_test_results(
+    response: Response = None,
+    history_limit: Annotated[int, Query(ge=0, le=100)] = 10,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    agent: Optional[str] = None,
+    status: Optional[str] = None,
+    environment: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Get test results with their associated incidents, newest first, one page at a time
+    
+    Args:
+        history_limit: Previous runs of the same test and agent to include per result
+        cursor: X-Next-Cursor value from the previous page
+        limit: Results per page; with neither cursor nor limit, all results
+        agent, status, environment: Exact-match filters
+        since, until: created_at range, since inclusive and until exclusive
+        if_none_match: ETag of a previous response; answered with 304 if nothing changed
+    """
+    try:
+        etag = weak_etag(
+            "test-results", table_markers(db, TestResult, Incident),
+            history_limit, cursor, limit, agent, status, environment, since, until
+        )
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        query = db.query(TestResult).options(joinedload(TestResult.incident))
+        if agent:
+            query = query.filter(TestResult.agent == agent)
+        if status:
+            query = query.filter(TestResult.status == status)
+        if environment:
+            query = query.filter(TestResult.environment == environment)
+        query = filter_time_range(query, TestResult.created_at, since, until)
+        test_results, next_cursor = TEST_RESULT_KEYSET.paginate(query, cursor, limit)
+        if response is not None:
+            set_next_cursor(response, next_cursor)
+        # Recurring failures are attached to the incident sharing their fingerprint
+        fingerprints = {tr.fingerprint for tr in test_results if tr.fingerprint}
+        incident_by_fingerprint = {}
+        if fingerprints:
+            for incident_id, fingerprint in db.query(Incident.id, Incident.fingerprint).filter(
+                Incident.fingerprint.in_(fingerprints)
+            ).order_by(Incident.created_at.asc()):
+                incident_by_fingerprint[fingerprint] = incident_id
+        # One extra run per group so excluding the result itself still leaves history_limit
+        recent_runs = _fetch_recent_runs(
+            db, {tr.test_name for tr in test_results}, history_limit + 1
+        )
+        # Each run is formatted once and shared by every result whose history includes it
+        entries = {
+            key: [(h.id, _history_entry(h)) for h in runs]
+            for key, runs in recent_runs.items()
+        }
         results = []
         for tr in test_results:
-            # Fetch previous runs for the same test_name and agent, excluding this run
-            history_q = db.query(TestResult).filter(
-                TestResult.test_name == tr.test_name,
-                TestResult.agent == tr.agent,
-                TestResult.id != tr.id
-            ).order_by(TestResult.created_at.desc()).all()
+            # Previous runs for the same test_name and agent, excluding this run
             history = [
-                {
-                    "id": h.id,
-                    "timestamp": h.created_at.strftime("%b %d, %Y, %I:%M %p"),
-                    "agentVersion": "1.0.0",  # Placeholder, update if you have versioning
-                    "status": h.status,
-                    "promptBefore": h.instruction,
-                    "promptAfter": h.instruction,  # Placeholder, update if you track prompt changes
-                    "settingsBefore": {},  # Placeholder
-                    "settingsAfter": {},   # Placeholder
-                }
-                for h in history
-            ]
+                entry
+                for run_id, entry in entries.get((tr.test_name, tr.agent), [])
+                if run_id != tr.id
+            ][:history_limit]
             results.append({
                 "id": tr.id,
                 "testName": tr.test_name,
-                "runDate": tr.created_at.strftime("%b %d, %Y, %I:%M %p"),
+                "runDate": tr.created_at,
                 "status": tr.status,
                 "details": tr.details or "",
-                "incidentId": tr.incident.id if tr.incident else None,
+                "incidentId": tr.incident.id if tr.incident else incident_by_fingerprint.get(tr.fingerprint),
                 "agent": tr.agent,
                 "environment": tr.environment,
                 "history": history
             })
-        return results
+        return fast_json_response(results, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch test results: {str(e)}"
         )
 
-@router.get("/incidents/{incident_id}")
+@router.get("/incidents/{incident_id}", response_class=FastJSONResponse)
 def get_incident(incident_id: int, db: Session = Depends(get_db)):
     """
     Get detailed information about a specific incident, including its RCA report
@@ -115,7 +396,7 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
                 desc = json.loads(desc)
             except Exception:
                 pass  # fallback to string if not valid JSON
-        return {
+        return fast_json_response({
             "id": incident.id,
             "title": incident.title,
             "description": desc,
@@ -123,9 +404,9 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
             "status": incident.status,
             "severity": incident.severity,
             "agent": incident.agent,
-            "created_at": incident.created_at.strftime("%b %d, %Y, %I:%M %p"),
-            "updated_at": incident.updated_at.strftime("%b %d, %Y, %I:%M %p"),
-            "resolved_at": incident.resolved_at.strftime("%b %d, %Y, %I:%M %p") if incident.resolved_at else None,
+            "created_at": incident.created_at,
+            "updated_at": incident.updated_at,
+            "resolved_at": incident.resolved_at,
             "test_result": {
                 "id": incident.test_result.id,
                 "test_name": incident.test_result.test_name,
@@ -133,22 +414,58 @@ def get_incident(incident_id: int, db: Session = Depends(get_db)):
                 "expected_behavior": incident.test_result.expected_behavior,
                 "status": incident.test_result.status,
                 "details": incident.test_result.details,
-                "run_date": incident.test_result.created_at.strftime("%b %d, %Y, %I:%M %p")
+                "run_date": incident.test_result.created_at
             } if incident.test_result else None
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to fetch incident details: {str(e)}"
         )
 
-@router.get("/incidents")
-def list_incidents(db: Session = Depends(get_db)):
+@router.get("/incidents", response_class=FastJSONResponse)
+def list_incidents(
+    response: Response = None,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    agent: Optional[str] = None,
+    status: Optional[str] = None,
+    environment: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+    db: Session = Depends(get_db)
+):
     """
-    List all incidents with RCA details and associated test results (if any)
+    List incidents with RCA details and associated test results (if any), newest first
+    
+    Args:
+        cursor: X-Next-Cursor value from the previous page
+        limit: Incidents per page; with neither cursor nor limit, all incidents
+        agent, status: Exact-match filters
+        environment: Environment of the test run that opened the incident
+        since, until: created_at range, since inclusive and until exclusive
+        if_none_match: ETag of a previous response; answered with 304 if nothing changed
     """
     try:
-        incidents = db.query(Incident).order_by(Incident.created_at.desc()).all()
+        etag = weak_etag(
+            "incidents", table_markers(db, Incident, TestResult),
+            cursor, limit, agent, status, environment, since, until
+        )
+        not_modified = check_not_modified(response, if_none_match, etag)
+        if not_modified is not None:
+            return not_modified
+        query = db.query(Incident).options(joinedload(Incident.test_result))
+        if agent:
+            query = query.filter(Incident.agent == agent)
+        if status:
+            query = query.filter(Incident.status == status)
+        if environment:
+            query = query.filter(Incident.test_result.has(TestResult.environment == environment))
+        query = filter_time_range(query, Incident.created_at, since, until)
+        incidents, next_cursor = INCIDENT_KEYSET.paginate(query, cursor, limit)
+        if response is not None:
+            set_next_cursor(response, next_cursor)
         result = []
         for incident in incidents:
             result.append({
@@ -159,9 +476,9 @@ def list_incidents(db: Session = Depends(get_db)):
                 "status": incident.status,
                 "severity": incident.severity,
                 "agent": incident.agent,
-                "created_at": incident.created_at.strftime("%b %d, %Y, %I:%M %p"),
-                "updated_at": incident.updated_at.strftime("%b %d, %Y, %I:%M %p"),
-                "resolved_at": incident.resolved_at.strftime("%b %d, %Y, %I:%M %p") if incident.resolved_at else None,
+                "created_at": incident.created_at,
+                "updated_at": incident.updated_at,
+                "resolved_at": incident.resolved_at,
                 "test_result": {
                     "id": incident.test_result.id,
                     "test_name": incident.test_result.test_name,
@@ -169,10 +486,12 @@ def list_incidents(db: Session = Depends(get_db)):
                     "expected_behavior": incident.test_result.expected_behavior,
                     "status": incident.test_result.status,
                     "details": incident.test_result.details,
-                    "run_date": incident.test_result.created_at.strftime("%b %d, %Y, %I:%M %p")
+                    "run_date": incident.test_result.created_at
                 } if incident.test_result else None
             })
-        return result
+        return fast_json_response(result, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
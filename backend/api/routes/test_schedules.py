@@ -1,14 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from api.models.test_schedule import TestSchedule, TestScheduleCreate, TestScheduleRead
+from api.models.database import Project, User
 from api.database.database import get_db
-from typing import List
+from api.auth.router import get_optional_user
+from agents.schedule_daemon import get_schedule_daemon
+from api.pagination import (
+    Keyset, MAX_PAGE_SIZE, filter_time_range, set_next_cursor
+)
+from typing import List, Optional, Annotated
+from datetime import date
 
 router = APIRouter(prefix="/test_schedules", tags=["test_schedules"])
 
+# Schedules page in firing order; there is no created_at column
+TEST_SCHEDULE_KEYSET = Keyset(TestSchedule.date, TestSchedule.time, TestSchedule.id, descending=False)
+
 @router.get("/", response_model=List[TestScheduleRead])
-def list_test_schedules(db: Session = Depends(get_db)):
-    return db.query(TestSchedule).all()
+def list_test_schedules(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Annotated[Optional[int], Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    tag: Optional[str] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    query = db.query(TestSchedule)
+    if tag:
+        # Whole comma-delimited tokens, ignoring spaces; % and _ in the tag are literal
+        tags = ',' + func.replace(TestSchedule.tags, ' ', '') + ','
+        query = query.filter(tags.contains(f',{tag.strip()},', autoescape=True))
+    query = filter_time_range(query, TestSchedule.date, since, until)
+    schedules, next_cursor = TEST_SCHEDULE_KEYSET.paginate(query, cursor, limit)
+    set_next_cursor(response, next_cursor)
+    return schedules
 
 @router.get("/{test_id}", response_model=TestScheduleRead)
 def get_test_schedule(test_id: int, db: Session = Depends(get_db)):
@@ -17,25 +44,47 @@ def get_test_schedule(test_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Test schedule not found")
     return test
 
+def _check_project(db: Session, project_id: Optional[int]) -> None:
+    if project_id is not None and not db.query(Project.id).filter(Project.id == project_id).first():
+        raise HTTPException(status_code=404, detail="Project not found")
+
 @router.post("/", response_model=TestScheduleRead)
-def create_test_schedule(test: TestScheduleCreate, db: Session = Depends(get_db)):
+def create_test_schedule(
+    test: TestScheduleCreate,
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user)
+):
+    _check_project(db, test.project_id)
     db_test = TestSchedule(
         date=test.date,
         test_name=test.test_name,
         description=test.description,
         tags=",".join(test.tags),
-        time=test.time
+        time=test.time,
+        # The scheduler has no request to take the owner from, so it is kept on the schedule
+        user_id=user.id if user else None,
+        project_id=test.project_id
     )
     db.add(db_test)
     db.commit()
     db.refresh(db_test)
+    get_schedule_daemon().notify_upsert(db_test)
     return db_test
 
 @router.put("/{test_id}", response_model=TestScheduleRead)
-def update_test_schedule(test_id: int, test: TestScheduleCreate, db: Session = Depends(get_db)):
+def update_test_schedule(
+    test_id: int,
+    test: TestScheduleCreate,
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user)
+):
     db_test = db.query(TestSchedule).filter(TestSchedule.id == test_id).first()
     if not db_test:
         raise HTTPException(status_code=404, detail="Test schedule not found")
+    _check_project(db, test.project_id)
+    if db_test.user_id is None and user:
+        db_test.user_id = user.id
+    db_test.project_id = test.project_id
     db_test.date = test.date
     db_test.test_name = test.test_name
     db_test.description = test.description
@@ -43,6 +92,7 @@ def update_test_schedule(test_id: int, test: TestScheduleCreate, db: Session = D
     db_test.time = test.time
     db.commit()
     db.refresh(db_test)
+    get_schedule_daemon().notify_upsert(db_test)
     return db_test
 
 @router.delete("/{test_id}")
@@ -52,4 +102,5 @@ def delete_test_schedule(test_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Test schedule not found")
     db.delete(db_test)
     db.commit()
+    get_schedule_daemon().notify_delete(test_id)
     return {"ok": True} 
\ No newline at end of file
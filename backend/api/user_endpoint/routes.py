@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, Body, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from ..models.database import get_db, Trace, User, generate_api_key
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..database.database import get_async_db
+from ..models.database import Trace, User, AuditLog, generate_api_key
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 from pydantic import BaseModel
 from pathlib import Path
 import logging
@@ -53,44 +55,48 @@ DATA_DIR = Path("backend/server_data")
 for subdir in ["interactions", "logs", "metrics", "traces"]:
     (DATA_DIR / subdir).mkdir(parents=True, exist_ok=True)
 
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamp columns are naive UTC; asyncpg rejects aware datetimes for them"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 # API key validation
-def validate_api_key(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> str:
-    """Validate the API key from the Authorization header."""
+async def validate_api_key(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Resolve the user owning the API key from the Authorization header."""
     api_key = credentials.credentials
     
     # Check if API key exists in database
-    user = db.query(User).filter(User.api_key == api_key).first()
+    user = (await db.execute(select(User).where(User.api_key == api_key))).scalar_one_or_none()
     if not user:
         raise HTTPException(
             status_code=401,
             detail="Invalid API key"
         )
     
-    return api_key
+    return user
 
 @router.post("/upload_data")
 async def upload_data(
     data: UploadData,
-    api_key: str = Depends(validate_api_key),
-    db: Session = Depends(get_db)
+    user: User = Depends(validate_api_key),
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Handle data upload from EchoSysAI SDK and store in database.
     
     Args:
         data: The uploaded data containing interactions, logs, metrics, and traces
-        api_key: Validated API key from the Authorization header
+        user: Owner of the API key from the Authorization header
         db: Database session
         
     Returns:
         Dictionary with upload status
     """
     try:
-        # Get user from API key
-        user = db.query(User).filter(User.api_key == api_key).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid API key")
-
         # Process interactions
         for interaction in data.interactions:
             # Convert string timestamps to datetime objects if needed
@@ -112,8 +118,8 @@ async def upload_data(
                         "end_time": end_time.isoformat() if end_time else None
                     }
                 },
-                status="completed",
-                created_at=start_time or datetime.utcnow()
+                type="interaction",
+                created_at=_naive_utc(start_time) or datetime.utcnow()
             )
             db.add(trace)
         
@@ -132,8 +138,8 @@ async def upload_data(
                         "timestamp": timestamp.isoformat() if timestamp else None
                     }
                 },
-                status="completed",
-                created_at=timestamp or datetime.utcnow()
+                type="log",
+                created_at=_naive_utc(timestamp) or datetime.utcnow()
             )
             db.add(trace)
         
@@ -154,8 +160,8 @@ async def upload_data(
                             "timestamp": timestamp.isoformat() if timestamp else None
                         }
                     },
-                    status="completed",
-                    created_at=timestamp or datetime.utcnow()
+                    type="metric",
+                    created_at=_naive_utc(timestamp) or datetime.utcnow()
                 )
                 db.add(trace)
         
@@ -179,13 +185,13 @@ async def upload_data(
                         "end_time": end_time.isoformat() if end_time else None
                     }
                 },
-                status="completed",
-                created_at=start_time or datetime.utcnow()
+                type="trace",
+                created_at=_naive_utc(start_time) or datetime.utcnow()
             )
             db.add(trace)
         
         # Commit all changes
-        db.commit()
+        await db.commit()
         
         return {
             "status": "success",
@@ -199,7 +205,7 @@ async def upload_data(
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Error processing upload: {str(e)}")
         raise HTTPException(
             status_code=500,
@@ -209,7 +215,7 @@ async def upload_data(
 @router.post("/regenerate_api_key")
 async def regenerate_api_key(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, str]:
     """
     Regenerate the API key for the current user.
@@ -232,13 +238,13 @@ async def regenerate_api_key(
         db.add(audit_log)
         
         # Commit changes
-        db.commit()
+        await db.commit()
         
         return {"api_key": new_api_key}
     except Exception as e:
         logger.error(f"Error regenerating API key: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail="Error regenerating API key"
-        )
\ No newline at end of file
+        )
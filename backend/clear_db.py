@@ -1,13 +1,7 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from api.database.database import SessionLocal
 from api.models.database import Base, User, AuditLog, Notification, Project, ProjectMember, Issue, Trace
-from config.settings import settings
-
-# Create engine
-engine = create_engine(settings.DATABASE_URL)
 
 # Create session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 db = SessionLocal()
 
 try:
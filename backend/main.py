@@ -1,5 +1,7 @@
 from fastapi import FastAPI, HTTPException, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 import os
 import logging
 from logging.handlers import RotatingFileHandler
@@ -8,14 +10,25 @@ from datetime import datetime
 import uvicorn
 from starlette.middleware.sessions import SessionMiddleware
 from typing import List, Optional, Dict, Any
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import json
 
-from api.database.database import engine, get_db
-from api.models.database import Base as DatabaseBase, User, Trace as DBTrace
+from api.database.database import engine, async_engine, get_db, get_async_db, SessionLocal, database_pool_metrics
+from api.models.database import Base as DatabaseBase, User, TestResult, Trace as DBTrace
 from api.routes import api_router
+from api.pagination import NEXT_CURSOR_HEADER
+from api.conditional import ETAG_HEADER
+from api.responses import FastJSONResponse, fast_json_response
 from api.auth.router import router as auth_router
-from agents import DataIngestionAgent, RCAAgent, EvaluationAgent
+from agents import get_rca_agent
+from agents.rca_agent import rca_engine_metrics
+from agents.schedule_daemon import get_schedule_daemon
+from agents.rca_queue import get_rca_job_worker
+from agents.rca_orchestrator import RCAOrchestrator
+from agents.test_execution_agent import TestExecutionAgent
+from config.settings import settings
 
 # Set up logging
 log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
@@ -73,6 +86,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ETAG_HEADER],
 )
 
 app.add_middleware(
@@ -96,6 +110,38 @@ async def db_session_middleware(request: Request, call_next):
             db.close()
     return response
 
+@app.on_event("startup")
+def warm_up_rca_engine():
+    """Build the shared RCA engine once per worker instead of on the first request."""
+    try:
+        get_rca_agent()
+    except Exception as e:
+        logger.error(f"Error constructing RCA engine: {str(e)}")
+
+@app.on_event("startup")
+async def start_schedule_daemon():
+    """Run due TestSchedule entries in-process."""
+    if settings.SCHEDULER_ENABLED:
+        await get_schedule_daemon().start()
+
+@app.on_event("shutdown")
+async def stop_schedule_daemon():
+    await get_schedule_daemon().stop()
+
+@app.on_event("startup")
+async def start_rca_job_worker():
+    """Drain the RCA job queue in-process."""
+    if settings.RCA_QUEUE_ENABLED:
+        await get_rca_job_worker().start()
+
+@app.on_event("shutdown")
+async def stop_rca_job_worker():
+    await get_rca_job_worker().stop()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(api_router)  # This will include all routes including sanity_scheduler
@@ -225,74 +271,40 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "startup_metrics": {
+            "rca_engine": rca_engine_metrics
+        },
+        "db_pool": database_pool_metrics()
     }
 
 
-class RCAOrchestrator:
-    def __init__(self, db: Session):
-        self.db = db
-        self.data_agent = DataIngestionAgent(db)
-        self.rca_agent = RCAAgent()
-        self.eval_agent = EvaluationAgent(db)
-
-    async def analyze_user_data(self, user_id: int) -> dict:
-        """Analyze user data"""
-        try:
-            # Process traces
-            self.data_agent.process_traces(user_id=user_id)
-            
-            # Get analysis data
-            analysis_data = self.data_agent.get_analysis_data()
-            
-            # Get evaluation metrics
-            eval_metrics = self.eval_agent.evaluate_metrics(user_id)
-            
-            # Add evaluation metrics to analysis data
-            analysis_data['data']['evaluation_metrics'] = eval_metrics
-            
-            # Get RCA analysis
-            rca_result = self.rca_agent.analyze_data(analysis_data)
-            
-            if rca_result.get('status') == 'error':
-                error_msg = rca_result.get('error', 'Unknown error')
-                logger.error(f"RCA analysis failed: {error_msg}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Error in RCA analysis: {error_msg}"
-                )
-            
-            return {
-                'user_id': user_id,
-                'rca_result': rca_result['rca_report']
-            }
-            
-        except Exception as e:
-            logger.error(f"Error in RCA analysis: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error performing RCA analysis: {str(e)}"
-            )
+def run_user_analysis(user_id: int) -> dict:
+    """Blocking RCA pipeline on its own sync session, for the threadpool"""
+    db = SessionLocal()
+    try:
+        return RCAOrchestrator(db).analyze_user_data(user_id)
+    finally:
+        db.close()
 
 
 @app.post("/api/rca/analyze/{user_id}")
 async def analyze_user_data(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Analyze user data"""
     try:
         # Verify user exists
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        # Run analysis
-        orchestrator = RCAOrchestrator(db)
-        return await orchestrator.analyze_user_data(user_id)
+        # Run analysis; the agents use sync sessions and the LLM client blocks
+        return await run_in_threadpool(run_user_analysis, user_id)
         
     except HTTPException:
         raise
@@ -304,49 +316,92 @@ async def analyze_user_data(
         )
 
 
-@app.get("/api/rca/status/{user_id}")
+@app.get("/api/rca/test-results/{test_result_id}/stream")
+def stream_test_result_analysis(
+    test_result_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Stream the RCA report for one failed run as server-sent events.
+    
+    The analysis covers the traces around that run, as of when it ran. Each
+    report section is sent as a 'section' event as soon as the model
+    finishes it, followed by a 'done' event with the full report, or an
+    'error' event if generation or parsing fails.
+    """
+    test_result = db.query(TestResult).filter(TestResult.id == test_result_id).first()
+    if not test_result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test result not found"
+        )
+
+    # Database work happens before streaming starts; the generator only talks to the LLM
+    test_agent = TestExecutionAgent(db)
+    try:
+        analysis_data = test_agent.saved_run_analysis_data(test_result)
+    except Exception as e:
+        logger.error(f"Error preparing RCA data: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error preparing analysis data: {str(e)}"
+        )
+
+    def event_stream():
+        for event in test_agent.rca_agent.stream_analysis(analysis_data):
+            event_type = event.pop('event')
+            yield f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/rca/status/{user_id}", response_class=FastJSONResponse)
 async def get_analysis_status(
     user_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Check if data is available for RCA analysis for a specific user
     """
     try:
         # Check if user exists
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             return {"error": "User not found"}
 
-        # Get traces for the user
-        traces = db.query(DBTrace).filter(DBTrace.user_id == user_id).all()
-        
-        # Count traces
-        trace_count = len(traces)
+        # Count traces per type and the time range in one aggregate instead of loading them
+        counts = (await db.execute(
+            select(
+                DBTrace.type,
+                func.count(DBTrace.id),
+                func.min(DBTrace.created_at),
+                func.max(DBTrace.created_at)
+            ).where(DBTrace.user_id == user_id).group_by(DBTrace.type)
+        )).all()
+        type_counts = {trace_type: count for trace_type, count, _, _ in counts}
+        trace_count = sum(type_counts.values())
         
         # Get latest trace
-        latest_trace = db.query(DBTrace).filter(
-            DBTrace.user_id == user_id
-        ).order_by(DBTrace.created_at.desc()).first()
+        latest_trace = (await db.execute(
+            select(DBTrace).where(DBTrace.user_id == user_id).order_by(DBTrace.created_at.desc()).limit(1)
+        )).scalar_one_or_none()
         
         # Prepare metadata
+        start = min((row[2] for row in counts if row[2] is not None), default=None)
         metadata = {
             'total_traces': trace_count,
             'time_range': {
-                'start': (
-                    traces[0].created_at.isoformat() if traces else None
-                ),
-                'end': (
-                    latest_trace.created_at.isoformat() 
-                    if latest_trace else None
-                )
+                'start': start,
+                'end': latest_trace.created_at if latest_trace else None
             },
             'data_types': {
-                'interactions': sum(
-                    1 for t in traces if t.type == 'interaction'
-                ),
-                'logs': sum(1 for t in traces if t.type == 'log'),
-                'metrics': sum(1 for t in traces if t.type == 'metric')
+                'interactions': type_counts.get('interaction', 0),
+                'logs': type_counts.get('log', 0),
+                'metrics': type_counts.get('metric', 0)
             }
         }
         
@@ -363,19 +418,19 @@ async def get_analysis_status(
                     'trace_id': latest_trace.id,
                     'type': latest_trace.type,
                     'content': content,
-                    'timestamp': latest_trace.created_at.isoformat()
+                    'timestamp': latest_trace.created_at
                 }
             except Exception as e:
                 logger.error(f"Error parsing latest trace content: {str(e)}")
         
-        return {
+        return fast_json_response({
             "user_id": user_id,
             "status": "data_available" if trace_count > 0 else "no_data",
             "trace_count": trace_count,
             "latest_trace": latest_trace_details,
             "metadata": metadata,
-            "analysis_timestamp": datetime.utcnow().isoformat()
-        }
+            "analysis_timestamp": datetime.utcnow()
+        })
         
     except Exception as e:
         logger.error(f"Error in get_analysis_status: {str(e)}")
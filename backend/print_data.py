@@ -1,15 +1,9 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from api.database.database import SessionLocal
 from api.models.database import Trace, User
-from config.settings import settings
 import json
 from collections import defaultdict
 
-# Create engine
-engine = create_engine(settings.DATABASE_URL)
-
 # Create session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 db = SessionLocal()
 
 try:
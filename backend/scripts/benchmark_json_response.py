@@ -0,0 +1,121 @@
+"""
+Benchmark serializing a large /incidents response, default path vs orjson.
+
+Builds the list_incidents payload for --incidents incidents, each with a
+nested RCA report and its test result, and times the two ways of turning it
+into a response body:
+
+  default  strftime per datetime, jsonable_encoder, JSONResponse (json.dumps)
+  orjson   native datetimes, FastJSONResponse (orjson.dumps)
+
+Only serialization is timed; building the rows is not.
+
+    python scripts/benchmark_json_response.py --incidents 5000 --repeat 5
+
+Sample run:
+
+    path      median ms   body KB
+    default       723.5      4874
+    orjson         11.5      5032
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.responses import FastJSONResponse
+
+DISPLAY_FORMAT = "%b %d, %Y, %I:%M %p"
+
+
+def make_incidents(count):
+    now = datetime.utcnow()
+    incidents = []
+    for i in range(count):
+        created = now - timedelta(minutes=i)
+        incidents.append({
+            "id": i,
+            "title": f"Test Failure: Order confirmation {i % 50}",
+            "description": "Answer relevancy below threshold for order lookups",
+            "rca_report": {
+                "summary": "The order index served stale records after the nightly rebuild.",
+                "root_cause": "stale index",
+                "confidence": 0.82,
+                "contributing_factors": [
+                    {"factor": f"factor {j}", "weight": j / 10, "evidence": ["trace 1", "trace 2"]}
+                    for j in range(3)
+                ],
+                "recommendations": ["Rebuild the index", "Alert on index age"],
+            },
+            "status": "open" if i % 4 else "resolved",
+            "severity": "high",
+            "agent": "Order Agent",
+            "created_at": created,
+            "updated_at": created + timedelta(minutes=5),
+            "resolved_at": created + timedelta(hours=1) if i % 4 == 0 else None,
+            "test_result": {
+                "id": 10 * i,
+                "test_name": f"Order confirmation {i % 50}",
+                "instruction": "Confirm my order number 1234 for the new laptop.",
+                "expected_behavior": "Confirms the order and provides order details.",
+                "status": "failed",
+                "details": "answer_relevancy 0.21 < 0.8",
+                "run_date": created,
+            },
+        })
+    return incidents
+
+
+def default_body(incidents):
+    formatted = []
+    for incident in incidents:
+        formatted.append({
+            **incident,
+            "created_at": incident["created_at"].strftime(DISPLAY_FORMAT),
+            "updated_at": incident["updated_at"].strftime(DISPLAY_FORMAT),
+            "resolved_at": incident["resolved_at"].strftime(DISPLAY_FORMAT) if incident["resolved_at"] else None,
+            "test_result": {
+                **incident["test_result"],
+                "run_date": incident["test_result"]["run_date"].strftime(DISPLAY_FORMAT),
+            },
+        })
+    return JSONResponse(jsonable_encoder(formatted)).body
+
+
+def orjson_body(incidents):
+    return FastJSONResponse(incidents).body
+
+
+def time_ms(fn, incidents, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(incidents)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--incidents", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    incidents = make_incidents(args.incidents)
+    print(f"{'path':<8} {'median ms':>10} {'body KB':>9}")
+    results = {}
+    for label, fn in (("default", default_body), ("orjson", orjson_body)):
+        results[label] = time_ms(fn, incidents, args.repeat)
+        print(f"{label:<8} {results[label][0]:10.1f} {results[label][1] / 1024:9.0f}")
+    print(f"speedup  {results['default'][0] / results['orjson'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
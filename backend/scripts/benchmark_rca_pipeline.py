@@ -0,0 +1,83 @@
+"""
+Benchmark the test -> eval -> RCA -> incident path offline.
+
+Runs TestExecutionAgent.execute_test against the fake LLM backend so no
+network or API key is needed. Database writes go to an in-memory session
+double unless --database-url is given.
+
+    python scripts/benchmark_rca_pipeline.py --runs 200 --latency-ms 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.llm_backend import FakeLLMBackend
+from agents.rca_agent import RCAAgent
+from agents.test_execution_agent import TestExecutionAgent
+
+FAILING_TEST = {
+    "test_name": "Test Order Confirmation - Failure Case",
+    "instruction": "Confirm my order for the new laptop.",
+    "agent": "Order Confirmation Agent",
+    "environment": "Development",
+    "expected_behavior": "Should confirm the order and provide order details.",
+    "model_output": "Sorry, I cannot find your order.",
+    "context": [
+        "Order confirmation agent is being tested for order lookup and confirmation."
+    ]
+}
+
+
+def make_session(database_url):
+    if not database_url:
+        return MagicMock()
+    from sqlalchemy.orm import sessionmaker
+    from api.database.database import create_db_engine
+    return sessionmaker(bind=create_db_engine(database_url))()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    db = make_session(args.database_url)
+    agent = TestExecutionAgent(db)
+    agent.rca_agent = RCAAgent(
+        backend=FakeLLMBackend(latency_ms=args.latency_ms, failure_rate=args.failure_rate)
+    )
+
+    durations = []
+    statuses = {}
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        result = agent.execute_test(dict(FAILING_TEST))
+        durations.append((time.perf_counter() - t0) * 1000)
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    elapsed = time.perf_counter() - started
+
+    print(f"runs:        {args.runs}")
+    print(f"statuses:    {statuses}")
+    print(f"throughput:  {args.runs / elapsed:.1f} tests/s")
+    print(f"latency p50: {statistics.median(durations):.2f} ms")
+    print(f"latency p95: {percentile(durations, 95):.2f} ms")
+    print(f"latency p99: {percentile(durations, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
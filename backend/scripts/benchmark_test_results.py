@@ -0,0 +1,137 @@
+"""
+Benchmark GET /api/scheduler/test-results against a seeded database.
+
+Seeds test results (a third of them failed, each failure with an
+incident) into an in-memory SQLite database unless --database-url is
+given, then times the first and last page of the endpoint handler and
+counts the SQL statements each issues. --legacy also times the previous
+per-result history loop on a smaller seed for comparison.
+
+    python scripts/benchmark_test_results.py --results 10000 --history-limit 10
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+from fastapi import Response
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from api.database.database import create_db_engine
+from api.models.database import Incident, TestResult
+from api.pagination import NEXT_CURSOR_HEADER
+from api.routes.sanity_scheduler import get_test_results
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def seed(db, count, tests=200):
+    now = datetime.utcnow()
+    results = [
+        TestResult(
+            test_name=f"Test {i % tests}",
+            instruction="Confirm my order",
+            agent=f"Agent {i % 5}",
+            environment="Development",
+            expected_behavior="Confirms the order",
+            status="failed" if i % 3 == 0 else "passed",
+            result={},
+            created_at=now - timedelta(minutes=count - i),
+        )
+        for i in range(count)
+    ]
+    db.add_all(results)
+    db.flush()
+    db.add_all([
+        Incident(title=f"Test Failure: {r.test_name}", status="open", agent=r.agent,
+                 test_result_id=r.id, rca_report={}, created_at=r.created_at)
+        for r in results if r.status == "failed"
+    ])
+    db.commit()
+
+
+def legacy_history(db):
+    """The previous handler shape: one history query per result."""
+    out = []
+    for tr in db.query(TestResult).order_by(TestResult.created_at.desc()).all():
+        history = db.query(TestResult).filter(
+            TestResult.test_name == tr.test_name,
+            TestResult.agent == tr.agent,
+            TestResult.id != tr.id
+        ).order_by(TestResult.created_at.desc()).all()
+        out.append((tr.incident.id if tr.incident else None, len(history)))
+    return out
+
+
+def make_session(database_url, count):
+    engine = create_db_engine(database_url or "sqlite://")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+    if not database_url:
+        TestResult.__table__.create(engine)
+        Incident.__table__.create(engine)
+        db = sessionmaker(bind=engine)()
+        seed(db, count)
+        return db, statements
+    return sessionmaker(bind=engine)(), statements
+
+
+def timed(label, db, statements, fn):
+    statements.clear()
+    db.expire_all()
+    started = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - started
+    if hasattr(rows, "body"):
+        # The handler returns its serialized response; serializing is part of the timing
+        rows = orjson.loads(rows.body)
+    print(f"{label:<28} {elapsed * 1000:9.1f} ms  {len(statements):>6} queries  {len(rows)} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=10000)
+    parser.add_argument("--history-limit", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--legacy", action="store_true")
+    parser.add_argument("--legacy-results", type=int, default=2000)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    db, statements = make_session(args.database_url, args.results)
+    timed(f"first page ({args.results})", db, statements,
+          lambda: get_test_results(history_limit=args.history_limit, limit=args.limit, db=db))
+
+    # Walk to the last page, then time fetching it again from its cursor
+    response, cursor, last_cursor = Response(), None, None
+    while True:
+        get_test_results(response=response, history_limit=0, cursor=cursor, limit=args.limit, db=db)
+        next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not next_cursor:
+            break
+        last_cursor, cursor, response = next_cursor, next_cursor, Response()
+    timed(f"last page ({args.results})", db, statements,
+          lambda: get_test_results(history_limit=args.history_limit, cursor=last_cursor,
+                                   limit=args.limit, db=db))
+
+    if args.legacy:
+        legacy_db, legacy_statements = make_session(args.database_url, args.legacy_results)
+        timed(f"windowed ({args.legacy_results})", legacy_db, legacy_statements,
+              lambda: get_test_results(history_limit=args.history_limit,
+                                       limit=args.legacy_results, db=legacy_db))
+        timed(f"per-result loop ({args.legacy_results})", legacy_db, legacy_statements,
+              lambda: legacy_history(legacy_db))
+
+
+if __name__ == "__main__":
+    main()
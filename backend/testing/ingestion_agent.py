@@ -9,13 +9,14 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 import json
-from sqlalchemy import create_engine, Column, Integer, Text
+from sqlalchemy import Column, Integer, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from api.database.database import create_db_engine
 
 # SQLAlchemy setup
 DATABASE_URL = "sqlite:///scenarios.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 import requests
 import json
-from testing.rca_langchain_agent import chain
+from testing.rca_langchain_agent import run_rca
 import os
 
 app = FastAPI()
@@ -17,7 +17,7 @@ def run_rca_on_scenarios(scenarios):
     results = []
     for i, scenario in enumerate(scenarios):
         scenario_str = json.dumps(scenario, indent=2)
-        rca_result = chain.invoke({"scenario": scenario_str})["text"]
+        rca_result = run_rca(scenario_str)
         results.append({
             "scenario_id": i + 1,
             "rca_report": rca_result
@@ -3,9 +3,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import json
-from langchain_community.chat_models import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from agents.llm_backend import get_llm_backend
 
 # Advanced Prompt template for RCA
 prompt_template = (
@@ -35,23 +34,19 @@ prompt_template = (
     "{scenario}\n"
 )
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY not set in environment variables.")
+# Backend is selected by LLM_BACKEND (openai or fake); the OpenAI client is
+# only created, and the API key only required, on the first completion.
+backend = get_llm_backend()
 
-llm = ChatOpenAI(
-    model_name="gpt-4",  # or "gpt-3.5-turbo"
-    temperature=0,
-    openai_api_key=openai_api_key
+prompt = PromptTemplate(
+    input_variables=["scenario"],
+    template=prompt_template
 )
 
-chain = LLMChain(
-    llm=llm,
-    prompt=PromptTemplate(
-        input_variables=["scenario"],
-        template=prompt_template
-    )
-)
+
+def run_rca(scenario_str: str) -> str:
+    """Run the RCA prompt for a serialized scenario and return the raw report text."""
+    return backend.complete(prompt.format(scenario=scenario_str))
 
 if __name__ == "__main__":
     with open("synthetic_agent_issues.json") as f:
@@ -60,5 +55,5 @@ if __name__ == "__main__":
     for i, scenario in enumerate(scenarios):
         print(f"\n--- RCA Report for Scenario {i+1} ---")
         scenario_str = json.dumps(scenario, indent=2)
-        result = chain.invoke({"scenario": scenario_str})["text"]
+        result = run_rca(scenario_str)
         print(result) 
\ No newline at end of file
@@ -0,0 +1,87 @@
+import unittest
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api.auth.router import create_access_token
+from api.database.database import async_database_url, get_async_db
+from api.models.database import AuditLog, Trace, User
+from api.user_endpoint.routes import router as user_endpoint_router
+
+
+class TestAsyncDatabaseUrl(unittest.TestCase):
+    def test_drivers_are_swapped(self):
+        self.assertEqual(
+            async_database_url("postgresql://u:p@db:5432/echosys?sslmode=require"),
+            "postgresql+asyncpg://u:p@db:5432/echosys?ssl=require"
+        )
+        self.assertEqual(async_database_url("postgres://u@db/x"), "postgresql+asyncpg://u@db/x")
+        self.assertEqual(async_database_url("sqlite:///./local.db"), "sqlite+aiosqlite:///./local.db")
+
+
+class TestAsyncUserRoutes(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            for model in (User, Trace, AuditLog):
+                await conn.run_sync(model.__table__.create)
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+        async with self.Session() as db:
+            db.add(User(email="dev@example.com", name="Dev", hashed_password="", api_key="key-1"))
+            await db.commit()
+
+        async def override_get_async_db():
+            async with self.Session() as session:
+                yield session
+
+        app = FastAPI()
+        app.include_router(user_endpoint_router, prefix="/api/user")
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        self.client = AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.engine.dispose()
+
+    async def test_upload_data_stores_typed_traces(self):
+        response = await self.client.post(
+            "/api/user/upload_data",
+            headers={"Authorization": "Bearer key-1"},
+            json={
+                "interactions": [{"prompt": "hi", "start_time": "2025-05-01T09:00:00Z", "end_time": "2025-05-01T09:00:01Z"}],
+                "logs": [{"timestamp": "2025-05-01T09:00:02+02:00", "level": "ERROR"}],
+                "metrics": {"latency": [{"timestamp": "2025-05-01T09:00:03Z", "value": 1.5}]},
+                "traces": [],
+            },
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["counts"]["metrics"], 1)
+        async with self.Session() as db:
+            traces = (await db.execute(select(Trace).order_by(Trace.created_at))).scalars().all()
+        self.assertEqual([t.type for t in traces], ["log", "interaction", "metric"])
+        self.assertIsNone(traces[0].created_at.tzinfo)
+
+    async def test_unknown_api_key_is_rejected(self):
+        response = await self.client.post(
+            "/api/user/upload_data", headers={"Authorization": "Bearer nope"},
+            json={"interactions": [], "logs": [], "metrics": {}, "traces": []},
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_regenerate_api_key(self):
+        token = create_access_token({"sub": "dev@example.com"})
+        response = await self.client.post(
+            "/api/user/regenerate_api_key", headers={"Authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        async with self.Session() as db:
+            user = (await db.execute(select(User))).scalar_one()
+            audit = (await db.execute(select(AuditLog))).scalar_one()
+        self.assertEqual(user.api_key, response.json()["api_key"])
+        self.assertEqual(audit.action_type, "regenerate_api_key")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.conditional import etag_matches, markers_query
+from api.database.database import get_db
+from api.models.database import Incident, TestResult
+from api.routes.sanity_scheduler import router as scheduler_router
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class TestConditionalGet(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        for model in (TestResult, Incident):
+            model.__table__.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        db = self.Session()
+        now = datetime(2025, 5, 1, 12, 0)
+        for i in range(5):
+            db.add(TestResult(
+                test_name=f"Test {i % 2}",
+                instruction="Confirm my order",
+                agent="Order Agent",
+                environment="Development",
+                expected_behavior="Confirms the order",
+                status="failed" if i == 4 else "passed",
+                result={},
+                created_at=now + timedelta(minutes=i),
+            ))
+        db.flush()
+        failed = db.query(TestResult).filter_by(status="failed").one()
+        db.add(Incident(title="Test Failure", status="open", rca_report={}, test_result_id=failed.id))
+        db.commit()
+        db.close()
+
+        app = FastAPI()
+        app.include_router(scheduler_router, prefix="/api/scheduler")
+
+        def override_get_db():
+            session = self.Session()
+            try:
+                yield session
+            finally:
+                session.close()
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = TestClient(app)
+
+    def test_unchanged_list_is_answered_with_304_from_the_markers_only(self):
+        for path in ("/api/scheduler/test-results", "/api/scheduler/incidents"):
+            first = self.client.get(path)
+            self.assertEqual(first.status_code, 200)
+            etag = first.headers["ETag"]
+            self.assertTrue(etag.startswith('W/"'))
+
+            statements = []
+            listener = lambda *args: statements.append(1)
+            event.listen(self.engine, "before_cursor_execute", listener)
+            second = self.client.get(path, headers={"If-None-Match": etag})
+            event.remove(self.engine, "before_cursor_execute", listener)
+            self.assertEqual(second.status_code, 304)
+            self.assertEqual(second.headers["ETag"], etag)
+            self.assertEqual(second.content, b"")
+            # Only the marker query, none of the list queries
+            self.assertEqual(len(statements), 1)
+
+    def test_writes_and_parameters_change_the_etag(self):
+        path = "/api/scheduler/incidents"
+        etag = self.client.get(path).headers["ETag"]
+        self.assertNotEqual(self.client.get(path, params={"status": "open"}).headers["ETag"], etag)
+
+        db = self.Session()
+        incident = db.query(Incident).one()
+        incident.status = "resolved"
+        db.commit()
+        db.close()
+        changed = self.client.get(path, headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]["status"], "resolved")
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_postgres_markers_avoid_counting_rows(self):
+        sql = str(markers_query(Incident, TestResult, postgres=True).compile(dialect=postgresql.dialect()))
+        self.assertNotIn("count(", sql)
+        self.assertIn("pg_stat_user_tables", sql)
+
+    def test_deletes_change_the_etag(self):
+        path = "/api/scheduler/test-results"
+        etag = self.client.get(path).headers["ETag"]
+        db = self.Session()
+        db.delete(db.query(TestResult).filter_by(status="passed").order_by(TestResult.id).first())
+        db.commit()
+        db.close()
+        self.assertNotEqual(self.client.get(path).headers["ETag"], etag)
+
+    def test_if_none_match_uses_weak_comparison(self):
+        self.assertTrue(etag_matches('"abc", W/"def"', 'W/"abc"'))
+        self.assertTrue(etag_matches('*', 'W/"abc"'))
+        self.assertFalse(etag_matches('W/"def"', 'W/"abc"'))
+        self.assertFalse(etag_matches(None, 'W/"abc"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
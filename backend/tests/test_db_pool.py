@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.orm import sessionmaker
+
+from api.auth.router import create_access_token
+from api.database import database
+from api.database.database import InstrumentedQueuePool, create_db_engine, engine_options, get_db, pool_metrics
+from api.endpoints.projects import router as projects_router
+from api.models import database as models_database
+from api.models.database import Project, ProjectMember, User
+
+
+class TestDatabasePool(unittest.TestCase):
+    def setUp(self):
+        path = os.path.join(tempfile.mkdtemp(), 'pool.db')
+        self.engine = create_db_engine(
+            f"sqlite:///{path}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.05
+        )
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_models_share_the_application_engine(self):
+        self.assertIs(models_database.engine, database.engine)
+        self.assertIs(models_database.SessionLocal, database.SessionLocal)
+
+    def test_postgres_options_come_from_settings(self):
+        options = engine_options("postgresql://user:secret@db:5432/echosys")
+        self.assertIs(options['poolclass'], InstrumentedQueuePool)
+        self.assertFalse(options['echo'])
+        async_options = engine_options("postgresql://user:secret@db:5432/echosys", is_async=True)
+        # The sync and async pools split one budget
+        self.assertEqual(options['pool_size'] + async_options['pool_size'], database.settings.DB_POOL_SIZE)
+        self.assertEqual(
+            options['max_overflow'] + async_options['max_overflow'], database.settings.DB_MAX_OVERFLOW
+        )
+        self.assertEqual(options['pool_recycle'], database.settings.DB_POOL_RECYCLE_SECONDS)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertNotIn('poolclass', engine_options("sqlite://"))
+
+    def test_sqlite_pools_are_instrumented_or_reported_unavailable(self):
+        path = os.path.join(tempfile.mkdtemp(), 'file.db')
+        file_engine = create_db_engine(f"sqlite:///{path}")
+        file_engine.connect().close()
+        self.assertEqual(pool_metrics(file_engine)['checkouts'], 1)
+        file_engine.dispose()
+
+        memory_engine = create_db_engine("sqlite://")
+        self.assertFalse(pool_metrics(memory_engine)['available'])
+        memory_engine.dispose()
+
+    def test_metrics_report_checkouts_and_timeouts(self):
+        held = self.engine.connect()
+        metrics = pool_metrics(self.engine)
+        self.assertEqual((metrics['size'], metrics['checked_out'], metrics['checkouts']), (1, 1, 1))
+
+        with self.assertRaises(sa_exc.TimeoutError):
+            self.engine.connect()
+        metrics = pool_metrics(self.engine)
+        self.assertEqual((metrics['checkouts'], metrics['timeouts']), (2, 1))
+        self.assertGreaterEqual(metrics['wait_ms_max'], 50)
+
+        held.close()
+        self.engine.dispose()
+        self.engine.connect().close()
+        metrics = pool_metrics(self.engine)
+        self.assertEqual((metrics['checked_out'], metrics['checkouts'], metrics['timeouts']), (0, 3, 1))
+
+
+class TestSyncRouteConnections(unittest.TestCase):
+    def setUp(self):
+        path = os.path.join(tempfile.mkdtemp(), 'projects.db')
+        self.engine = create_db_engine(f"sqlite:///{path}")
+        for model in (User, Project, ProjectMember):
+            model.__table__.create(self.engine)
+        Session = sessionmaker(bind=self.engine)
+        db = Session()
+        db.add(User(id=1, email="dev@example.com", name="Dev", hashed_password=""))
+        db.add(Project(id=1, name="Checkout", owner_id=1))
+        db.add(ProjectMember(project_id=1, user_id=1, email="dev@example.com", role="owner"))
+        db.commit()
+        db.close()
+
+        def override_get_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+
+        app = FastAPI()
+        app.include_router(projects_router)
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = TestClient(app)
+        self.headers = {"Authorization": f"Bearer {create_access_token({'sub': 'dev@example.com'})}"}
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_project_routes_hold_one_connection(self):
+        before = pool_metrics(self.engine)['checkouts']
+        response = self.client.get("/projects/1/integrations", headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        # The user lookup shares the handler's session
+        self.assertEqual(pool_metrics(self.engine)['checkouts'] - before, 1)
+        self.assertEqual(self.client.get("/projects/1/integrations").status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import random
+import unittest
+from unittest.mock import Mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.data_ingestion_agent import DataIngestionAgent
+from agents.eval_cache import EvaluationCache, LRUCache
+from agents.eval_sampling import SamplingPolicy, reservoir_sample
+from agents.eval_scorers import MetricScorer
+from agents.evaluation_agent import EvaluationAgent
+from api.models.database import EvalBudgetCharge
+
+
+def make_interactions(agent, count, start=0):
+    return [
+        {
+            'trace_id': start + i,
+            'agent': agent,
+            'model': {'name': 'gpt-4'},
+            'pattern_count': 1,
+            'prompt': {'text': f'q{start + i}'},
+            'response': {'text': f'a{start + i}'}
+        }
+        for i in range(count)
+    ]
+
+
+class TraceScorer(MetricScorer):
+    """Scores 1.0 for the busy agent's traces and 0.0 for the quiet one's."""
+    name = "trace"
+
+    def score_batch(self, metric_name, cases):
+        return [1.0 if int(case['user_query'][1:]) < 1000 else 0.0 for case in cases]
+
+
+class TestSamplingPolicy(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        EvalBudgetCharge.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.busy = make_interactions('Support Agent', 900)
+        self.quiet = make_interactions('Billing Agent', 100, start=1000)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_reservoir_sample_is_uniform_size(self):
+        sample = reservoir_sample(range(1000), 10, random.Random(1))
+        self.assertEqual(len(sample), 10)
+        self.assertEqual(len(set(sample)), 10)
+
+    def test_risky_interactions_are_always_selected(self):
+        policy = SamplingPolicy(per_stratum=5, tenant_cap=100, window_seconds=60, seed=1)
+        selected = policy.select(self.db, 1, self.busy + self.quiet, risky_trace_ids={3, 1050})
+        ids = [i['trace_id'] for i in selected]
+        self.assertIn(3, ids)
+        self.assertIn(1050, ids)
+        self.assertEqual(len(selected), 2 + 5 + 5)
+        self.assertEqual(ids, sorted(ids))
+
+    def test_weights_estimate_the_population(self):
+        policy = SamplingPolicy(per_stratum=10, tenant_cap=100, window_seconds=60, seed=1)
+        selected = policy.select(self.db, 1, self.busy + self.quiet)
+        self.assertAlmostEqual(sum(i['sample_weight'] for i in selected), 1000)
+
+    def test_tenant_cap_limits_evaluations_per_window(self):
+        policy = SamplingPolicy(per_stratum=50, tenant_cap=30, window_seconds=60, seed=1)
+        self.assertEqual(len(policy.select(self.db, 1, self.busy + self.quiet)), 30)
+        # Spent: one per stratum only
+        self.assertEqual(len(policy.select(self.db, 1, self.busy + self.quiet)), 2)
+        self.assertEqual(policy.remaining_budget(self.db, 1), 0)
+        self.assertEqual(policy.remaining_budget(self.db, 2), 30)
+
+    def test_budget_is_shared_across_replicas(self):
+        first = SamplingPolicy(per_stratum=50, tenant_cap=30, window_seconds=60, seed=1)
+        second = SamplingPolicy(per_stratum=50, tenant_cap=30, window_seconds=60, seed=2)
+        first.select(self.db, 1, self.busy + self.quiet)
+        self.assertEqual(second.remaining_budget(self.db, 1), 0)
+
+    def test_every_stratum_stays_in_the_estimate(self):
+        policy = SamplingPolicy(per_stratum=10, tenant_cap=1, window_seconds=60, seed=1)
+        selected = policy.select(self.db, 1, self.busy + self.quiet)
+        self.assertEqual({i['agent'] for i in selected}, {'Support Agent', 'Billing Agent'})
+        self.assertAlmostEqual(sum(i['sample_weight'] for i in selected), 1000)
+
+    def test_weighted_average_corrects_for_sampling(self):
+        policy = SamplingPolicy(per_stratum=10, tenant_cap=100, window_seconds=60, seed=1)
+        selected = policy.select(self.db, 1, self.busy + self.quiet)
+        agent = EvaluationAgent(Mock(), scorer=TraceScorer(), cache=EvaluationCache(None, LRUCache(10)))
+        results = agent.evaluate_metrics(1, selected)
+        # Equal-size strata samples would average 0.5; the traffic is 90% busy agent
+        self.assertAlmostEqual(results['summary']['average_scores']['faithfulness'], 0.9)
+        self.assertAlmostEqual(results['summary']['estimated_population'], 1000)
+
+
+class TestRiskSignals(unittest.TestCase):
+    def test_signal_anywhere_in_window_flags_the_interaction(self):
+        agent = DataIngestionAgent(Mock())
+        agent.interaction_windows = {10: [10, 11, 12], 20: [20, 21]}
+        agent.processed_data['ai_signals']['hallucinations'].append({'trace_id': 11})
+        self.assertEqual(agent.get_risky_trace_ids(), {10})
+
+        agent.processed_data['ai_signals']['session_contexts'].append({
+            'context_traces': [{'trace_id': 21, 'type': 'log', 'content': {'status': 'ERROR'}}]
+        })
+        self.assertEqual(agent.get_risky_trace_ids(), {10, 20})
+
+
+if __name__ == '__main__':
+    unittest.main()
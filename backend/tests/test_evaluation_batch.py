@@ -0,0 +1,122 @@
+import time
+import unittest
+
+from agents.eval_cache import memory_tier
+from agents.eval_scorers import LLMJudgeScorer, MetricScorer
+from agents.evaluation_agent import EvaluationAgent
+from agents.llm_backend import FakeLLMBackend
+
+
+class CountingScorer(MetricScorer):
+    name = "counting"
+
+    def __init__(self):
+        self.calls = []
+
+    def score_batch(self, metric_name, cases):
+        self.calls.append((metric_name, len(cases)))
+        return [len(case['model_output']) / 10 for case in cases]
+
+
+class TestBatchedEvaluation(unittest.TestCase):
+    def setUp(self):
+        memory_tier.clear()
+        self.scorer = CountingScorer()
+        self.agent = EvaluationAgent(None, scorer=self.scorer, batch_size=4)
+        self.cases = [
+            {'user_query': f'q{i}', 'model_output': 'x' * i, 'context': []}
+            for i in range(10)
+        ]
+
+    def test_results_keep_input_order_and_shape(self):
+        results = self.agent.evaluate_batch(self.cases)
+        self.assertEqual(len(results), 10)
+        for i, result in enumerate(results):
+            self.assertEqual(set(result), {'answer_relevancy', 'faithfulness', 'hallucination'})
+            self.assertAlmostEqual(result['faithfulness']['score'], i / 10)
+            self.assertIn('passed', result['faithfulness'])
+
+    def test_scorer_is_called_per_metric_per_batch(self):
+        self.agent.evaluate_batch(self.cases)
+        self.assertEqual(len(self.scorer.calls), 3 * 3)  # 3 metrics x ceil(10 / 4) batches
+        sizes = [size for metric, size in self.scorer.calls if metric == 'faithfulness']
+        self.assertEqual(sizes, [4, 4, 2])
+
+    def test_evaluate_interaction_matches_batch_shape(self):
+        single = self.agent.evaluate_interaction('q3', 'xxx', [], gold_standard={'output': 'y'})
+        self.assertEqual(single['faithfulness'], self.agent.evaluate_batch([self.cases[3]])[0]['faithfulness'])
+        self.assertIn('faithfulness_gold_comparison', single)
+
+    def test_forced_failure_is_preserved(self):
+        result = self.agent.evaluate_interaction('Confirm my order for the new laptop.', '', [])
+        self.assertFalse(result['answer_relevancy']['passed'])
+
+
+class SlowScorer(MetricScorer):
+    name = "slow"
+
+    def __init__(self, delays, fail=()):
+        self.delays = delays
+        self.fail = fail
+
+    def score_batch(self, metric_name, cases):
+        time.sleep(self.delays.get(metric_name, 0))
+        if metric_name in self.fail:
+            raise RuntimeError("judge unavailable")
+        return [0.9 for _ in cases]
+
+
+class TestParallelMetrics(unittest.TestCase):
+    def setUp(self):
+        memory_tier.clear()
+
+    def test_latency_is_set_by_slowest_metric(self):
+        scorer = SlowScorer({'answer_relevancy': 0.2, 'faithfulness': 0.2, 'hallucination': 0.2})
+        agent = EvaluationAgent(None, scorer=scorer, metric_workers=3)
+        started = time.monotonic()
+        result = agent.evaluate_interaction('q', 'a', [])
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(len(result), 3)
+
+    def test_timeout_and_failure_are_reported_as_failed(self):
+        scorer = SlowScorer({'hallucination': 1.0}, fail=('faithfulness',))
+        agent = EvaluationAgent(None, scorer=scorer, metric_workers=3, metric_timeout=0.2)
+        started = time.monotonic()
+        result = agent.evaluate_interaction('q-partial', 'a', [])
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(result['answer_relevancy']['score'], 0.9)
+        self.assertEqual(
+            {name: (result[name]['score'], result[name]['passed'], result[name]['error'])
+             for name in ('faithfulness', 'hallucination')},
+            {'faithfulness': (None, False, 'judge unavailable'), 'hallucination': (None, False, 'timeout')}
+        )
+
+    def test_timeout_applies_with_one_worker(self):
+        scorer = SlowScorer({'answer_relevancy': 1.0})
+        agent = EvaluationAgent(None, scorer=scorer, metric_workers=1, metric_timeout=0.2)
+        agent.metrics = {'answer_relevancy': {'threshold': 1.0}}
+        started = time.monotonic()
+        result = agent.evaluate_interaction('q-single', 'a', [])
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(result, {'answer_relevancy': {'score': None, 'threshold': 1.0, 'passed': False, 'error': 'timeout'}})
+
+
+class TestLLMJudgeScorer(unittest.TestCase):
+    def test_one_judge_call_scores_the_batch(self):
+        backend = FakeLLMBackend(responses=['[0.9, 1.4, -1]'])
+        scores = LLMJudgeScorer(backend).score_batch('faithfulness', [
+            {'user_query': 'q', 'model_output': 'a', 'context': []}
+        ] * 3)
+        self.assertEqual(scores, [0.9, 1.0, 0.0])
+        self.assertEqual(backend.calls, 1)
+
+    def test_mismatched_score_count_raises(self):
+        backend = FakeLLMBackend(responses=['[0.9]'])
+        with self.assertRaises(ValueError):
+            LLMJudgeScorer(backend).score_batch('faithfulness', [
+                {'user_query': 'q', 'model_output': 'a', 'context': []}
+            ] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
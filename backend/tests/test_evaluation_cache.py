@@ -0,0 +1,84 @@
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.eval_cache import EvaluationCache, LRUCache
+from agents.eval_scorers import MetricScorer
+from agents.evaluation_agent import EvaluationAgent
+from api.models.database import EvaluationCacheEntry
+
+
+class CountingScorer(MetricScorer):
+    name = "counting"
+
+    def __init__(self, version="1"):
+        self.version = version
+        self.scored = 0
+
+    def score_batch(self, metric_name, cases):
+        self.scored += len(cases)
+        return [0.5 for _ in cases]
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        EvaluationCacheEntry.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.cases = [
+            {'user_query': f'q{i}', 'model_output': f'a{i}', 'context': ['ctx']}
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _agent(self, scorer, memory=None):
+        cache = EvaluationCache(self.db, memory=memory or LRUCache(100))
+        return EvaluationAgent(self.db, scorer=scorer, cache=cache)
+
+    def test_memory_tier_skips_scorer_on_repeat(self):
+        scorer = CountingScorer()
+        agent = self._agent(scorer)
+        first = agent.evaluate_batch(self.cases)
+        second = agent.evaluate_batch(self.cases)
+        self.assertEqual(scorer.scored, 5 * 3)
+        self.assertEqual(first, second)
+
+    def test_table_tier_survives_a_cold_memory_tier(self):
+        self._agent(CountingScorer()).evaluate_batch(self.cases)
+        self.assertEqual(self.db.query(EvaluationCacheEntry).count(), 5 * 3)
+
+        scorer = CountingScorer()
+        self._agent(scorer).evaluate_batch(self.cases + [
+            {'user_query': 'new', 'model_output': 'b', 'context': []}
+        ])
+        self.assertEqual(scorer.scored, 1 * 3)
+
+    def test_scorer_version_change_misses(self):
+        self._agent(CountingScorer()).evaluate_batch(self.cases)
+        scorer = CountingScorer(version="2")
+        self._agent(scorer).evaluate_batch(self.cases)
+        self.assertEqual(scorer.scored, 5 * 3)
+
+    def test_cache_writes_leave_the_callers_transaction_open(self):
+        self.db.add(EvaluationCacheEntry(cache_key='pending', metric='faithfulness', score=0.1))
+        self._agent(CountingScorer()).evaluate_batch(self.cases)
+        self.assertEqual(self.db.query(EvaluationCacheEntry).count(), 1 + 5 * 3)
+        # Nothing was committed behind the caller's back
+        self.db.rollback()
+        self.assertEqual(self.db.query(EvaluationCacheEntry).count(), 0)
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUCache(2)
+        lru.put('a', 0.1)
+        lru.put('b', 0.2)
+        lru.get('a')
+        lru.put('c', 0.3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from agents.eval_cache import EvaluationCache, LRUCache
+from agents.eval_scorers import MetricScorer
+from agents.evaluation_agent import EvaluationAgent
+from api.models.database import CustomMetric, EvaluationResult
+
+
+class FixedScorer(MetricScorer):
+    name = "fixed"
+
+    def __init__(self, score):
+        self.score = score
+
+    def score_batch(self, metric_name, cases):
+        return [self.score for _ in cases]
+
+
+class TestEvaluationResultPersistence(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        CustomMetric.__table__.create(self.engine)
+        EvaluationResult.__table__.create(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.interactions = [
+            {'trace_id': i, 'prompt': {'text': f'q{i}'}, 'response': {'text': f'a{i}'}, 'context': []}
+            for i in range(1, 6)
+        ]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _agent(self, score):
+        return EvaluationAgent(self.db, scorer=FixedScorer(score), cache=EvaluationCache(None, LRUCache(10)))
+
+    def test_results_written_with_one_insert(self):
+        statements = []
+        event.listen(
+            self.engine, 'before_cursor_execute',
+            lambda conn, cursor, statement, *args: statements.append(statement)
+        )
+        self._agent(1.0).evaluate_metrics(1, self.interactions)
+
+        inserts = [s for s in statements if s.startswith('INSERT INTO evaluation_results')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(self.db.query(EvaluationResult).count(), 5 * 3)
+        row = self.db.query(EvaluationResult).filter_by(trace_id=3, metric='faithfulness').one()
+        self.assertTrue(row.passed)
+        self.assertEqual(row.threshold, 1.0)
+
+    def test_latest_score_and_history(self):
+        agent = self._agent(1.0)
+        agent.evaluate_metrics(1, self.interactions)
+        # Age the first run so the second one is strictly newer
+        self.db.query(EvaluationResult).update(
+            {EvaluationResult.evaluated_at: datetime.utcnow() - timedelta(hours=1)}
+        )
+        self.db.commit()
+        self._agent(0.2).evaluate_metrics(1, self.interactions[:2])
+
+        latest = agent.get_latest_scores([1, 4])
+        self.assertEqual(latest[1]['faithfulness']['score'], 0.2)
+        self.assertFalse(latest[1]['faithfulness']['passed'])
+        self.assertEqual(latest[4]['faithfulness']['score'], 1.0)
+
+        history = agent.get_metric_history('faithfulness', limit=3)
+        self.assertEqual([h['score'] for h in history], [0.2, 0.2, 1.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
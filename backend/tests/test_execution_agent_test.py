@@ -120,12 +120,16 @@ class TestTestExecutionAgent(unittest.TestCase):
             }
         ]
         
-        # Mock the execute_test method
-        with patch.object(self.test_agent, 'execute_test') as mock_execute:
-            mock_execute.side_effect = [
-                {'status': 'passed', 'test_result': {}},
-                {'status': 'failed', 'test_result': {}, 'rca_report': {}}
-            ]
+        outcomes = {
+            'Test 1': {'status': 'passed', 'test_result': {}},
+            'Test 2': {'status': 'failed', 'test_result': {}, 'rca_report': {}}
+        }
+        # Each worker opens its own session
+        self.test_agent.session_factory = Mock(side_effect=lambda: Mock())
+        
+        # Mock the execute_test method; workers run tests in any order
+        with patch.object(TestExecutionAgent, 'execute_test') as mock_execute:
+            mock_execute.side_effect = lambda config: outcomes[config['test_name']]
             
             # Execute batch tests
             results = self.test_agent.execute_batch_tests(test_configs)
@@ -134,7 +138,9 @@ class TestTestExecutionAgent(unittest.TestCase):
             self.assertEqual(len(results), 2)
             self.assertEqual(results[0]['test_name'], 'Test 1')
             self.assertEqual(results[1]['test_name'], 'Test 2')
+            self.assertEqual(results[1]['result']['status'], 'failed')
             self.assertEqual(mock_execute.call_count, 2)
+            self.assertEqual(self.test_agent.session_factory.call_count, 2)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,68 @@
+import unittest
+from unittest.mock import Mock
+
+from agents.fingerprint import compute_failure_fingerprint, normalize_evidence
+from agents.test_execution_agent import TestExecutionAgent
+
+
+class TestFailureFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            'test_name': 'Test Order Confirmation - Failure Case',
+            'agent': 'Order Confirmation Agent',
+            'model_output': 'Order 12345 not found at 2025-05-07T03:26:38Z'
+        }
+        self.eval_result = {
+            'answer_relevancy': {'score': 0.5, 'threshold': 0.8, 'passed': False},
+            'faithfulness': {'score': 0.9, 'threshold': 0.8, 'passed': True}
+        }
+
+    def test_volatile_tokens_are_normalized(self):
+        self.assertEqual(
+            normalize_evidence('Order 12345 not found at 2025-05-07T03:26:38Z'),
+            normalize_evidence('Order  99 not found at 2025-06-01T10:00:00Z')
+        )
+
+    def test_same_failure_shares_fingerprint(self):
+        rerun = dict(self.config, model_output='Order 777 not found at 2025-06-01T10:00:00Z')
+        self.assertEqual(
+            compute_failure_fingerprint(self.config, self.eval_result),
+            compute_failure_fingerprint(rerun, self.eval_result)
+        )
+
+    def test_different_failing_metrics_change_fingerprint(self):
+        other = dict(self.eval_result, faithfulness={'score': 0.1, 'threshold': 0.8, 'passed': False})
+        self.assertNotEqual(
+            compute_failure_fingerprint(self.config, self.eval_result),
+            compute_failure_fingerprint(self.config, other)
+        )
+
+
+class TestRCAReuse(unittest.TestCase):
+    def test_matching_open_incident_reuses_rca(self):
+        mock_db = Mock()
+        existing = Mock(id=7, rca_report={'summary': 'cached'}, occurrence_count=3)
+        mock_db.query.return_value.filter.return_value.with_for_update.return_value.first.return_value = existing
+        agent = TestExecutionAgent(mock_db)
+        agent.eval_agent = Mock()
+        agent.eval_agent.evaluate_interaction.return_value = {
+            'answer_relevancy': {'score': 0.5, 'threshold': 0.8, 'passed': False}
+        }
+        agent.rca_agent = Mock()
+
+        result = agent.execute_test({
+            'test_name': 'Flaky test',
+            'instruction': 'Confirm my order',
+            'agent': 'Order Confirmation Agent',
+            'environment': 'Development',
+            'expected_behavior': 'Confirms the order'
+        })
+
+        self.assertEqual(result['incident_id'], 7)
+        self.assertTrue(result['reused_rca'])
+        self.assertEqual(existing.occurrence_count, 4)
+        agent.rca_agent.analyze_data.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
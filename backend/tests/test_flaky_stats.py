@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.flaky_stats import advance_stats, count_flips, describe_flakiness, record_test_run
+from api.models.database import TestStats
+from api.routes.sanity_scheduler import get_flaky_tests
+
+
+class TestFlakyStats(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        TestStats.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.start = datetime(2025, 5, 1, 9, 0)
+
+    def tearDown(self):
+        self.db.close()
+
+    def record(self, test_name, outcomes, agent="Order Agent"):
+        for i, passed in enumerate(outcomes):
+            record_test_run(self.db, test_name, agent, passed, self.start + timedelta(minutes=i))
+            self.db.commit()
+
+    def test_flips_are_counted_over_the_window(self):
+        self.assertEqual(count_flips(0b1010, 4), 3)
+        self.assertEqual(count_flips(0b1010, 1), 0)
+        stats = TestStats(test_name="t", agent="a")
+        for passed in [False] * 5 + [True, False, True]:
+            advance_stats(stats, passed, self.start, window=4, alpha=0.5)
+        # Only the latest four runs, F P F P oldest to newest, are in the window
+        self.assertEqual((stats.run_count, stats.pass_count, stats.flip_count), (8, 2, 3))
+        self.assertEqual(describe_flakiness(stats, window=4)["recent"], "PFPF")
+        self.assertAlmostEqual(stats.ewma_pass_rate, 0.625)
+
+    def test_runs_update_one_row_per_test_and_agent(self):
+        self.record("Confirm order", [True, False, True, True])
+        self.record("Confirm order", [True], agent="Billing Agent")
+        self.assertEqual(self.db.query(TestStats).count(), 2)
+        stats = self.db.query(TestStats).filter_by(agent="Order Agent").one()
+        self.assertEqual((stats.run_count, stats.flip_count, stats.last_status), (4, 2, 'passed'))
+
+    def test_endpoint_lists_flakiest_first(self):
+        self.record("Stable", [True] * 6)
+        self.record("Sometimes", [True, True, False, True, True, True])
+        self.record("Flaky", [True, False, True, False, True, False])
+        flaky = get_flaky_tests(min_flips=1, limit=10, db=self.db)
+        self.assertEqual([t["testName"] for t in flaky], ["Flaky", "Sometimes"])
+        self.assertEqual(flaky[0]["flipRate"], 1.0)
+        single = get_flaky_tests(test_name="Stable", agent="Order Agent", min_flips=0, limit=10, db=self.db)
+        self.assertEqual(single[0]["recent"], "PPPPPP")
+
+
+if __name__ == '__main__':
+    unittest.main()
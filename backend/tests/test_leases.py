@@ -0,0 +1,66 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.leases import claim_lease, finish_lease, heartbeat_lease
+from api.models.database import RCAJob, TestRun
+
+# Both queue tables, each with one queued row
+QUEUES = {
+    RCAJob: lambda: RCAJob(test_result_id=1, test_config={}, status='queued'),
+    TestRun: lambda: TestRun(suite_id='suite', test_config={}, status='queued'),
+}
+
+
+class TestLeases(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        for model in QUEUES:
+            model.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.db.add_all([make() for make in QUEUES.values()])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def expire(self, row):
+        row.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        self.db.commit()
+
+    def test_expired_lease_is_reclaimed(self):
+        for model in QUEUES:
+            with self.subTest(model=model.__name__):
+                row = claim_lease(self.db, model, 'worker-a', lease_seconds=600, max_attempts=3)
+                self.assertIsNone(claim_lease(self.db, model, 'worker-b', lease_seconds=600, max_attempts=3))
+                self.expire(row)
+                reclaimed = claim_lease(self.db, model, 'worker-b', lease_seconds=600, max_attempts=3)
+                self.assertEqual((reclaimed.id, reclaimed.attempts, reclaimed.worker_id), (row.id, 2, 'worker-b'))
+                self.assertFalse(heartbeat_lease(self.db, model, row.id, 'worker-a', lease_seconds=600))
+                self.assertTrue(heartbeat_lease(self.db, model, row.id, 'worker-b', lease_seconds=600))
+                # The first worker's late outcome is discarded
+                self.assertIsNone(finish_lease(self.db, model, row.id, 'worker-a', None, max_attempts=3))
+                self.assertEqual(finish_lease(self.db, model, row.id, 'worker-b', None, max_attempts=3), 'completed')
+
+    def test_errors_are_requeued_until_max_attempts(self):
+        for model in QUEUES:
+            with self.subTest(model=model.__name__):
+                row = claim_lease(self.db, model, 'worker-a', lease_seconds=600, max_attempts=2)
+                self.assertEqual(finish_lease(self.db, model, row.id, 'worker-a', 'boom', max_attempts=2), 'queued')
+                claim_lease(self.db, model, 'worker-a', lease_seconds=600, max_attempts=2)
+                self.assertEqual(finish_lease(self.db, model, row.id, 'worker-a', 'boom', max_attempts=2), 'failed')
+                self.assertEqual((row.attempts, row.error, row.worker_id), (2, 'boom', None))
+
+    def test_expired_last_attempt_fails(self):
+        for model in QUEUES:
+            with self.subTest(model=model.__name__):
+                row = claim_lease(self.db, model, 'worker-a', lease_seconds=600, max_attempts=1)
+                self.expire(row)
+                self.assertIsNone(claim_lease(self.db, model, 'worker-b', lease_seconds=600, max_attempts=1))
+                self.assertEqual((row.status, row.error), ('failed', 'Lease held by worker-a expired'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from agents.eval_scorers import LexicalScorer, MetricScorer, PlaceholderScorer, TieredScorer, get_metric_scorer
+
+
+class RecordingJudge(MetricScorer):
+    name = "recording"
+
+    def __init__(self):
+        self.seen = []
+
+    def score_batch(self, metric_name, cases):
+        self.seen.extend(cases)
+        return [0.55 for _ in cases]
+
+
+class TestLexicalScorer(unittest.TestCase):
+    def setUp(self):
+        self.scorer = LexicalScorer()
+        self.case = {
+            'user_query': 'Where is my order 12345?',
+            'model_output': 'Your order 12345 shipped via DHL on Monday.',
+            'context': ['Order 12345 shipped via DHL on Monday']
+        }
+
+    def test_grounded_answer_scores_high(self):
+        for metric in ('answer_relevancy', 'faithfulness', 'hallucination'):
+            self.assertEqual(self.scorer.score_case(metric, self.case), 1.0, metric)
+
+    def test_unsupported_entities_are_penalized(self):
+        case = dict(self.case, model_output='Your order 99999 shipped via FedEx on Monday.')
+        self.assertAlmostEqual(self.scorer.score_case('hallucination', case), 1 / 3)
+        self.assertLess(self.scorer.score_case('faithfulness', case), 1.0)
+
+    def test_entities_match_whole_tokens(self):
+        case = dict(self.case, model_output='Order 5 ships in 2025.', context=['Order 2025 shipped'])
+        self.assertAlmostEqual(self.scorer.score_case('hallucination', case), 1 / 2)
+
+    def test_off_topic_answer_has_low_relevancy(self):
+        case = dict(self.case, model_output='The weather is sunny today.')
+        self.assertEqual(self.scorer.score_case('answer_relevancy', case), 0.0)
+
+    def test_factory(self):
+        self.assertIsInstance(get_metric_scorer('lexical'), LexicalScorer)
+
+
+class TestTieredScorer(unittest.TestCase):
+    def test_only_borderline_cases_reach_the_judge(self):
+        judge = RecordingJudge()
+        scorer = TieredScorer(LexicalScorer(), judge, escalate_low=0.3, escalate_high=0.8)
+        cases = [
+            {'user_query': 'order status', 'model_output': 'order status is shipped', 'context': []},
+            {'user_query': 'order status refund', 'model_output': 'your order is late', 'context': []},
+            {'user_query': 'order status', 'model_output': 'it is raining', 'context': []},
+        ]
+        scores = scorer.score_batch('answer_relevancy', cases)
+        self.assertEqual(scores, [1.0, 0.55, 0.0])
+        self.assertEqual(judge.seen, [cases[1]])
+        self.assertEqual(scorer.escalated, 1)
+
+    def test_version_tracks_both_tiers(self):
+        judge = RecordingJudge()
+        self.assertNotEqual(
+            TieredScorer(LexicalScorer(), judge, 0.3, 0.8).version,
+            TieredScorer(LexicalScorer(), judge, 0.2, 0.8).version
+        )
+
+
+class TestPlaceholderScorer(unittest.TestCase):
+    def test_scores_are_stable_across_processes(self):
+        case = {'user_query': 'Where is my order?', 'model_output': 'It shipped.', 'context': []}
+        script = (
+            "from agents.eval_scorers import PlaceholderScorer;"
+            "print(PlaceholderScorer().score_batch('faithfulness', "
+            "[{'user_query': 'Where is my order?', 'model_output': 'It shipped.'}])[0])"
+        )
+        backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        scores = {
+            subprocess.run(
+                [sys.executable, "-c", script], cwd=backend, capture_output=True, text=True,
+                env={**os.environ, "PYTHONHASHSEED": seed}, check=True
+            ).stdout.strip().splitlines()[-1]
+            for seed in ("1", "2")
+        }
+        self.assertEqual(scores, {str(PlaceholderScorer().score_batch('faithfulness', [case])[0])})
+
+
+if __name__ == '__main__':
+    unittest.main()
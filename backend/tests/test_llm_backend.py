@@ -0,0 +1,64 @@
+import json
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.llm_backend import FakeLLMBackend, LLMBackendError, OpenAIBackend, get_llm_backend
+from agents.rca_agent import RCAAgent, get_rca_agent, rca_engine_metrics
+
+
+class TestFakeLLMBackend(unittest.TestCase):
+    def test_templated_report_is_deterministic(self):
+        backend = FakeLLMBackend()
+        first = backend.complete("same prompt")
+        second = FakeLLMBackend().complete("same prompt")
+        self.assertEqual(first, second)
+        self.assertIn('summary', json.loads(first))
+
+    def test_canned_responses_cycle(self):
+        backend = FakeLLMBackend(responses=['{"summary": "a"}', '{"summary": "b"}'])
+        outputs = [backend.complete("p") for _ in range(3)]
+        self.assertEqual(outputs, ['{"summary": "a"}', '{"summary": "b"}', '{"summary": "a"}'])
+
+    def test_concurrent_calls_each_get_their_own_response(self):
+        backend = FakeLLMBackend(responses=[str(i) for i in range(400)])
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            outputs = list(pool.map(backend.complete, ["p"] * 400))
+        self.assertEqual(backend.calls, 400)
+        self.assertEqual(len(set(outputs)), 400)
+
+    def test_failure_rate_raises(self):
+        backend = FakeLLMBackend(failure_rate=1.0)
+        with self.assertRaises(LLMBackendError):
+            backend.complete("p")
+
+    def test_rca_agent_parses_fake_report(self):
+        agent = RCAAgent(backend=FakeLLMBackend())
+        result = agent.analyze_data({'test_name': 'Simple RCA Test'})
+        self.assertEqual(result['status'], 'success')
+        for field in ['summary', 'root_cause', 'contributing_factors', 'replay', 'resolution']:
+            self.assertIn(field, result['rca_report'])
+
+    def test_rca_agent_reports_backend_failure(self):
+        agent = RCAAgent(backend=FakeLLMBackend(failure_rate=1.0))
+        result = agent.analyze_data({'test_name': 'Simple RCA Test'})
+        self.assertEqual(result['status'], 'error')
+
+
+class TestBackendFactory(unittest.TestCase):
+    def test_factory_selects_backend(self):
+        self.assertIsInstance(get_llm_backend('fake'), FakeLLMBackend)
+        self.assertIsInstance(get_llm_backend('openai'), OpenAIBackend)
+        with self.assertRaises(ValueError):
+            get_llm_backend('unknown')
+
+
+class TestSharedRCAEngine(unittest.TestCase):
+    def test_engine_is_built_once(self):
+        first = get_rca_agent()
+        second = get_rca_agent()
+        self.assertIs(first, second)
+        self.assertIn('construction_ms', rca_engine_metrics)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from datetime import datetime, timedelta, date, time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.database.database import get_db
+from api.models.database import Incident, TestResult
+from api.models.test_schedule import TestSchedule
+from api.pagination import NEXT_CURSOR_HEADER
+from api.routes.sanity_scheduler import router as scheduler_router
+from api.routes.test_schedules import router as test_schedules_router
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class TestKeysetPagination(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        for model in (TestResult, Incident, TestSchedule):
+            model.__table__.create(engine)
+        Session = self.Session = sessionmaker(bind=engine)
+        db = Session()
+        now = datetime(2025, 5, 1, 12, 0)
+        for i in range(25):
+            db.add(TestResult(
+                test_name=f"Test {i % 4}",
+                instruction="Confirm my order",
+                agent="Order Agent" if i % 2 else "Billing Agent",
+                environment="Production" if i % 5 == 0 else "Development",
+                expected_behavior="Confirms the order",
+                status="passed",
+                result={},
+                # Pairs share a timestamp so the id tiebreaker matters
+                created_at=now + timedelta(minutes=i // 2),
+            ))
+        for i in range(7):
+            db.add(TestSchedule(date=date(2025, 6, 1 + i % 3), time=time(9, i), test_name=f"s{i}", tags="nightly" if i % 2 else "smoke"))
+        db.commit()
+        db.close()
+
+        app = FastAPI()
+        app.include_router(scheduler_router, prefix="/api/scheduler")
+        app.include_router(test_schedules_router, prefix="/api/test-schedules")
+
+        def override_get_db():
+            session = Session()
+            try:
+                yield session
+            finally:
+                session.close()
+        app.dependency_overrides[get_db] = override_get_db
+        self.client = TestClient(app)
+
+    def walk(self, path, **params):
+        pages, cursor = [], None
+        while True:
+            response = self.client.get(path, params=dict(params, **({'cursor': cursor} if cursor else {})))
+            self.assertEqual(response.status_code, 200, response.text)
+            pages.append(response.json())
+            cursor = response.headers.get(NEXT_CURSOR_HEADER)
+            if not cursor:
+                return pages
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.walk("/api/scheduler/test-results", limit=4, history_limit=0)
+        self.assertEqual([len(p) for p in pages], [4, 4, 4, 4, 4, 4, 1])
+        ids = [row["id"] for page in pages for row in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_filters_combine_with_pagination(self):
+        pages = self.walk(
+            "/api/scheduler/test-results", limit=2, agent="Order Agent",
+            environment="Development", since="2025-05-01T12:02:00"
+        )
+        rows = [row for page in pages for row in page]
+        self.assertTrue(rows)
+        for row in rows:
+            self.assertEqual(row["agent"], "Order Agent")
+            self.assertEqual(row["environment"], "Development")
+
+    def test_schedules_page_in_firing_order(self):
+        pages = self.walk("/api/test-schedules/test_schedules/", limit=3)
+        names = [row["test_name"] for page in pages for row in page]
+        self.assertEqual(names, ["s0", "s3", "s6", "s1", "s4", "s2", "s5"])
+        tagged = self.walk("/api/test-schedules/test_schedules/", tag="nightly")
+        self.assertEqual(sorted(r["test_name"] for r in tagged[0]), ["s1", "s3", "s5"])
+
+    def test_unpaged_request_returns_every_row(self):
+        response = self.client.get("/api/scheduler/test-results", params={"history_limit": 0})
+        self.assertEqual(len(response.json()), 25)
+        self.assertNotIn(NEXT_CURSOR_HEADER, response.headers)
+
+    def test_null_sort_key_does_not_break_paging(self):
+        db = self.Session()
+        db.query(TestResult).filter(TestResult.id == 1).update({TestResult.created_at: None})
+        db.commit()
+        db.close()
+        pages = self.walk("/api/scheduler/test-results", limit=4, history_limit=0)
+        ids = [row["id"] for page in pages for row in page]
+        self.assertEqual(len(set(ids)), 24)
+        self.assertNotIn(1, ids)
+
+    def test_tag_filter_matches_whole_tags(self):
+        db = self.Session()
+        db.add(TestSchedule(date=date(2025, 6, 9), time=time(9, 0), test_name="db-only", tags="db, smoke"))
+        db.add(TestSchedule(date=date(2025, 6, 9), time=time(9, 1), test_name="dbx-only", tags="dbx"))
+        db.commit()
+        db.close()
+        for tag, expected in (("db", ["db-only"]), ("dbx", ["dbx-only"]), ("d_", []), ("db%", [])):
+            rows = self.client.get("/api/test-schedules/test_schedules/", params={"tag": tag}).json()
+            self.assertEqual([r["test_name"] for r in rows], expected, tag)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/scheduler/test-results", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
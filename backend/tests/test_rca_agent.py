@@ -0,0 +1,166 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.json_stream import IncrementalJSONParser
+from agents.llm_backend import FakeLLMBackend
+from agents.rca_agent import RCAAgent
+from agents.rca_orchestrator import RCAOrchestrator
+from api.models.database import CustomMetric, EvaluationCacheEntry, EvaluationResult, Trace
+
+
+class RecordingBackend(FakeLLMBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.prompts = []
+
+    def complete(self, prompt: str) -> str:
+        self.prompts.append(prompt)
+        return super().complete(prompt)
+
+
+class TestHierarchicalRCA(unittest.TestCase):
+    def setUp(self):
+        self.backend = RecordingBackend()
+        self.agent = RCAAgent(backend=self.backend)
+        self.agent.rule_engine = None
+        self.agent.max_prompt_chars = 4000
+        self.data = {
+            'test_name': 'Large tenant',
+            'data': {
+                'logs': [
+                    {
+                        'trace_id': i,
+                        'timestamp': f'2025-05-07T{i % 24:02d}:00:00',
+                        'level': 'WARNING',
+                        'message': 'x' * 200,
+                        'service': f'service-{i % 5}'
+                    }
+                    for i in range(200)
+                ],
+                'metrics': [],
+                'interactions': []
+            }
+        }
+
+    def test_small_payload_uses_single_prompt(self):
+        result = self.agent.analyze_data({'test_name': 'small'})
+        self.assertEqual(result['status'], 'success')
+        self.assertNotIn('shards', result)
+        self.assertEqual(len(self.backend.prompts), 1)
+
+    def test_oversized_payload_is_sharded_and_reduced(self):
+        result = self.agent.analyze_data(self.data)
+        self.assertEqual(result['status'], 'success')
+        self.assertGreater(result['shards'], 1)
+        for field in ['summary', 'root_cause', 'contributing_factors', 'replay', 'resolution']:
+            self.assertIn(field, result['rca_report'])
+        # Every shard plus at least one reduce call, each prompt bounded
+        self.assertGreater(len(self.backend.prompts), result['shards'])
+        for prompt in self.backend.prompts:
+            self.assertLessEqual(len(prompt), self.agent.max_prompt_chars)
+
+    def test_orchestrator_payload_stays_within_budget(self):
+        engine = create_engine("sqlite://")
+        for model in (Trace, EvaluationCacheEntry, EvaluationResult, CustomMetric):
+            model.__table__.create(engine)
+        db = sessionmaker(bind=engine)()
+        start = datetime.utcnow() - timedelta(days=2)
+        for i in range(80):
+            db.add(Trace(user_id=1, type='interaction', created_at=start + timedelta(minutes=10 * i), content={
+                'type': 'interaction',
+                'data': {'prompt': f'Where is order {i}? ' + 'p' * 150, 'response': 'It shipped. ' + 'r' * 150}
+            }))
+        db.commit()
+        with patch('agents.rca_orchestrator.get_rca_agent', return_value=self.agent):
+            analysis_data = RCAOrchestrator(db).prepare_analysis_data(1)
+        db.close()
+        self.assertTrue(analysis_data['data']['evaluation_metrics']['interactions'])
+
+        result = self.agent.analyze_data(analysis_data)
+        self.assertEqual(result['status'], 'success')
+        self.assertGreater(result['shards'], 1)
+        for prompt in self.backend.prompts:
+            self.assertLessEqual(len(prompt), self.agent.max_prompt_chars)
+        shards = self.agent._build_shards(analysis_data)
+        self.assertTrue(any('evaluation_metrics.interactions' in shard['evidence'] for shard in shards))
+
+    def test_oversized_context_is_summarized(self):
+        data = dict(self.data, description='d' * 10000)
+        for shard in self.agent._build_shards(data):
+            self.assertIn('omitted', shard['context']['description'])
+            self.assertLessEqual(
+                len(self.agent.shard_prompt_template.format(scenario=json.dumps(shard))), self.agent.max_prompt_chars
+            )
+
+    def test_shards_group_by_service(self):
+        shards = self.agent._build_shards(self.data)
+        for shard in shards:
+            for log in shard['evidence']['logs']:
+                self.assertIn(f"service:{log['service']}", shard['shard_keys'])
+            self.assertEqual(shard['context']['test_name'], 'Large tenant')
+
+
+class TestIncrementalJSONParser(unittest.TestCase):
+    def test_sections_complete_in_order(self):
+        text = '```json\n{"summary": "a, {b}", "contributing_factors": [{"title": "x"}], "root_cause": "c"}\n```'
+        parser = IncrementalJSONParser()
+        sections = []
+        for i in range(0, len(text), 3):
+            sections.extend(key for key, _ in parser.feed(text[i:i + 3]))
+        self.assertEqual(sections, ['summary', 'contributing_factors', 'root_cause'])
+        self.assertEqual(parser.close()['summary'], 'a, {b}')
+
+    def test_malformed_member_fails_early(self):
+        parser = IncrementalJSONParser()
+        with self.assertRaises(ValueError):
+            parser.feed('{"summary": oops, "root_cause": ')
+
+    def test_unclosed_object_fails_on_close(self):
+        parser = IncrementalJSONParser()
+        parser.feed('{"summary": "a"')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+
+class TestStreamingRCA(unittest.TestCase):
+    def test_sections_stream_before_done(self):
+        agent = RCAAgent(backend=FakeLLMBackend(chunk_size=8))
+        agent.rule_engine = None
+        events = list(agent.stream_analysis({'test_name': 'stream'}))
+        self.assertEqual(events[0], {'event': 'section', 'key': 'summary', 'value': events[-1]['rca_report']['summary']})
+        self.assertEqual(events[-1]['event'], 'done')
+        self.assertEqual(
+            [e['key'] for e in events[:-1]],
+            ['summary', 'root_cause', 'contributing_factors', 'replay', 'resolution']
+        )
+
+    def test_invalid_output_emits_error(self):
+        agent = RCAAgent(backend=FakeLLMBackend(responses=['{"summary": nope}']))
+        agent.rule_engine = None
+        events = list(agent.stream_analysis({'test_name': 'stream'}))
+        self.assertEqual(events[-1]['event'], 'error')
+
+    def test_oversized_data_runs_the_rules_once(self):
+        agent = RCAAgent(backend=FakeLLMBackend())
+        agent.rule_engine = MagicMock(min_confidence=0.8)
+        agent.rule_engine.analyze.return_value = None
+        agent.max_prompt_chars = 4000
+        data = {'test_name': 'big', 'data': {'logs': [{'message': 'x' * 200} for _ in range(50)]}}
+        with patch.object(agent, 'analyze_data', side_effect=AssertionError('rules re-run')):
+            events = list(agent.stream_analysis(data))
+        self.assertEqual(events[-1]['event'], 'done')
+        agent.rule_engine.analyze.assert_called_once()
+
+    def test_extract_json_from_surrounding_text(self):
+        agent = RCAAgent(backend=FakeLLMBackend())
+        text = 'Here is the report: {"summary": {"nested": 1}} trailing'
+        self.assertEqual(json.loads(agent._extract_json(text)), {'summary': {'nested': 1}})
+
+
+if __name__ == '__main__':
+    unittest.main()
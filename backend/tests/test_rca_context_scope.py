@@ -0,0 +1,128 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from agents.data_ingestion_agent import DataIngestionAgent
+from agents.schedule_daemon import build_test_config
+from agents.test_execution_agent import TestExecutionAgent
+from api.models.database import Project, ProjectMember, RCAJob, TestResult, Trace
+from api.models.test_schedule import TestSchedule
+
+
+def log(message, **data):
+    return {'type': 'log', 'data': dict(level='ERROR', message=message, **data)}
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class TestRCAContextScope(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        for model in (Trace, Project, ProjectMember, TestResult, RCAJob):
+            model.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        self.now = datetime.utcnow()
+        recent = self.now - timedelta(minutes=5)
+        self.db.add_all([
+            Trace(user_id=1, type='log', content=log('in scope', agent='Order Agent', environment='Production'), created_at=recent),
+            Trace(user_id=2, type='log', content=log('member, untagged'), created_at=recent),
+            Trace(user_id=1, type='log', content=log('stale', agent='Order Agent'), created_at=self.now - timedelta(hours=3)),
+            Trace(user_id=3, type='log', content=log('other tenant', agent='Order Agent'), created_at=recent),
+            Trace(user_id=1, type='log', content=log('other agent', agent='Billing Agent'), created_at=recent),
+            Trace(user_id=1, type='log', content=log('other env', tags={'environment': 'development'}), created_at=recent + timedelta(seconds=1)),
+        ])
+        self.db.add(Project(id=1, name='Checkout', owner_id=1))
+        self.db.add(ProjectMember(project_id=1, user_id=2, email='m@example.com', role='member'))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def messages(self, analysis_data):
+        logs = analysis_data['data']['logs']
+        return sum(entry['occurrence_count'] for entry in logs)
+
+    def test_process_traces_filters_by_scope(self):
+        agent = DataIngestionAgent(self.db)
+        agent.process_traces(
+            user_ids=[1, 2], agent='Order Agent', environment='production',
+            since=self.now - timedelta(minutes=30), until=self.now
+        )
+        self.assertEqual(self.messages(agent.get_analysis_data()), 2)
+
+    def test_untagged_traces_need_an_owner_scope(self):
+        agent = DataIngestionAgent(self.db)
+        agent.process_traces(
+            agent='Order Agent', environment='production',
+            since=self.now - timedelta(minutes=30), until=self.now
+        )
+        # Only the fully tagged trace; untagged ones could belong to any tenant
+        self.assertEqual(self.messages(agent.get_analysis_data()), 1)
+
+    def test_scheduled_runs_carry_the_schedule_owner(self):
+        schedule = TestSchedule(
+            date=self.now.date(), time=self.now.time(), test_name='Confirm order',
+            description='check', tags='agent:Order Agent', user_id=2, project_id=1
+        )
+        db = Mock()
+        db.query.return_value.filter.return_value.order_by.return_value.first.return_value = None  # no earlier run
+        config = build_test_config(db, schedule)
+        self.assertEqual((config['user_id'], config['project_id']), (2, 1))
+
+    def test_saved_run_is_analyzed_as_of_its_run(self):
+        ran_at = self.now - timedelta(hours=3) + timedelta(minutes=1)
+        test_result = TestResult(
+            test_name='Confirm order', instruction='Confirm my order', agent='Order Agent',
+            environment='Production', expected_behavior='Confirms', status='failed',
+            result={'faithfulness': {'score': 0.2}}, created_at=ran_at
+        )
+        self.db.add(test_result)
+        self.db.flush()
+        self.db.add(RCAJob(test_result_id=test_result.id, status='completed', test_config={
+            'test_name': 'Confirm order', 'instruction': 'Confirm my order', 'agent': 'Order Agent',
+            'environment': 'Production', 'expected_behavior': 'Confirms', 'user_id': 1
+        }))
+        self.db.commit()
+        executor = TestExecutionAgent(self.db, session_factory=Mock())
+        data = executor.saved_run_analysis_data(test_result)
+        logs = data['data']['logs']
+        # The window ends at the run, and the job's config scopes it to user 1
+        self.assertEqual([entry['message'] for entry in logs], ['stale'])
+        self.assertEqual(data['timestamp'], ran_at.isoformat())
+        self.assertEqual(data['test_result'], {'faithfulness': {'score': 0.2}})
+
+    def test_max_traces_keeps_the_newest(self):
+        agent = DataIngestionAgent(self.db)
+        agent.process_traces(user_id=1, max_traces=1)
+        logs = agent.get_analysis_data()['data']['logs']
+        self.assertEqual([entry['message'] for entry in logs], ['other env'])
+
+    def test_max_traces_counts_only_in_scope_traces(self):
+        agent = DataIngestionAgent(self.db)
+        # The newest traces belong to another agent and environment
+        agent.process_traces(user_id=1, agent='Order Agent', environment='production', max_traces=1)
+        logs = agent.get_analysis_data()['data']['logs']
+        self.assertEqual([entry['message'] for entry in logs], ['in scope'])
+
+    def test_test_execution_scopes_to_project_members(self):
+        executor = TestExecutionAgent(self.db, session_factory=Mock())
+        self.assertEqual(executor._owner_user_ids({'project_id': 1}), [1, 2])
+        self.assertEqual(executor._owner_user_ids({'user_id': 3}), [3])
+        self.assertIsNone(executor._owner_user_ids({}))
+        context = executor._collect_rca_context({
+            'test_name': 'Confirm order', 'agent': 'Order Agent',
+            'environment': 'Production', 'project_id': 1
+        })
+        self.assertEqual(self.messages(context), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
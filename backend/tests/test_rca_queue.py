@@ -0,0 +1,200 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from agents.fingerprint import compute_failure_fingerprint
+from agents.rca_queue import RCAJobWorker
+from agents.test_execution_agent import TestExecutionAgent
+from api.models.database import Incident, RCAJob, TestResult, TestStats, Trace
+from api.routes.sanity_scheduler import get_rca_job
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+TEST_CONFIG = {
+    'test_name': 'Order confirmation',
+    'instruction': 'Confirm my order',
+    'agent': 'Order Agent',
+    'environment': 'Development',
+    'expected_behavior': 'Confirms the order',
+    'model_output': 'Sorry, I cannot find your order.'
+}
+
+
+class TestRCAJobQueue(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        for model in (Trace, TestResult, TestStats, Incident, RCAJob):
+            model.__table__.create(engine)
+        self.Session = sessionmaker(bind=engine)
+        self.db = self.Session()
+        self.rca_agent = Mock()
+        self.rca_agent.analyze_data.return_value = {'status': 'success', 'rca_report': {'root_cause': 'stale index'}}
+        patcher = patch('agents.test_execution_agent.get_rca_agent', return_value=self.rca_agent)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.db.close()
+
+    def run_failing_test(self):
+        test_agent = TestExecutionAgent(self.db, session_factory=self.Session)
+        test_agent.eval_agent = Mock()
+        test_agent.eval_agent.evaluate_interaction.return_value = {
+            'answer_relevancy': {'score': 0.2, 'threshold': 0.8, 'passed': False}
+        }
+        return test_agent.execute_test(TEST_CONFIG, defer_rca=True)
+
+    def test_failed_run_returns_before_rca(self):
+        result = self.run_failing_test()
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(result['rca_status'], 'queued')
+        self.rca_agent.analyze_data.assert_not_called()
+        self.assertEqual(self.db.query(TestResult).count(), 1)
+        self.assertEqual(self.db.query(TestStats).one().last_status, 'failed')
+
+        worker = RCAJobWorker(session_factory=self.Session)
+        self.assertTrue(worker.process_next())
+        self.assertFalse(worker.process_next())
+        self.rca_agent.analyze_data.assert_called_once()
+
+        status = get_rca_job(result['rca_job_id'], db=self.db)
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['attempts'], 1)
+        self.assertEqual(status['rcaReport'], {'root_cause': 'stale index'})
+
+    def test_queued_duplicate_reuses_the_first_rca(self):
+        self.run_failing_test()
+        self.run_failing_test()
+        worker = RCAJobWorker(session_factory=self.Session)
+        while worker.process_next():
+            pass
+        self.rca_agent.analyze_data.assert_called_once()
+        self.assertEqual(self.db.query(Incident).one().occurrence_count, 2)
+        self.assertEqual({job.status for job in self.db.query(RCAJob)}, {'completed'})
+
+    def test_unscored_metric_fails_the_run(self):
+        test_agent = TestExecutionAgent(self.db, session_factory=self.Session)
+        test_agent.eval_agent = Mock()
+        test_agent.eval_agent.evaluate_interaction.return_value = {
+            'answer_relevancy': {'score': 0.9, 'threshold': 0.8, 'passed': True},
+            'faithfulness': {'score': None, 'threshold': 0.8, 'passed': False, 'error': 'timeout'}
+        }
+        result = test_agent.execute_test(TEST_CONFIG, defer_rca=True)
+        self.assertEqual(result['status'], 'failed')
+        self.assertEqual(self.db.query(TestResult).one().status, 'failed')
+
+    def test_racing_rca_runs_share_one_open_incident(self):
+        self.run_failing_test()
+        self.run_failing_test()
+        # Both jobs got past the open-incident check before either opened one
+        test_agent = TestExecutionAgent(self.db)
+        first, second = [
+            test_agent.run_rca(job.test_config, job.test_result, {})
+            for job in self.db.query(RCAJob).order_by(RCAJob.id)
+        ]
+        self.assertNotIn('reused_rca', first)
+        self.assertEqual((second['incident_id'], second['reused_rca']), (first['incident_id'], True))
+        self.assertEqual(self.db.query(Incident).one().occurrence_count, 2)
+
+    def test_open_incident_without_a_report_gets_this_runs_rca(self):
+        fingerprint = compute_failure_fingerprint(TEST_CONFIG, {
+            'answer_relevancy': {'score': 0.2, 'threshold': 0.8, 'passed': False}
+        })
+        self.db.add(Incident(title='Legacy', status='open', fingerprint=fingerprint, occurrence_count=1))
+        self.db.commit()
+        test_agent = TestExecutionAgent(self.db, session_factory=self.Session)
+        test_agent.eval_agent = Mock()
+        test_agent.eval_agent.evaluate_interaction.return_value = {
+            'answer_relevancy': {'score': 0.2, 'threshold': 0.8, 'passed': False}
+        }
+        result = test_agent.execute_test(TEST_CONFIG)
+        incident = self.db.query(Incident).one()
+        self.assertEqual(result['incident_id'], incident.id)
+        self.assertNotIn('reused_rca', result)
+        self.assertEqual((incident.rca_report, incident.occurrence_count), ({'root_cause': 'stale index'}, 2))
+
+    def test_failing_job_is_retried_then_failed(self):
+        self.run_failing_test()
+        worker = RCAJobWorker(session_factory=self.Session, run_job=Mock(side_effect=RuntimeError("LLM timeout")), max_attempts=2)
+        worker.process_next()
+        job = self.db.query(RCAJob).one()
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        worker.process_next()
+        self.db.refresh(job)
+        self.assertEqual((job.status, job.attempts, job.error), ('failed', 2, 'LLM timeout'))
+        self.assertFalse(worker.process_next())
+
+
+class TestRCAJobLeases(unittest.TestCase):
+    def setUp(self):
+        # A file, so the heartbeat thread gets a connection of its own
+        path = os.path.join(tempfile.mkdtemp(), 'rca_jobs.db')
+        self.engine = create_engine(f"sqlite:///{path}")
+        for model in (TestResult, Incident, RCAJob):
+            model.__table__.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        db = self.Session()
+        result = TestResult(
+            test_name='Order confirmation', instruction='Confirm my order', agent='Order Agent',
+            environment='Development', expected_behavior='Confirms the order', status='failed', result={}
+        )
+        db.add(result)
+        db.flush()
+        db.add(RCAJob(test_result_id=result.id, test_config=TEST_CONFIG, status='queued'))
+        db.commit()
+        db.close()
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def job(self):
+        db = self.Session()
+        try:
+            return db.query(RCAJob).one()
+        finally:
+            db.close()
+
+    def test_heartbeats_keep_a_long_job_leased(self):
+        def slow_rca(db, job):
+            time.sleep(0.5)
+            return {'status': 'failed', 'incident_id': None}
+        worker = RCAJobWorker(
+            session_factory=self.Session, run_job=slow_rca, lease_seconds=0.2, heartbeat_seconds=0.05
+        )
+        started = datetime.utcnow()
+        self.assertTrue(worker.process_next())
+        job = self.job()
+        self.assertEqual((job.status, job.attempts, job.worker_id), ('completed', 1, None))
+        self.assertGreater(job.heartbeat_at, started + timedelta(seconds=0.3))
+
+    def test_outcome_of_a_lost_lease_is_discarded(self):
+        def reclaimed_meanwhile(db, job):
+            other = self.Session()
+            other.query(RCAJob).update({RCAJob.worker_id: 'worker-b'})
+            other.commit()
+            other.close()
+            return {'status': 'error', 'error': 'too late'}
+        worker = RCAJobWorker(session_factory=self.Session, run_job=reclaimed_meanwhile, worker_id='worker-a')
+        self.assertTrue(worker.process_next())
+        job = self.job()
+        self.assertEqual((job.status, job.worker_id, job.error), ('running', 'worker-b', None))
+        self.assertEqual(worker.lost_leases, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
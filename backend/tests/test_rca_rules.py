@@ -0,0 +1,80 @@
+import json
+import os
+import unittest
+
+from agents.llm_backend import FakeLLMBackend
+from agents.rca_agent import RCAAgent
+from agents.rca_rules import RuleBasedRCA
+
+SCENARIOS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'testing', 'synthetic_agent_issues.json'
+)
+
+
+class TestRuleBasedRCA(unittest.TestCase):
+    def setUp(self):
+        with open(SCENARIOS_PATH) as f:
+            self.scenarios = json.load(f)
+        self.rules = RuleBasedRCA(min_confidence=0.8)
+
+    def test_single_error_scenario_is_attributed_to_logging_service(self):
+        result = self.rules.analyze(self.scenarios[0])
+        self.assertGreaterEqual(result['confidence'], 0.8)
+        report = result['rca_report']
+        self.assertIn('payment_gateway', report['summary'])
+        self.assertEqual(report['contributing_factors'][0]['trace_id'], 'trace-006')
+        self.assertTrue(report['replay'])
+        self.assertIn('availability', report['resolution'][0]['action'])
+
+    def test_reduced_data_matches_by_trace_id(self):
+        data = {
+            'data': {
+                'logs': [{
+                    'trace_id': 42,
+                    'timestamp': '2025-05-07T03:26:38',
+                    'level': 'ERROR',
+                    'message': 'Upstream request timed out',
+                    'service': 'inventory',
+                    'context': {'trace_id': 'span-1'}
+                }],
+                'spans': [{
+                    'trace_id': 'span-1',
+                    'service': 'frontend',
+                    'operation': 'checkout',
+                    'status': 'ERROR',
+                    'start_time': None,
+                    'end_time': None
+                }],
+                'interactions': [],
+                'metrics': []
+            },
+            'test_result': {'faithfulness': {'score': 0.5, 'threshold': 0.8, 'passed': False}}
+        }
+        result = self.rules.analyze(data)
+        self.assertGreaterEqual(result['confidence'], 0.8)
+        factors = result['rca_report']['contributing_factors']
+        self.assertEqual(factors[0]['log_id'], '42')
+        self.assertEqual(factors[0]['trace_id'], 'span-1')
+        self.assertEqual(factors[-1]['details'], 'faithfulness')
+
+    def test_no_error_logs_returns_none(self):
+        self.assertIsNone(self.rules.analyze({'data': {'logs': [], 'spans': []}}))
+
+    def test_ambiguous_errors_fall_back_to_llm(self):
+        scenario = dict(self.scenarios[0])
+        scenario['prod_logs'] = scenario['prod_logs'] + [{
+            'timestamp': '2025-05-07T03:26:39',
+            'log_level': 'ERROR',
+            'service': 'inventory',
+            'message': 'Stock lookup failed.'
+        }]
+        self.assertLess(self.rules.analyze(scenario)['confidence'], 0.8)
+
+        agent = RCAAgent(backend=FakeLLMBackend(), rule_engine=self.rules)
+        self.assertEqual(agent.analyze_data(scenario)['source'], 'llm')
+        self.assertEqual(agent.analyze_data(self.scenarios[0])['source'], 'rules')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from agents.schedule_daemon import ScheduleDaemon
+from api.models.database import TestResult
+from api.models.test_schedule import TestSchedule
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class TestScheduleDaemon(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # A file so each worker thread gets its own pooled connection
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'schedules.db')}")
+        TestSchedule.__table__.create(self.engine)
+        TestResult.__table__.create(self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.runs = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    async def asyncTearDown(self):
+        await self.daemon.stop()
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def execute(self, db, test_config):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+            self.runs.append(test_config['test_name'])
+        return {'status': 'passed'}
+
+    def add_schedule(self, name, in_seconds, tags=''):
+        fire_at = datetime.utcnow() + timedelta(seconds=in_seconds)
+        db = self.Session()
+        schedule = TestSchedule(
+            date=fire_at.date(), time=fire_at.time(), test_name=name, description='check', tags=tags
+        )
+        db.add(schedule)
+        db.commit()
+        db.refresh(schedule)
+        db.close()
+        return schedule
+
+    async def start(self, **kwargs):
+        self.daemon = ScheduleDaemon(
+            session_factory=self.Session, execute=self.execute, jitter_seconds=0, **kwargs
+        )
+        await self.daemon.start()
+
+    async def wait_for_runs(self, count, timeout=3):
+        deadline = time.monotonic() + timeout
+        while len(self.runs) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+
+    async def test_due_schedule_runs_once_and_is_marked(self):
+        self.add_schedule('nightly', 0.2, tags='agent:Order Agent,env:Staging')
+        self.add_schedule('later', 3600)
+        await self.start()
+        await self.wait_for_runs(1)
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.runs, ['nightly'])
+        db = self.Session()
+        runs = {s.test_name: s.last_run_at for s in db.query(TestSchedule).all()}
+        db.close()
+        self.assertIsNotNone(runs['nightly'])
+        self.assertIsNone(runs['later'])
+
+    async def test_changes_are_picked_up_without_polling(self):
+        await self.start()
+        await asyncio.sleep(0.05)
+        created = self.add_schedule('new', 0.1)
+        self.daemon.notify_upsert(created)
+        deleted = self.add_schedule('deleted', 0.1)
+        self.daemon.notify_upsert(deleted)
+        self.daemon.notify_delete(deleted.id)
+        await self.wait_for_runs(1)
+        await asyncio.sleep(0.3)
+        self.assertEqual(self.runs, ['new'])
+
+    async def test_stale_entry_does_not_run_an_edited_schedule(self):
+        schedule = self.add_schedule('moved', 0.5)
+        await self.start()
+        while schedule.id not in self.daemon._pending:
+            await asyncio.sleep(0.01)
+        # Edited through another replica, so this daemon is never notified
+        later = datetime.utcnow() + timedelta(hours=1)
+        db = self.Session()
+        db.query(TestSchedule).filter(TestSchedule.id == schedule.id).update(
+            {TestSchedule.date: later.date(), TestSchedule.time: later.time()}
+        )
+        db.commit()
+        db.close()
+        await asyncio.sleep(0.7)
+        self.assertEqual(self.runs, [])
+
+    async def test_concurrency_is_limited(self):
+        for i in range(5):
+            self.add_schedule(f'burst-{i}', -1)
+        await self.start(max_concurrency=2)
+        await self.wait_for_runs(5)
+        self.assertEqual(len(self.runs), 5)
+        self.assertEqual(self.max_active, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from api.models.database import TestResult
+from api.routes.sanity_scheduler import _test_result_stats_query, get_test_result_stats
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+def eval_result(score):
+    return {
+        'answer_relevancy': {'score': score, 'threshold': 0.8, 'passed': score >= 0.8},
+        'faithfulness': {'score': 1.0, 'threshold': 0.8, 'passed': True},
+    }
+
+
+class TestTestResultStats(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        TestResult.__table__.create(engine)
+        self.db = sessionmaker(bind=engine)()
+        day = datetime(2025, 5, 1, 9, 0)
+        runs = [
+            ("Order Agent", "Production", day, 0.9),
+            ("Order Agent", "Production", day + timedelta(hours=2), 0.5),
+            ("Order Agent", "Production", day + timedelta(hours=4), 0.7),
+            ("Order Agent", "Production", day + timedelta(days=1), 1.0),
+            ("Billing Agent", "Production", day, 0.95),
+        ]
+        for agent, environment, created_at, score in runs:
+            result = eval_result(score)
+            self.db.add(TestResult(
+                test_name="Confirm order", instruction="Confirm my order", agent=agent,
+                environment=environment, expected_behavior="Confirms the order",
+                status="passed" if score >= 0.8 else "failed",
+                result=result, created_at=created_at, **TestResult.score_columns(result)
+            ))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_score_columns_are_extracted(self):
+        self.assertEqual(
+            TestResult.score_columns(eval_result(0.5)),
+            {'answer_relevancy_score': 0.5, 'faithfulness_score': 1.0}
+        )
+
+    def test_groups_by_agent_environment_and_day(self):
+        stats = get_test_result_stats(agent="Order Agent", db=self.db)
+        self.assertEqual([s["day"] for s in stats], ["2025-05-02", "2025-05-01"])
+        first_day = stats[1]
+        self.assertEqual((first_day["runs"], first_day["passed"], first_day["failed"]), (3, 1, 2))
+        self.assertAlmostEqual(first_day["passRate"], 1 / 3)
+        self.assertAlmostEqual(first_day["scores"]["answer_relevancy"]["avg"], 0.7)
+        self.assertIsNone(first_day["scores"]["hallucination"]["avg"])
+
+    def test_postgres_query_computes_percentiles(self):
+        query = _test_result_stats_query("postgresql", None, None, None, None)
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        self.assertIn("percentile_cont", sql)
+        self.assertIn("WITHIN GROUP (ORDER BY test_results.answer_relevancy_score)", sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
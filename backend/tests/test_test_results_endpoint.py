@@ -0,0 +1,71 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from api.models.database import Incident, TestResult
+from api.routes.sanity_scheduler import get_test_results
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+class TestTestResultsEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        TestResult.__table__.create(self.engine)
+        Incident.__table__.create(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        now = datetime.utcnow()
+        for i in range(30):
+            self.db.add(TestResult(
+                test_name=f"Test {i % 3}",
+                instruction="Confirm my order",
+                agent="Order Agent",
+                environment="Development",
+                expected_behavior="Confirms the order",
+                status="failed" if i == 29 else "passed",
+                result={},
+                created_at=now - timedelta(minutes=30 - i),
+            ))
+        self.db.flush()
+        latest = self.db.query(TestResult).filter_by(status="failed").one()
+        self.db.add(Incident(title="Test Failure", status="open", rca_report={}, test_result_id=latest.id))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_history_is_capped_and_excludes_the_run(self):
+        results = json.loads(get_test_results(history_limit=4, db=self.db).body)
+        self.assertEqual(len(results), 30)
+        newest = results[0]
+        self.assertEqual(newest["status"], "failed")
+        # Stored naive UTC datetimes are sent as ISO 8601 with an explicit offset
+        self.assertTrue(newest["runDate"].endswith("+00:00"))
+        self.assertIsNotNone(datetime.fromisoformat(newest["history"][0]["timestamp"]).tzinfo)
+        self.assertIsNotNone(newest["incidentId"])
+        self.assertEqual(len(newest["history"]), 4)
+        self.assertNotIn(newest["id"], [h["id"] for h in newest["history"]])
+        history_ids = [h["id"] for h in newest["history"]]
+        self.assertEqual(history_ids, sorted(history_ids, reverse=True))
+        oldest = results[-1]
+        self.assertEqual(len(oldest["history"]), 4)
+        self.assertIsNone(oldest["incidentId"])
+
+    def test_query_count_does_not_grow_with_results(self):
+        statements = []
+        event.listen(self.engine, "before_cursor_execute", lambda *args: statements.append(1))
+        get_test_results(history_limit=10, db=self.db)
+        # ETag markers, page, incident fingerprints, history
+        self.assertLessEqual(len(statements), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from agents.leases import claim_lease
+from agents.test_run_queue import TestRunWorker, enqueue_test_runs
+from api.models.database import TestRun
+from api.routes.sanity_scheduler import get_test_runs
+
+
+def config(name):
+    return {'test_name': name, 'instruction': 'Confirm my order', 'agent': 'Order Agent',
+            'environment': 'Development', 'expected_behavior': 'Confirms the order'}
+
+
+class TestTestRunQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        TestRun.__table__.create(engine)
+        self.Session = sessionmaker(bind=engine)
+        self.db = self.Session()
+        self.suite_id, _ = enqueue_test_runs(self.db, [config("a"), config("b")])
+
+    def tearDown(self):
+        self.db.close()
+
+    def worker(self, execute, **kwargs):
+        return TestRunWorker(session_factory=self.Session, execute=execute, worker_id="w1",
+                             poll_seconds=0.01, **kwargs)
+
+    async def test_worker_runs_each_test_once(self):
+        executed = []
+        worker = self.worker(lambda db, cfg: executed.append(cfg['test_name']) or {'status': 'passed'})
+        while await worker.process_next():
+            pass
+        self.assertEqual(executed, ["a", "b"])
+        suite = get_test_runs(self.suite_id, db=self.db)
+        self.assertEqual(suite["counts"], {"completed": 2})
+        self.assertEqual(suite["runs"][0]["result"], {'status': 'passed'})
+
+    async def test_errors_are_retried_up_to_max_attempts(self):
+        worker = self.worker(lambda db, cfg: {'status': 'error', 'error': 'LLM unavailable'}, max_attempts=2)
+        while await worker.process_next():
+            pass
+        runs = self.db.query(TestRun).all()
+        self.assertEqual({(r.status, r.attempts, r.error) for r in runs}, {('failed', 2, 'LLM unavailable')})
+
+    async def test_heartbeats_extend_the_lease(self):
+        def slow(db, cfg):
+            time.sleep(0.3)
+            return {'status': 'passed'}
+        worker = self.worker(slow, heartbeat_seconds=0.05, visibility_timeout=0.1)
+        await worker.process_next()
+        run = self.db.query(TestRun).order_by(TestRun.id).first()
+        self.assertEqual(run.status, 'completed')
+        self.assertGreater(run.heartbeat_at, run.started_at)
+        self.assertEqual(worker.lost_leases, 0)
+
+    async def test_expired_lease_is_claimed_by_another_worker(self):
+        first = claim_lease(self.db, TestRun, "dead-worker", lease_seconds=60, max_attempts=3)
+        first.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        self.db.commit()
+        worker = self.worker(lambda db, cfg: {'status': 'passed'})
+        while await worker.process_next():
+            pass
+        self.db.refresh(first)
+        self.assertEqual((first.status, first.attempts), ('completed', 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
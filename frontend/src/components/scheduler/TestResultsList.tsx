@@ -4,7 +4,7 @@ import { Button } from "@/components/ui/button";
 import { Badge } from "@/components/ui/badge";
 import { Clock, Diff } from 'lucide-react';
 import { TestResult } from '@/types/scheduler';
-import { getStatusBadge } from './utils/schedulerUtils';
+import { formatRunDate, getStatusBadge } from './utils/schedulerUtils';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from "@/components/ui/dialog";
 import { PromptDiff } from '@/components/dashboard/PromptDiff';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table";
@@ -67,7 +67,7 @@ export function TestResultsList({ testResults: initialTestResults }: TestResults
               <TableBody>
                 {selectedTest.history?.map((run) => (
                   <TableRow key={run.id}>
-                    <TableCell className="font-medium">{run.timestamp}</TableCell>
+                    <TableCell className="font-medium">{formatRunDate(run.timestamp)}</TableCell>
                     <TableCell>{run.agentVersion}</TableCell>
                     <TableCell>{getStatusBadge(run.status)}</TableCell>
                     <TableCell className="text-right">
@@ -135,7 +135,7 @@ export function TestResultsList({ testResults: initialTestResults }: TestResults
                       <div className="flex items-center gap-4 mt-3">
                         <div className="flex items-center text-xs text-gray-500">
                           <Clock className="h-4 w-4 mr-1" />
-                          <span>{result.runDate}</span>
+                          <span>{formatRunDate(result.runDate)}</span>
                           <span className="ml-2 px-2 py-0.5 rounded bg-purple-50 text-purple-700 font-medium">{result.agent}</span>
                         </div>
                       </div>
@@ -29,4 +29,15 @@ export function getCardBackgroundColor(status: string) {
 
 export function formatDate(date: Date, formatStr: string = 'PP'): string {
   return format(date, formatStr);
-} 
\ No newline at end of file
+} 
+
+// API timestamps are ISO 8601; demo data and placeholders like "N/A" are shown as-is
+const ISO_TIMESTAMP = /^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}/;
+
+export function formatRunDate(value: string): string {
+  if (!value || !ISO_TIMESTAMP.test(value)) {
+    return value;
+  }
+  const date = new Date(value);
+  return isNaN(date.getTime()) ? value : date.toLocaleString();
+}